@@ -13,78 +13,146 @@
 # limitations under the License.
 
 import logging
+import os
 import re
 
 from google.adk.agents import LlmAgent
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
 from google.adk.tools import google_search
 from google.genai import types as genai_types
 
 from common.config import config
 
+# Invocation-scoped state key holding the final response recorded by
+# `record_final_response_callback` until the agent's after_agent_callback runs.
+FINAL_RESPONSE_STATE_KEY = "temp:discovery_final_response"
 
-def citation_replacement_callback(
+
+def _response_text(content: genai_types.Content | None) -> str:
+    if not content or not content.parts:
+        return ""
+    return "".join(
+        part.text for part in content.parts if part.text and not part.thought
+    )
+
+
+def _web_sources(
+    grounding_metadata: genai_types.GroundingMetadata | None,
+) -> list[dict[str, str]]:
+    """Returns the web sources of a response, deduplicated by URI in order."""
+    sources: dict[str, dict[str, str]] = {}
+    for chunk in (grounding_metadata and grounding_metadata.grounding_chunks) or []:
+        if chunk.web and chunk.web.uri and chunk.web.uri not in sources:
+            sources[chunk.web.uri] = {
+                "uri": chunk.web.uri,
+                "title": chunk.web.title or "",
+            }
+    return list(sources.values())
+
+
+def record_final_response_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """Remembers the agent's latest complete text response and its sources.
+
+    Lets `citation_replacement_callback` find the final response without
+    scanning the session's events.
+    """
+    content = llm_response.content
+    if llm_response.partial or not (text := _response_text(content)):
+        return
+    if any(part.function_call for part in (content and content.parts) or []):
+        return
+    callback_context.state[FINAL_RESPONSE_STATE_KEY] = {
+        "text": text,
+        "sources": _web_sources(llm_response.grounding_metadata),
+    }
+
+
+def _last_final_response(
     callback_context: CallbackContext,
-) -> genai_types.Content:
-    """Appends a formatted list of sources to the agent's response."""
+) -> tuple[str, list[dict[str, str]]] | None:
+    """Scans the session backwards for the agent's last final response.
+
+    Only used when no response was recorded, e.g. when the response came from
+    a callback instead of the model.
+    """
     session = callback_context._invocation_context.session
-    final_response = ""
-    # Find the last agent response event to get the text and grounding.
     for event in reversed(session.events):
-        if (
-            event.author == callback_context._invocation_context.agent.name
-            and event.is_final_response()
-        ):
-            final_response = event.content.parts[0].text if event.content.parts else ""
-            grounding_metadata = event.grounding_metadata
-            break
-    else:
-        return None  # Should not happen if the agent produced a response.
+        if event.author == callback_context.agent_name and event.is_final_response():
+            return _response_text(event.content), _web_sources(event.grounding_metadata)
+    return None
 
-    sources = []
-    if grounding_metadata:
-        for chunk in grounding_metadata.grounding_chunks:
-            if hasattr(chunk, "web") and chunk.web and chunk.web.uri:
-                sources.append(
-                    {"uri": chunk.web.uri, "title": chunk.web.title}
-                )
-
-    # Append the sources to the final report
-    output = f"# Discovery Report\n\n{final_response}"
-    output += "\n\n---\n\n## Sources\n"
 
+def build_discovery_report(final_response: str, sources: list[dict[str, str]]) -> str:
+    """Formats the response as a Markdown report followed by its sources."""
+    lines = [f"# Discovery Report\n\n{final_response}", "\n---\n", "## Sources"]
     if not sources:
-        output += "No web sources were cited for this report."
+        lines.append("No web sources were cited for this report.")
+    for i, source in enumerate(sources, start=1):
+        title = source["title"].strip() or source["uri"]
+        lines.append(f"{i}. [{title}]({source['uri']})")
+    return "\n".join(lines) + "\n"
+
+
+def citation_replacement_callback(
+    callback_context: CallbackContext,
+) -> genai_types.Content | None:
+    """Appends a formatted list of sources to the agent's response."""
+    final: tuple[str, list[dict[str, str]]] | None
+    recorded = callback_context.state.get(FINAL_RESPONSE_STATE_KEY)
+    if recorded:
+        callback_context.state[FINAL_RESPONSE_STATE_KEY] = None
+        final = recorded["text"], recorded["sources"]
     else:
-        for i, source in enumerate(sources):
-            title = source.get("title", "").strip() or source.get("uri")
-            output += f"{i+1}. [{title}]({source.get('uri')})\n"
+        final = _last_final_response(callback_context)
+    if final is None:
+        return None  # Should not happen if the agent produced a response.
 
     # Return a new Content object to replace the original agent output
-    return genai_types.Content(parts=[genai_types.Part(text=output)])
+    report = build_discovery_report(*final)
+    return genai_types.Content(parts=[genai_types.Part(text=report)])
 
 
 # --- AGENT DEFINITION ---
 # This agent is adapted from the Python code provided from AI Studio.
-# root_agent = LlmAgent(
-#     model=config.worker_model,
-#     name="account_discovery_agent",
-#     description="Performs a deep analysis of a company based on its website.",
-#     instruction='''You are an expert business analyst and account discovery agent. Your task is to perform a deep analysis of the company at the website: {url}.
-#
-# Provide a comprehensive report in well-structured Markdown format.
-#
-# Specifically, I need you to focus on the following key areas:
-# {selected_prompts}
-#
-# In addition to the above, please address the following specific instructions:
-# "{custom_instructions}"
-#
-# Begin your analysis now. Ensure your report is detailed, insightful, and directly based on the information available from your search.
-# ''',
-#     tools=[google_search],
-#     after_agent_callback=citation_replacement_callback,
-# )
+DISCOVERY_INSTRUCTION = """You are an expert business analyst and account discovery agent. Your task is to perform a deep analysis of the company at the website: {url}.
+
+Provide a comprehensive report in well-structured Markdown format.
+
+Specifically, I need you to focus on the following key areas:
+{selected_prompts}
+
+In addition to the above, please address the following specific instructions:
+"{custom_instructions}"
+
+Begin your analysis now. Ensure your report is detailed, insightful, and directly based on the information available from your search.
+"""
+
+
+def create_discovery_agent() -> LlmAgent:
+    """Returns the agent that writes one account's discovery report.
+
+    Unlike the interactive chat agent, it works from the session state set
+    per account (`url`, `selected_prompts`, `custom_instructions`).
+    """
+    return LlmAgent(
+        model=config.worker_model,
+        name="account_discovery_agent",
+        description="Performs a deep analysis of a company based on its website.",
+        instruction=DISCOVERY_INSTRUCTION,
+        tools=[google_search],
+        after_model_callback=record_final_response_callback,
+        after_agent_callback=citation_replacement_callback,
+    )
+
+
 from account_discovery_agent.smart_chat_agent import create_smart_chat_agent
 
-root_agent = create_smart_chat_agent()
+# SMART_CHAT_PARALLEL=true queries CRM data and market news concurrently on every
+# question instead of letting the advisor transfer to one retriever at a time.
+root_agent = create_smart_chat_agent(
+    parallel=os.environ.get("SMART_CHAT_PARALLEL", "false").lower()
+    in ("1", "true", "yes")
+)
@@ -1,19 +1,31 @@
 
-from google.adk.agents import Agent
+from google.adk.agents import Agent, BaseAgent, ParallelAgent, SequentialAgent
 from typing import Optional
 
 from common.config import config
 
+# State keys the retrievers write to in parallel mode.
+INTERNAL_DATA_KEY = "internal_account_data"
+EXTERNAL_NEWS_KEY = "external_market_news"
 
-def create_smart_chat_agent(role: str = "Key Account Executive") -> Agent:
+
+def create_smart_chat_agent(
+    role: str = "Key Account Executive", parallel: bool = False
+) -> BaseAgent:
     """
     Creates a smart chat agent that can take on different roles.
 
+    By default the advisor transfers to one retriever at a time. With
+    `parallel=True`, both retrievers run concurrently on every question and
+    write their findings to separate state keys, and the advisor then
+    synthesizes an answer from both in a single model call.
+
     Args:
         role: The role for the agent to play (e.g., "Key Account Executive").
+        parallel: Run the retrievers concurrently before the advisor.
 
     Returns:
-        An Agent instance configured to act as a strategic advisor.
+        An agent configured to act as a strategic advisor.
     """
 
     # Define the internal agent for retrieving account data
@@ -22,6 +34,7 @@ def create_smart_chat_agent(role: str = "Key Account Executive") -> Agent:
         model=config.worker_model,
         instruction="You are an internal agent that retrieves account data from our CRM.",
         description="Retrieves internal account data from the CRM.",
+        output_key=INTERNAL_DATA_KEY if parallel else None,
     )
 
     # Define the external agent for retrieving market news
@@ -30,8 +43,32 @@ def create_smart_chat_agent(role: str = "Key Account Executive") -> Agent:
         model=config.worker_model,
         instruction="You are an external agent that finds recent market news about a company.",
         description="Finds recent market news and financial data about a company.",
+        output_key=EXTERNAL_NEWS_KEY if parallel else None,
     )
 
+    if parallel:
+        # Both retrievers see the user's question and run at the same time.
+        retrieval_stage = ParallelAgent(
+            name="account_data_retrieval",
+            description="Retrieves CRM data and market news about the account concurrently.",
+            sub_agents=[internal_agent, external_agent],
+        )
+        advisor_agent = Agent(
+            name="strategic_advisor",
+            model=config.critic_model,
+            instruction=f"You are an experienced {role} and a strategic advisor for the account. "
+                        "Answer the user's question about the account and provide strategic advice, "
+                        "synthesizing the information below.\n\n"
+                        f"Internal CRM data:\n{{{INTERNAL_DATA_KEY}?}}\n\n"
+                        f"Recent market news:\n{{{EXTERNAL_NEWS_KEY}?}}",
+            description="A smart chat agent that acts as a strategic advisor.",
+        )
+        return SequentialAgent(
+            name="strategic_advisor_pipeline",
+            description="Retrieves account data and news in parallel, then advises.",
+            sub_agents=[retrieval_stage, advisor_agent],
+        )
+
     # Define the coordinator agent
     coordinator_agent = Agent(
         name="strategic_advisor",
@@ -22,13 +22,18 @@ from google.adk.agents import BaseAgent, LlmAgent, LoopAgent, SequentialAgent
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
+from google.adk.models import LlmRequest
 from google.adk.planners import BuiltInPlanner
+from google.adk.sessions import Session
 from google.adk.tools import google_search
 from google.adk.tools.agent_tool import AgentTool
 from google.genai import types as genai_types
 from pydantic import BaseModel, Field
 
 from common.config import config
+from common.history import apply_history_policy
+from common.model_routing import ModelRouter
+from common.response_cache import ResponseCacheCallbacks, response_cache_from_env
 from common.tools import convert_and_upload_to_gcs, search_source_documents
 
 
@@ -57,23 +62,23 @@ class Feedback(BaseModel):
 
 
 # --- Callbacks ---
-def collect_research_sources_callback(callback_context: CallbackContext) -> None:
-    """Collects and organizes web-based research sources and their supported claims from agent events.
+SOURCES_EVENT_CURSOR_KEY = "sources_event_cursor"
 
-    This function processes the agent's `session.events` to extract web source details (URLs,
-    titles, domains from `grounding_chunks`) and associated text segments with confidence scores
-    (from `grounding_supports`). The aggregated source information and a mapping of URLs to short
-    IDs are cumulatively stored in `callback_context.state`.
 
-    Args:
-        callback_context (CallbackContext): The context object providing access to the agent's
-            session events and persistent state.
+def _scan_grounding_events(
+    events: list[Event], url_to_short_id: dict, sources: dict
+) -> tuple[dict, dict[str, list]]:
+    """Adds the web sources and claims grounded in `events` to the maps in place.
+
+    Returns:
+        tuple[dict, dict[str, list]]: The sources first seen in `events`, keyed
+            by short ID, and the claims added to previously known sources,
+            keyed by short ID.
     """
-    session = callback_context._invocation_context.session
-    url_to_short_id = callback_context.state.get("url_to_short_id", {})
-    sources = callback_context.state.get("sources", {})
+    new_sources: dict = {}
+    new_claims: dict[str, list] = {}
     id_counter = len(url_to_short_id) + 1
-    for event in session.events:
+    for event in events:
         if not (event.grounding_metadata and event.grounding_metadata.grounding_chunks):
             continue
         chunks_info = {}
@@ -96,6 +101,7 @@ def collect_research_sources_callback(callback_context: CallbackContext) -> None
                     "domain": chunk.web.domain,
                     "supported_claims": [],
                 }
+                new_sources[short_id] = sources[short_id]
                 id_counter += 1
             chunks_info[idx] = url_to_short_id[url]
         if event.grounding_metadata.grounding_supports:
@@ -109,14 +115,95 @@ def collect_research_sources_callback(callback_context: CallbackContext) -> None
                             confidence_scores[i] if i < len(confidence_scores) else 0.5
                         )
                         text_segment = support.segment.text if support.segment else ""
-                        sources[short_id]["supported_claims"].append(
-                            {
-                                "text_segment": text_segment,
-                                "confidence": confidence,
-                            }
-                        )
-    callback_context.state["url_to_short_id"] = url_to_short_id
-    callback_context.state["sources"] = sources
+                        claim = {
+                            "text_segment": text_segment,
+                            "confidence": confidence,
+                        }
+                        sources[short_id]["supported_claims"].append(claim)
+                        if short_id not in new_sources:
+                            new_claims.setdefault(short_id, []).append(claim)
+    return new_sources, new_claims
+
+
+def sync_research_sources(session: Session) -> tuple[dict, dict[str, list]]:
+    """Brings the cumulative source map up to date with the session's events.
+
+    The full `sources` and `url_to_short_id` maps are kept on `session.state`
+    directly rather than through the state delta, so they are not copied into
+    every event. Only events after `SOURCES_EVENT_CURSOR_KEY` are scanned. The
+    cursor itself is persisted (see `collect_research_sources_callback`), so
+    when the maps are missing (e.g. the session was reloaded from storage) they
+    are rebuilt from the events before it without reporting those sources as
+    new again.
+
+    Args:
+        session (Session): The current session.
+
+    Returns:
+        tuple[dict, dict[str, list]]: The sources first seen in the new events,
+            keyed by short ID, and the claims added to previously known
+            sources, keyed by short ID.
+    """
+    state = session.state
+    cursor = state.get(SOURCES_EVENT_CURSOR_KEY, 0)
+    if "url_to_short_id" not in state or "sources" not in state:
+        state["url_to_short_id"] = {}
+        state["sources"] = {}
+        _scan_grounding_events(
+            session.events[:cursor], state["url_to_short_id"], state["sources"]
+        )
+    new_sources, new_claims = _scan_grounding_events(
+        session.events[cursor:], state["url_to_short_id"], state["sources"]
+    )
+    state[SOURCES_EVENT_CURSOR_KEY] = len(session.events)
+    return new_sources, new_claims
+
+
+def collect_research_sources_callback(callback_context: CallbackContext) -> None:
+    """Collects and organizes web-based research sources and their supported claims from agent events.
+
+    This function processes the agent's `session.events` to extract web source details (URLs,
+    titles, domains from `grounding_chunks`) and associated text segments with confidence scores
+    (from `grounding_supports`). The cumulative source map is kept server-side (see
+    `sync_research_sources`); the state delta only carries what changed:
+    `sources_appended` (newly found sources), `source_claims_appended` (new claims for
+    known sources), `source_count` and the event cursor the delta was taken at.
+
+    Args:
+        callback_context (CallbackContext): The context object providing access to the agent's
+            session events and persistent state.
+    """
+    session = callback_context._invocation_context.session
+    new_sources, new_claims = sync_research_sources(session)
+    if new_sources or new_claims:
+        callback_context.state["sources_appended"] = new_sources
+        callback_context.state["source_claims_appended"] = new_claims
+        callback_context.state["source_count"] = len(session.state["url_to_short_id"])
+        callback_context.state[SOURCES_EVENT_CURSOR_KEY] = session.state[
+            SOURCES_EVENT_CURSOR_KEY
+        ]
+
+
+def prepare_sources_callback(callback_context: CallbackContext) -> None:
+    """Makes sure the source map exists before the report composer is prompted."""
+    sync_research_sources(callback_context._invocation_context.session)
+
+
+def history_window_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Trims the session history sent to the model per the agent's HistoryPolicy.
+
+    Policies are looked up by agent name in `config.history_policies`; agents
+    without one send their full history.
+
+    Args:
+        callback_context (CallbackContext): Identifies the agent being called.
+        llm_request (LlmRequest): The request whose `contents` are windowed in place.
+    """
+    policy = config.history_policies.get(callback_context.agent_name)
+    if policy is not None:
+        llm_request.contents = apply_history_policy(llm_request.contents, policy)
 
 
 def citation_replacement_callback(
@@ -180,8 +267,19 @@ class EscalationChecker(BaseAgent):
 
 
 # --- AGENT DEFINITIONS ---
+# Applies config.model_routes and keeps latency/cost stats per agent and model.
+model_router = ModelRouter(config.model_routes)
+# Planning calls are often repeated verbatim when a plan is re-run or refreshed.
+response_cache = response_cache_from_env()
+plan_generator_cache = ResponseCacheCallbacks(response_cache)
+# The section outline only depends on the approved plan, which is templated
+# into section_planner's instruction; it does not see earlier turns.
+section_planner_cache = ResponseCacheCallbacks(
+    response_cache, state_keys=("research_plan",), include_contents=False
+)
+
 plan_generator = LlmAgent(
-    model=config.worker_model,
+    model=config.model_for("plan_generator", config.worker_model),
     name="plan_generator",
     description="Generates or refine the existing 5 line action-oriented research plan, using minimal search only for topic clarification.",
     instruction=f"""
@@ -217,15 +315,27 @@ plan_generator = LlmAgent(
     Current date: {datetime.datetime.now().strftime("%Y-%m-%d")}
     """,
     tools=[google_search],
+    before_model_callback=[
+        plan_generator_cache.before_model_callback,
+        model_router.before_model_callback,
+    ],
+    after_model_callback=[
+        model_router.after_model_callback,
+        plan_generator_cache.after_model_callback,
+    ],
 )
 
 
 section_planner = LlmAgent(
-    model=config.worker_model,
+    model=config.model_for("section_planner", config.worker_model),
     name="section_planner",
     description="Breaks down the research plan into a structured markdown outline of report sections.",
     instruction="""
-    You are an expert report architect. Using the research topic and the plan from the 'research_plan' state key, design a logical structure for the final report.
+    You are an expert report architect. Using the research plan below, design a logical structure for the final report.
+
+    RESEARCH PLAN:
+    {research_plan}
+
     Note: Ignore all the tag nanes ([MODIFIED], [NEW], [RESEARCH], [DELIVERABLE]) in the research plan.
     Your task is to create a markdown outline with 4-6 distinct sections that cover the topic comprehensively without overlap.
     You can use any markdown format you prefer, but here's a suggested structure:
@@ -235,12 +345,23 @@ section_planner = LlmAgent(
     Make sure your outline is clear and easy to follow.
     Do not include a "References" or "Sources" section in your outline. Citations will be handled in-line.
     """,
+    # The plan is templated into the instruction, so the outline does not
+    # depend on the earlier conversation.
+    include_contents="none",
     output_key="report_sections",
+    before_model_callback=[
+        section_planner_cache.before_model_callback,
+        model_router.before_model_callback,
+    ],
+    after_model_callback=[
+        model_router.after_model_callback,
+        section_planner_cache.after_model_callback,
+    ],
 )
 
 
 section_researcher = LlmAgent(
-    model=config.worker_model,
+    model=config.model_for("section_researcher", config.worker_model),
     name="section_researcher",
     description="Answers questions by searching private documents and the web.",
     planner=BuiltInPlanner(
@@ -257,10 +378,12 @@ section_researcher = LlmAgent(
     tools=[google_search, search_source_documents],
     output_key="section_research_findings",
     after_agent_callback=collect_research_sources_callback,
+    before_model_callback=[history_window_callback, model_router.before_model_callback],
+    after_model_callback=model_router.after_model_callback,
 )
 
 research_evaluator = LlmAgent(
-    model=config.critic_model,
+    model=config.model_for("research_evaluator", config.critic_model),
     name="research_evaluator",
     description="Critically evaluates research and generates follow-up queries.",
     instruction=f"""
@@ -284,10 +407,12 @@ research_evaluator = LlmAgent(
     disallow_transfer_to_parent=True,
     disallow_transfer_to_peers=True,
     output_key="research_evaluation",
+    before_model_callback=[history_window_callback, model_router.before_model_callback],
+    after_model_callback=model_router.after_model_callback,
 )
 
 enhanced_search_executor = LlmAgent(
-    model=config.worker_model,
+    model=config.model_for("enhanced_search_executor", config.worker_model),
     name="enhanced_search_executor",
     description="Executes follow-up searches and integrates new findings.",
     planner=BuiltInPlanner(
@@ -305,10 +430,12 @@ enhanced_search_executor = LlmAgent(
     tools=[google_search],
     output_key="section_research_findings",
     after_agent_callback=collect_research_sources_callback,
+    before_model_callback=[history_window_callback, model_router.before_model_callback],
+    after_model_callback=model_router.after_model_callback,
 )
 
 report_composer = LlmAgent(
-    model=config.critic_model,
+    model=config.model_for("report_composer_with_citations", config.critic_model),
     name="report_composer_with_citations",
     include_contents="none",
     description="Transforms research data and a markdown outline into a final, cited report.",
@@ -335,7 +462,10 @@ report_composer = LlmAgent(
     Do not include a "References" or "Sources" section; all citations must be in-line.
     """,
     output_key="final_cited_report",
+    before_agent_callback=prepare_sources_callback,
     after_agent_callback=citation_replacement_callback,
+    before_model_callback=model_router.before_model_callback,
+    after_model_callback=model_router.after_model_callback,
 )
 
 research_pipeline = SequentialAgent(
@@ -359,7 +489,7 @@ research_pipeline = SequentialAgent(
 
 interactive_planner_agent = LlmAgent(
     name="interactive_planner_agent",
-    model=config.worker_model,
+    model=config.model_for("interactive_planner_agent", config.worker_model),
     description="The primary research assistant. It collaborates with the user to create a research plan, and then executes it upon approval.",
     instruction=f"""
     You are a research planning assistant. Your primary function is to convert ANY user request into a research plan.
@@ -378,6 +508,9 @@ interactive_planner_agent = LlmAgent(
     sub_agents=[research_pipeline],
     tools=[AgentTool(plan_generator)],
     output_key="research_plan",
+    after_agent_callback=model_router.log_stats_callback,
+    before_model_callback=[history_window_callback, model_router.before_model_callback],
+    after_model_callback=model_router.after_model_callback,
 )
 
 root_agent = interactive_planner_agent
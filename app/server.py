@@ -0,0 +1,28 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""API server for the research agent, as used by the React frontend.
+
+Serves `app` like `adk api_server app`, plus the coalescing of streamed
+planner and composer tokens from common/web_app.py, and answers the
+Streamlit chat at `/stream_messages`:
+
+    uv run uvicorn app.server:app --port 8000
+"""
+
+import os
+
+from common.web_app import create_web_app
+
+app = create_web_app(os.path.dirname(os.path.abspath(__file__)), chat_app_name="app")
@@ -14,13 +14,18 @@
 
 import mimetypes
 import os
-from io import BytesIO
 
 from google.cloud import storage
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 import requests
 
+# The text-to-PDF conversion lives in common.tools; re-exported here so both
+# agent packages share a single implementation.
+from common.tools import (  # noqa: F401
+    convert_and_upload_batch_to_gcs,
+    convert_and_upload_to_gcs,
+)
+
+
 def search_source_documents(accountName: str, query: str) -> dict:
     """
     Searches the private source documents for a specific account.
@@ -90,39 +95,3 @@ def upload_and_process_document(file_path: str) -> dict:
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
-
-
-def convert_and_upload_to_gcs(file_path: str, bucket_name: str) -> dict:
-    """Converts a text file to PDF and uploads it to a GCS bucket.
-
-    Args:
-        file_path (str): The local path to the text file.
-        bucket_name (str): The name of the GCS bucket.
-
-    Returns:
-        dict: A dictionary containing the status and the GCS path of the uploaded file.
-    """
-    try:
-        with open(file_path, "r") as f:
-            file_content = f.read()
-
-        pdf_buffer = BytesIO()
-        c = canvas.Canvas(pdf_buffer, pagesize=letter)
-        text_object = c.beginText(40, 750)
-        text_object.setFont("Helvetica", 12)
-        for line in file_content.splitlines():
-            text_object.textLine(line)
-        c.drawText(text_object)
-        c.save()
-        pdf_buffer.seek(0)
-
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        gcs_pdf_name = file_path.replace(".txt", ".pdf")
-        blob = bucket.blob(gcs_pdf_name)
-        blob.upload_from_file(pdf_buffer, content_type="application/pdf")
-
-        gcs_path = f"gs://{bucket_name}/{gcs_pdf_name}"
-        return {"status": "success", "gcs_path": gcs_path}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
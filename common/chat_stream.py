@@ -0,0 +1,213 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`/stream_messages` endpoint for the Streamlit chat, backed by ADK sessions.
+
+The Streamlit client posts LangChain-style message dicts and reads back
+`[message, metadata]` pairs over SSE. The chat history is kept in the ADK
+session with the chat's ID, so the client only has to send what the server
+has not seen yet:
+
+- `config.metadata.history_offset` is the number of leading messages the
+  server already holds; `input.messages` are the messages after it. The last
+  human message is the new turn; the AI and tool messages before it are the
+  server's own previous reply and are skipped.
+- An offset of 0 is a full sync: the session is rebuilt from the messages.
+- If the session is missing or holds a different number of messages (e.g.
+  the store was reset), the server answers `{"type": "history_mismatch"}`
+  and the client resends the full history.
+- After a turn, `{"type": "history_synced", "message_count": n}` tells the
+  client that the server holds its first n messages.
+"""
+
+import base64
+import functools
+import json
+import uuid
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types as genai_types
+
+HISTORY_SYNCED_EVENT = "history_synced"
+HISTORY_MISMATCH_EVENT = "history_mismatch"
+# Session state key with the number of chat messages the session holds.
+MESSAGE_COUNT_STATE_KEY = "chat_message_count"
+
+
+def _part(part: dict[str, Any]) -> genai_types.Part | None:
+    if part["type"] == "text":
+        return genai_types.Part(text=part["text"])
+    if part["type"] == "image_url":
+        header, encoded = part["image_url"]["url"].split(",", 1)
+        mime_type = header.removeprefix("data:").split(";", 1)[0]
+        return genai_types.Part.from_bytes(
+            data=base64.b64decode(encoded), mime_type=mime_type
+        )
+    if part["type"] == "media" and "data" in part:
+        return genai_types.Part.from_bytes(
+            data=base64.b64decode(part["data"]), mime_type=part["mime_type"]
+        )
+    if part["type"] == "media" and "file_uri" in part:
+        return genai_types.Part.from_uri(
+            file_uri=part["file_uri"], mime_type=part["mime_type"]
+        )
+    return None
+
+
+def message_to_content(message: dict[str, Any]) -> genai_types.Content | None:
+    """Converts a human or AI chat message to Content; None for other messages.
+
+    AI messages that only carry tool calls, and tool messages, have no
+    text to replay and are skipped.
+    """
+    if message["type"] not in ("human", "ai"):
+        return None
+    content = message["content"]
+    if isinstance(content, str):
+        parts = [genai_types.Part(text=content)] if content else []
+    else:
+        parts = [p for p in map(_part, content) if p is not None]
+    if not parts:
+        return None
+    return genai_types.Content(
+        role="user" if message["type"] == "human" else "model", parts=parts
+    )
+
+
+def event_to_messages(event: Event) -> list[dict[str, Any]]:
+    """Converts an ADK event to the message dicts the Streamlit client reads."""
+    messages: list[dict[str, Any]] = []
+    if calls := event.get_function_calls():
+        tool_calls = [
+            {"name": call.name, "args": call.args or {}, "id": call.id}
+            for call in calls
+        ]
+        messages.append({"type": "ai", "content": "", "tool_calls": tool_calls})
+    for response in event.get_function_responses():
+        messages.append(
+            {
+                "type": "tool",
+                "content": json.dumps(response.response, default=str),
+                "tool_call_id": response.id,
+            }
+        )
+    text = "".join(
+        part.text
+        for part in ((event.content.parts or []) if event.content else [])
+        if part.text and not part.thought
+    )
+    if text:
+        messages.append(
+            {"type": "AIMessageChunk" if event.partial else "ai", "content": text}
+        )
+    return [{"type": "constructor", "kwargs": message} for message in messages]
+
+
+class ChatStream:
+    """Runs chat turns sent by the Streamlit client against an ADK Runner.
+
+    Args:
+        runner: Runner for the chat agent; its session service holds the
+            chat histories.
+    """
+
+    def __init__(self, runner: Runner) -> None:
+        self.runner = runner
+
+    async def _rebuild_session(
+        self, user_id: str, session_id: str, history: list[dict[str, Any]]
+    ) -> None:
+        """Replaces the session with one holding `history`."""
+        service = self.runner.session_service
+        app_name = self.runner.app_name
+        if await service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        ):
+            await service.delete_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+        session = await service.create_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        invocation_id = f"sync-{uuid.uuid4().hex}"
+        for message in history:
+            if content := message_to_content(message):
+                author = "user" if content.role == "user" else self.runner.agent.name
+                await service.append_event(
+                    session,
+                    Event(invocation_id=invocation_id, author=author, content=content),
+                )
+
+    async def stream(self, request: dict[str, Any]) -> AsyncIterator[Any]:
+        """Runs one turn, yielding control events and `[message, {}]` pairs."""
+        metadata = request["config"]["metadata"]
+        user_id, session_id = metadata["user_id"], metadata["session_id"]
+        history_offset = int(metadata.get("history_offset") or 0)
+        messages = request["input"]["messages"]
+        last_human = max(
+            (i for i, m in enumerate(messages) if m["type"] == "human"), default=None
+        )
+        new_message = (
+            None if last_human is None else message_to_content(messages[last_human])
+        )
+        if last_human is None or new_message is None:
+            raise ValueError("The request has no human message to answer.")
+
+        if history_offset:
+            session = await self.runner.session_service.get_session(
+                app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+            )
+            if (
+                session is None
+                or session.state.get(MESSAGE_COUNT_STATE_KEY) != history_offset
+            ):
+                yield {"type": HISTORY_MISMATCH_EVENT}
+                return
+        else:
+            await self._rebuild_session(user_id, session_id, messages[:last_human])
+
+        message_count = history_offset + len(messages)
+        async for event in self.runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=new_message,
+            state_delta={MESSAGE_COUNT_STATE_KEY: message_count},
+        ):
+            for message in event_to_messages(event):
+                yield [message, {}]
+        yield {"type": HISTORY_SYNCED_EVENT, "message_count": message_count}
+
+
+def add_chat_stream_route(app: FastAPI, get_runner: Callable[[], Runner]) -> None:
+    """Serves `ChatStream` at `POST /stream_messages`.
+
+    Args:
+        app: The server to add the route to.
+        get_runner: Returns the chat runner; called on the first request, so
+            the agent is only loaded when the chat is used.
+    """
+    chat_stream = functools.cache(lambda: ChatStream(get_runner()))
+
+    @app.post("/stream_messages")
+    async def stream_messages(request: dict[str, Any]) -> StreamingResponse:
+        async def sse() -> AsyncIterator[str]:
+            async for item in chat_stream().stream(request):
+                yield f"data: {json.dumps(item)}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
@@ -13,10 +13,13 @@
 # limitations under the License.
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import google.auth
 
+from common.history import HistoryPolicy
+from common.model_routing import ModelRoute
+
 # To use AI Studio credentials:
 # 1. Create a .env file in the /app directory with:
 #    GOOGLE_GENAI_USE_VERTEXAI=FALSE
@@ -39,11 +42,50 @@ class ResearchConfiguration:
         critic_model (str): Model for evaluation tasks.
         worker_model (str): Model for working/generation tasks.
         max_search_iterations (int): Maximum search iterations allowed.
+        history_policies (dict[str, HistoryPolicy]): Session history windowing
+            per agent name; agents without an entry get the full history.
+        model_routes (dict[str, ModelRoute]): Model and downgrade rules per
+            agent name; see `model_for` and `common.model_routing`.
     """
 
     critic_model: str = "gemini-2.5-pro"
     worker_model: str = "gemini-2.5-flash"
     max_search_iterations: int = 5
+    history_policies: dict[str, HistoryPolicy] = field(
+        default_factory=lambda: {
+            "interactive_planner_agent": HistoryPolicy(max_turns=6),
+            # The pipeline runs within the user's approval turn and reads the
+            # plan from the turns just before it; older turns are summarized
+            # and earlier search results truncated.
+            "section_researcher": HistoryPolicy(max_turns=4),
+            "research_evaluator": HistoryPolicy(max_turns=4),
+            "enhanced_search_executor": HistoryPolicy(max_turns=4),
+        }
+    )
+    model_routes: dict[str, ModelRoute] = field(
+        default_factory=lambda: {
+            # Early evaluations and thin findings rarely need Pro to be judged;
+            # later iterations of the refinement loop escalate to it.
+            "research_evaluator": ModelRoute(
+                fast_model="gemini-2.5-flash",
+                fast_iterations=1,
+                fast_max_findings_chars=3000,
+            ),
+        }
+    )
+
+    def model_for(self, agent_name: str, default: str) -> str:
+        """Returns the model an agent is built with.
+
+        Args:
+            agent_name (str): Name of the agent.
+            default (str): The agent's default tier, e.g. `critic_model`.
+
+        Returns:
+            str: The model from the agent's route, or `default`.
+        """
+        route = self.model_routes.get(agent_name)
+        return route.model if route and route.model else default
 
 
 config = ResearchConfiguration()
@@ -0,0 +1,184 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Windowing of the session history sent with each LLM request.
+
+ADK sends every prior event of the session to agents with the default
+`include_contents`, so prompts grow with the age of a session. A
+HistoryPolicy trims the request contents before the model is called: it
+keeps the last N turns, strips thought parts and large tool payloads from
+earlier messages, and replaces the dropped turns with a short extractive
+summary.
+
+A turn starts at a message from the user. The output of other agents, which
+ADK passes on as "For context:" user messages, belongs to the turn it
+happened in. The agent's own in-flight tool calls at the end of the request
+are never modified.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+
+from google.genai import types as genai_types
+
+SUMMARY_HEADER = "Summary of earlier conversation (older turns omitted):"
+FOREIGN_CONTEXT_PREFIX = "For context:"
+
+# Tool results of other agents are inlined by ADK as text parts like
+# "[agent] `tool` tool returned result: {...}".
+_FOREIGN_TOOL_RESULT = re.compile(r"^\[[^\]]+\] `[^`]+` tool returned result: ")
+
+
+@dataclass
+class HistoryPolicy:
+    """How much session history an agent sends to the model.
+
+    Attributes:
+        max_turns (int | None): Number of most recent turns to keep; None keeps
+            all of them.
+        drop_thoughts (bool): Remove thought parts from earlier messages.
+        max_tool_payload_chars (int | None): Tool results in earlier messages
+            longer than this are truncated; None keeps them whole.
+        summarize_dropped_turns (bool): Replace turns beyond `max_turns` with an
+            extractive summary instead of dropping them silently.
+        summary_max_chars (int): Upper bound on the length of that summary.
+    """
+
+    max_turns: int | None = None
+    drop_thoughts: bool = True
+    max_tool_payload_chars: int | None = 2000
+    summarize_dropped_turns: bool = True
+    summary_max_chars: int = 2000
+
+
+def _is_user_text(content: genai_types.Content) -> bool:
+    return content.role == "user" and not any(
+        part.function_response for part in content.parts or []
+    )
+
+
+def _starts_turn(content: genai_types.Content) -> bool:
+    parts = content.parts or []
+    return _is_user_text(content) and not (
+        parts and parts[0].text == FOREIGN_CONTEXT_PREFIX
+    )
+
+
+def split_turns(
+    contents: list[genai_types.Content],
+) -> list[list[genai_types.Content]]:
+    """Groups request contents into turns, oldest first."""
+    turns: list[list[genai_types.Content]] = []
+    for content in contents:
+        if not turns or _starts_turn(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} characters omitted]"
+
+
+def _trim_part(
+    part: genai_types.Part, policy: HistoryPolicy
+) -> genai_types.Part | None:
+    if policy.drop_thoughts and part.thought:
+        return None
+    limit = policy.max_tool_payload_chars
+    if limit is None:
+        return part
+    if part.function_response and part.function_response.response:
+        payload = json.dumps(part.function_response.response, default=str)
+        if len(payload) > limit:
+            response = part.function_response.model_copy(
+                update={"response": {"result": _truncate(payload, limit)}}
+            )
+            return part.model_copy(update={"function_response": response})
+    elif part.text and _FOREIGN_TOOL_RESULT.match(part.text):
+        return part.model_copy(update={"text": _truncate(part.text, limit)})
+    return part
+
+
+def _trim_content(
+    content: genai_types.Content, policy: HistoryPolicy
+) -> genai_types.Content | None:
+    parts = [
+        trimmed
+        for part in content.parts or []
+        if (trimmed := _trim_part(part, policy)) is not None
+    ]
+    if not parts:
+        return None
+    return genai_types.Content(role=content.role, parts=parts)
+
+
+def summarize_turns(turns: list[list[genai_types.Content]], max_chars: int) -> str:
+    """Builds an extractive summary: the first line of each message's text."""
+    lines = []
+    for turn in turns:
+        for content in turn:
+            for part in content.parts or []:
+                if part.thought or not part.text or part.text == FOREIGN_CONTEXT_PREFIX:
+                    continue
+                if _FOREIGN_TOOL_RESULT.match(part.text):
+                    continue
+                first_line = part.text.strip().split("\n", 1)[0]
+                if first_line:
+                    lines.append(f"- {content.role}: {_truncate(first_line, 200)}")
+                break
+    summary = "\n".join(lines)
+    # Keep the most recent part of the summary if it is too long.
+    if len(summary) > max_chars:
+        summary = "..." + summary[-max_chars:]
+    return summary
+
+
+def apply_history_policy(
+    contents: list[genai_types.Content], policy: HistoryPolicy
+) -> list[genai_types.Content]:
+    """Returns the request contents trimmed according to `policy`."""
+    turns = split_turns(contents)
+    dropped: list[list[genai_types.Content]] = []
+    if policy.max_turns is not None and len(turns) > policy.max_turns:
+        keep = max(policy.max_turns, 1)
+        dropped, turns = turns[:-keep], turns[-keep:]
+    kept = [content for turn in turns for content in turn]
+
+    # The agent's own pending function calls and responses, after the last
+    # user text, go out unchanged: the model needs them (and their thought
+    # signatures) to continue.
+    tail_start = next(
+        (i + 1 for i in range(len(kept) - 1, -1, -1) if _is_user_text(kept[i])), 0
+    )
+    windowed: list[genai_types.Content] = []
+    if dropped and policy.summarize_dropped_turns:
+        summary = summarize_turns(dropped, policy.summary_max_chars)
+        if summary:
+            windowed.append(
+                genai_types.Content(
+                    role="user",
+                    parts=[genai_types.Part(text=f"{SUMMARY_HEADER}\n{summary}")],
+                )
+            )
+    windowed.extend(
+        trimmed
+        for content in kept[:tail_start]
+        if (trimmed := _trim_content(content, policy)) is not None
+    )
+    windowed.extend(kept[tail_start:])
+    return windowed
@@ -0,0 +1,215 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-agent model routing with latency and cost accounting.
+
+A ModelRoute lets an agent that normally runs on a slow, expensive model
+fall back to a fast one when the job is easy: on its first loop iterations,
+or when the findings it has to judge are short. ModelRouter applies the
+routes as a before_model_callback by rewriting `llm_request.model`, and
+records calls, latency, tokens and estimated cost per (agent, model) route
+in its after_model_callback. Use `log_stats_callback` as the root agent's
+after_agent_callback to log the totals at the end of every invocation.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+# USD per million input/output tokens (list prices for prompts up to 200k
+# tokens), used for cost estimates only.
+MODEL_PRICES_PER_MILLION_TOKENS = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+LATENCY_WINDOW = 1000
+# Model calls that raise never reach after_model_callback; their pending
+# entries are dropped once they are this old.
+PENDING_TTL_SECONDS = 600.0
+
+
+@dataclass
+class ModelRoute:
+    """When an agent may run on a faster model than the one it is built with.
+
+    Attributes:
+        model (str | None): Model the agent is built with; None keeps the
+            agent's default tier (critic or worker model).
+        fast_model (str | None): Model used when a downgrade rule matches;
+            None always uses the agent's own model.
+        fast_iterations (int): Use the fast model for the agent's first N calls
+            within one invocation (e.g. the first refinement loop iterations).
+        fast_max_findings_chars (int): Use the fast model while the state value
+            under `findings_state_key` is shorter than this many characters.
+        findings_state_key (str): State key holding the text being judged.
+    """
+
+    model: str | None = None
+    fast_model: str | None = None
+    fast_iterations: int = 0
+    fast_max_findings_chars: int = 0
+    findings_state_key: str = "section_research_findings"
+
+
+@dataclass
+class RouteStats:
+    """Accumulated usage of one (agent, model) route."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 4),
+            "p50_seconds": round(latencies[len(latencies) // 2], 3)
+            if latencies
+            else None,
+            "p95_seconds": round(latencies[int(len(latencies) * 0.95)], 3)
+            if latencies
+            else None,
+        }
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    """Estimates the cost of a call in USD; unknown models cost 0."""
+    input_price, output_price = MODEL_PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+class ModelRouter:
+    """Applies ModelRoutes to LLM requests and accounts for every call.
+
+    Args:
+        routes: ModelRoute per agent name; agents without a route keep their
+            model but are still accounted for.
+    """
+
+    def __init__(self, routes: dict[str, ModelRoute]) -> None:
+        self.routes = routes
+        self._stats: dict[tuple[str, str], RouteStats] = {}
+        # Model and start time of calls in flight, by (invocation, agent).
+        self._pending: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose_model(self, callback_context: CallbackContext, model: str) -> str:
+        """Returns the model to use for the agent's next call."""
+        route = self.routes.get(callback_context.agent_name)
+        if route is None or not route.fast_model:
+            return model
+        if route.fast_iterations:
+            invocation = callback_context._invocation_context
+            previous_calls = sum(
+                1
+                for event in invocation.session.events
+                if event.invocation_id == invocation.invocation_id
+                and event.author == callback_context.agent_name
+                and not event.partial
+            )
+            if previous_calls < route.fast_iterations:
+                return route.fast_model
+        findings = callback_context.state.get(route.findings_state_key) or ""
+        if len(str(findings)) < route.fast_max_findings_chars:
+            return route.fast_model
+        return model
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        model = self.choose_model(callback_context, llm_request.model or "")
+        if model != llm_request.model:
+            logging.info(
+                f"[{callback_context.agent_name}] Routing to {model}"
+                f" instead of {llm_request.model}."
+            )
+            llm_request.model = model
+        now = time.perf_counter()
+        with self._lock:
+            while (
+                self._pending
+                and now - next(iter(self._pending.values()))[1] >= PENDING_TTL_SECONDS
+            ):
+                self._pending.popitem(last=False)
+            pending_id = (callback_context.invocation_id, callback_context.agent_name)
+            self._pending.pop(pending_id, None)
+            self._pending[pending_id] = (model, now)
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        if llm_response.partial:
+            return
+        pending = self._pop_pending(callback_context)
+        if pending is None:
+            return
+        model, start = pending
+        usage = llm_response.usage_metadata
+        prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+        output_tokens = (
+            (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+            if usage
+            else 0
+        )
+        with self._lock:
+            stats = self._stats.setdefault(
+                (callback_context.agent_name, model), RouteStats()
+            )
+            stats.calls += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.output_tokens += output_tokens
+            stats.cost_usd += estimate_cost(model, prompt_tokens, output_tokens)
+            stats.latencies.append(time.perf_counter() - start)
+
+    def on_model_error_callback(
+        self, callback_context: CallbackContext, error: Exception
+    ) -> None:
+        """Forgets a model call that raised; failed calls are not accounted."""
+        self._pop_pending(callback_context)
+
+    def _pop_pending(
+        self, callback_context: CallbackContext
+    ) -> tuple[str, float] | None:
+        with self._lock:
+            return self._pending.pop(
+                (callback_context.invocation_id, callback_context.agent_name), None
+            )
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Returns a summary per route, keyed by "agent_name/model"."""
+        with self._lock:
+            return {
+                f"{agent_name}/{model}": stats.summary()
+                for (agent_name, model), stats in sorted(self._stats.items())
+            }
+
+    def log_stats_callback(self, callback_context: CallbackContext) -> None:
+        """Logs `stats()` as JSON; meant as the root agent's after_agent_callback."""
+        logging.info(
+            f"[{callback_context.agent_name}] Model routing stats:"
+            f" {json.dumps(self.stats())}"
+        )
@@ -0,0 +1,352 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""ADK session service backed by Redis (or any Redis-protocol store).
+
+Lets several server instances share sessions without sticky routing. Keys,
+all under `prefix`:
+
+    {prefix}:meta:{app}:{user}:{session}     hash: last_update_time, version
+    {prefix}:state:{app}:{user}:{session}    hash: session state, JSON values
+    {prefix}:events:{app}:{user}:{session}   list: events as JSON
+    {prefix}:sessions:{app}:{user}           sorted set: session IDs by update
+    {prefix}:app_state:{app}                 hash: `app:` state
+    {prefix}:user_state:{app}:{user}         hash: `user:` state
+
+Appends are optimistic: every write bumps the `version` in the meta hash,
+the service remembers the version each Session object was read at, and an
+append is rejected, as DatabaseSessionService does, if the stored version has
+moved on since (the object missed another writer's event). The comparison runs
+under WATCH, so it does not depend on the clocks of the instances.
+
+Requires the `redis` extra: `uv sync --extra redis`.
+"""
+
+import json
+import time
+import uuid
+import weakref
+from typing import Any
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from redis.typing import EncodableT, FieldT
+
+DEFAULT_SESSION_TTL_SECONDS = 7 * 24 * 3600
+MAX_APPEND_RETRIES = 5
+
+
+class RedisSessionService(BaseSessionService):
+    """A session service storing sessions, events and state in Redis.
+
+    Args:
+        client: A `redis.asyncio.Redis` client (or a compatible stand-in such
+            as `fakeredis.aioredis.FakeRedis`).
+        prefix: Prefix for all keys, to share a database between apps.
+        session_ttl_seconds: Sessions expire after this long without updates;
+            None keeps them forever.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        prefix: str = "adk",
+        session_ttl_seconds: int | None = DEFAULT_SESSION_TTL_SECONDS,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.session_ttl_seconds = session_ttl_seconds
+        # Stored version each Session object was read at, by id(session).
+        self._versions: dict[int, int] = {}
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisSessionService":
+        """Creates a service from a `redis://` or `rediss://` URL."""
+        return cls(Redis.from_url(url), **kwargs)
+
+    def _track_version(self, session: Session, version: int) -> None:
+        key = id(session)
+        if key not in self._versions:
+            weakref.finalize(session, self._versions.pop, key, None)
+        self._versions[key] = version
+
+    def _key(self, kind: str, *parts: str) -> str:
+        return ":".join((self.prefix, kind, *parts))
+
+    def _session_keys(self, app_name: str, user_id: str, session_id: str) -> tuple:
+        return tuple(
+            self._key(kind, app_name, user_id, session_id)
+            for kind in ("meta", "state", "events")
+        )
+
+    @staticmethod
+    def _encode(mapping: dict[str, Any]) -> dict[FieldT, EncodableT]:
+        return {key: json.dumps(value) for key, value in mapping.items()}
+
+    @staticmethod
+    def _decode(mapping: dict[Any, Any]) -> dict[str, Any]:
+        return {
+            (key.decode() if isinstance(key, bytes) else key): json.loads(value)
+            for key, value in mapping.items()
+        }
+
+    @staticmethod
+    def _split_state(delta: dict[str, Any]) -> tuple[dict, dict, dict]:
+        """Splits a state delta into app, user and session parts."""
+        app_state, user_state, session_state = {}, {}, {}
+        for key, value in delta.items():
+            if key.startswith(State.APP_PREFIX):
+                app_state[key.removeprefix(State.APP_PREFIX)] = value
+            elif key.startswith(State.USER_PREFIX):
+                user_state[key.removeprefix(State.USER_PREFIX)] = value
+            elif not key.startswith(State.TEMP_PREFIX):
+                session_state[key] = value
+        return app_state, user_state, session_state
+
+    async def _merged_state(
+        self, app_name: str, user_id: str, session_state: dict[str, Any]
+    ) -> dict[str, Any]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._key("app_state", app_name))
+        pipe.hgetall(self._key("user_state", app_name, user_id))
+        app_state, user_state = await pipe.execute()
+        state = dict(session_state)
+        for key, value in self._decode(app_state).items():
+            state[State.APP_PREFIX + key] = value
+        for key, value in self._decode(user_state).items():
+            state[State.USER_PREFIX + key] = value
+        return state
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        app_state, user_state, session_state = self._split_state(state or {})
+        meta_key, state_key, events_key = self._session_keys(
+            app_name, user_id, session_id
+        )
+        now = time.time()
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(meta_key)
+            if await pipe.exists(meta_key):
+                raise ValueError(f"Session {session_id} already exists.")
+            pipe.multi()
+            # Leftovers of an expired session with the same ID.
+            pipe.delete(state_key, events_key)
+            pipe.hset(meta_key, mapping={"last_update_time": now, "version": 0})
+            if session_state:
+                pipe.hset(state_key, mapping=self._encode(session_state))
+            if app_state:
+                pipe.hset(
+                    self._key("app_state", app_name), mapping=self._encode(app_state)
+                )
+            if user_state:
+                pipe.hset(
+                    self._key("user_state", app_name, user_id),
+                    mapping=self._encode(user_state),
+                )
+            pipe.zadd(self._key("sessions", app_name, user_id), {session_id: now})
+            self._expire(pipe, app_name, user_id, session_id)
+            try:
+                await pipe.execute()
+            except WatchError:
+                # Created concurrently by another writer.
+                raise ValueError(f"Session {session_id} already exists.") from None
+
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=await self._merged_state(app_name, user_id, session_state),
+            last_update_time=now,
+        )
+        self._track_version(session, 0)
+        return session
+
+    def _expire(self, pipe: Any, app_name: str, user_id: str, session_id: str) -> None:
+        if self.session_ttl_seconds is None:
+            return
+        for key in self._session_keys(app_name, user_id, session_id):
+            pipe.expire(key, self.session_ttl_seconds)
+        pipe.expire(self._key("sessions", app_name, user_id), self.session_ttl_seconds)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        meta_key, state_key, events_key = self._session_keys(
+            app_name, user_id, session_id
+        )
+        start = -config.num_recent_events if config and config.num_recent_events else 0
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(meta_key)
+        pipe.hgetall(state_key)
+        pipe.lrange(events_key, start, -1)
+        meta, session_state, raw_events = await pipe.execute()
+        if not meta:
+            return None
+
+        events = [Event.model_validate_json(raw) for raw in raw_events]
+        if config and config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=await self._merged_state(
+                app_name, user_id, self._decode(session_state)
+            ),
+            events=events,
+            last_update_time=float(meta[b"last_update_time"]),
+        )
+        self._track_version(session, int(meta[b"version"]))
+        return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        index_key = self._key("sessions", app_name, user_id)
+        session_ids = [
+            sid.decode() if isinstance(sid, bytes) else str(sid)
+            for sid in await self.client.zrange(index_key, 0, -1)
+        ]
+        if not session_ids:
+            return ListSessionsResponse()
+        pipe = self.client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hget(
+                self._key("meta", app_name, user_id, session_id), "last_update_time"
+            )
+        update_times = await pipe.execute()
+
+        sessions, expired = [], []
+        for session_id, update_time in zip(session_ids, update_times, strict=True):
+            if update_time is None:
+                expired.append(session_id)
+                continue
+            sessions.append(
+                Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    state={},
+                    last_update_time=float(update_time),
+                )
+            )
+        if expired:
+            # Sessions whose keys expired are dropped from the index lazily.
+            await self.client.zrem(index_key, *expired)
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(*self._session_keys(app_name, user_id, session_id))
+        pipe.zrem(self._key("sessions", app_name, user_id), session_id)
+        await pipe.execute()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        app_name, user_id, session_id = session.app_name, session.user_id, session.id
+        meta_key, state_key, events_key = self._session_keys(
+            app_name, user_id, session_id
+        )
+        if event.actions and event.actions.state_delta:
+            # `temp:` state only lives for the invocation; like the built-in
+            # services, never persist it, not even in the stored event.
+            event.actions.state_delta = {
+                key: value
+                for key, value in event.actions.state_delta.items()
+                if not key.startswith(State.TEMP_PREFIX)
+            }
+        app_state, user_state, session_state = self._split_state(
+            event.actions.state_delta if event.actions else {}
+        )
+        event_json = event.model_dump_json(exclude_none=True)
+        # None for Session objects this service did not return; their first
+        # append is not checked.
+        read_version = self._versions.get(id(session))
+
+        for _ in range(MAX_APPEND_RETRIES):
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(meta_key)
+                    stored_version = await pipe.hget(meta_key, "version")
+                    if stored_version is None:
+                        raise ValueError(f"Session {session_id} not found.")
+                    version = int(stored_version)
+                    if read_version is not None and version != read_version:
+                        raise ValueError(
+                            f"Session {session_id} was updated by another writer"
+                            " since it was read. Please check if it is a stale"
+                            " session."
+                        )
+                    pipe.multi()
+                    pipe.rpush(events_key, event_json)
+                    if session_state:
+                        pipe.hset(state_key, mapping=self._encode(session_state))
+                    if app_state:
+                        pipe.hset(
+                            self._key("app_state", app_name),
+                            mapping=self._encode(app_state),
+                        )
+                    if user_state:
+                        pipe.hset(
+                            self._key("user_state", app_name, user_id),
+                            mapping=self._encode(user_state),
+                        )
+                    pipe.hset(meta_key, "last_update_time", event.timestamp)
+                    pipe.hincrby(meta_key, "version", 1)
+                    pipe.zadd(
+                        self._key("sessions", app_name, user_id),
+                        {session_id: event.timestamp},
+                    )
+                    self._expire(pipe, app_name, user_id, session_id)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    # Another instance touched the session between WATCH and
+                    # EXEC; re-check staleness and try again.
+                    continue
+        else:
+            raise ValueError(
+                f"Could not append event to session {session_id}: too much contention."
+            )
+
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        self._track_version(session, version + 1)
+        return event
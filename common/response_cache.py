@@ -0,0 +1,351 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of LLM responses for agents whose output depends only on their input.
+
+ResponseCacheCallbacks plugs into an LlmAgent as before/after model
+callbacks: the request is hashed (model, rendered instruction, selected
+state keys and, optionally, the conversation contents), and on a hit the
+cached LlmResponse is returned without calling the model.
+
+Entries live in a MemoryResponseCache, optionally backed by a
+SqliteResponseCache that survives restarts; TieredResponseCache reads the
+tiers in order and promotes hits. Both tiers expire entries after a TTL and
+evict the least recently used ones beyond `max_entries`.
+
+ResponseCachePlugin applies the same cache to every agent of a Runner, e.g.
+to share responses between the sessions of a batch run.
+
+Set RESPONSE_CACHE_ENABLED=false to disable the cache, or put a truthy
+`response_cache_bypass` key in the session state to skip lookups for a
+session (fresh responses are still stored).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any, Protocol
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins import BasePlugin
+
+BYPASS_STATE_KEY = "response_cache_bypass"
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_MAX_ENTRIES = 256
+# Model calls that raise never reach after_model_callback; their pending keys
+# are dropped once they are this old.
+PENDING_TTL_SECONDS = 600.0
+
+
+class ResponseCache(Protocol):
+    """A key/value store for serialized LLM responses."""
+
+    def get(self, key: str) -> str | None: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+
+class MemoryResponseCache:
+    """An in-process LRU cache with a TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SqliteResponseCache:
+    """A response cache in a SQLite file, shared by restarts and processes."""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES * 16,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " create_time REAL NOT NULL, access_time REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND create_time > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE responses SET access_time = ? WHERE key = ?", (now, key)
+                )
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE create_time <= ?",
+                (now - self.ttl_seconds,),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN"
+                " (SELECT key FROM responses ORDER BY access_time DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class TieredResponseCache:
+    """Reads tiers in order, copying hits into the faster tiers before them."""
+
+    def __init__(self, *tiers: ResponseCache) -> None:
+        self.tiers = tiers
+
+    def get(self, key: str) -> str | None:
+        for index, tier in enumerate(self.tiers):
+            if (value := tier.get(key)) is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, value)
+                return value
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        for tier in self.tiers:
+            tier.set(key, value)
+
+
+def response_cache_from_env() -> ResponseCache | None:
+    """Builds the cache configured by RESPONSE_CACHE_* environment variables.
+
+    RESPONSE_CACHE_ENABLED (default true) turns the cache on or off,
+    RESPONSE_CACHE_TTL_SECONDS and RESPONSE_CACHE_MAX_ENTRIES bound it, and
+    RESPONSE_CACHE_PATH adds a SQLite tier behind the in-memory one.
+    """
+    if os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    ttl_seconds = float(
+        os.environ.get("RESPONSE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+    )
+    max_entries = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    memory = MemoryResponseCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if path := os.environ.get("RESPONSE_CACHE_PATH"):
+        return TieredResponseCache(
+            memory, SqliteResponseCache(path, ttl_seconds=ttl_seconds)
+        )
+    return memory
+
+
+def request_cache_key(
+    llm_request: LlmRequest,
+    state_values: dict[str, Any] | None = None,
+    include_contents: bool = True,
+) -> str:
+    """Hashes the parts of a request that determine the model's response.
+
+    Args:
+        llm_request: The request about to be sent to the model.
+        state_values: Session state the response depends on beyond the request.
+        include_contents: Whether the conversation contents are hashed.
+
+    Returns:
+        A hex SHA-256 digest.
+    """
+    config = llm_request.config
+    key_data = {
+        "model": llm_request.model,
+        "config": (
+            config.model_dump(
+                mode="json", exclude_none=True, exclude={"labels", "http_options"}
+            )
+            if config
+            else None
+        ),
+        "state": state_values or {},
+        "contents": (
+            [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]
+            if include_contents
+            else None
+        ),
+    }
+    payload = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCacheCallbacks:
+    """Before/after model callbacks that serve an agent from a ResponseCache.
+
+    Args:
+        cache: Where responses are stored, or None to disable caching.
+        state_keys: Session state keys the agent's output depends on. Requests
+            made while any of them is unset are not cached.
+        include_contents: Whether the conversation contents are part of the
+            key. Agents that only act on `state_keys` should pass False so
+            that re-runs later in a conversation still hit.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache | None,
+        state_keys: Sequence[str] = (),
+        include_contents: bool = True,
+    ) -> None:
+        self.cache = cache
+        self.state_keys = tuple(state_keys)
+        self.include_contents = include_contents
+        # Keys of requests sent to the model and when they were sent, by
+        # (invocation, agent), until the response arrives in
+        # after_model_callback or the call fails.
+        self._pending: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        if self.cache is None:
+            return None
+        state = callback_context.state
+        state_values = {k: state.get(k) for k in self.state_keys}
+        if None in state_values.values():
+            # The response depends on state that is not there yet.
+            return None
+        key = request_cache_key(llm_request, state_values, self.include_contents)
+        if not state.get(BYPASS_STATE_KEY) and (cached := self.cache.get(key)):
+            logging.info(f"[{callback_context.agent_name}] Response cache hit.")
+            return LlmResponse.model_validate_json(cached)
+        now = time.monotonic()
+        with self._lock:
+            while (
+                self._pending
+                and now - next(iter(self._pending.values()))[1] >= PENDING_TTL_SECONDS
+            ):
+                self._pending.popitem(last=False)
+            pending_id = (callback_context.invocation_id, callback_context.agent_name)
+            self._pending.pop(pending_id, None)
+            self._pending[pending_id] = (key, now)
+        return None
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        if self.cache is None or llm_response.partial:
+            return None
+        key = self._pop_pending(callback_context)
+        content = llm_response.content
+        if (
+            key is None
+            or llm_response.error_code
+            or not content
+            or not content.parts
+            or any(part.function_call for part in content.parts)
+        ):
+            return None
+        self.cache.set(key, llm_response.model_dump_json(exclude_none=True))
+        return None
+
+    def on_model_error_callback(
+        self, callback_context: CallbackContext, error: Exception
+    ) -> None:
+        """Forgets the request of a model call that raised."""
+        self._pop_pending(callback_context)
+
+    def _pop_pending(self, callback_context: CallbackContext) -> str | None:
+        with self._lock:
+            pending = self._pending.pop(
+                (callback_context.invocation_id, callback_context.agent_name), None
+            )
+        return pending[0] if pending else None
+
+
+class ResponseCachePlugin(BasePlugin):
+    """Runner plugin that serves every agent's model calls from a cache.
+
+    Args:
+        cache: Where responses are stored.
+        state_keys: Session state keys the agents' output depends on.
+        name: Plugin name, unique within the runner.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        state_keys: Sequence[str] = (),
+        name: str = "response_cache",
+    ) -> None:
+        super().__init__(name=name)
+        self.callbacks = ResponseCacheCallbacks(cache, state_keys=state_keys)
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        return self.callbacks.before_model_callback(callback_context, llm_request)
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        return self.callbacks.after_model_callback(callback_context, llm_response)
+
+    async def on_model_error_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+        error: Exception,
+    ) -> LlmResponse | None:
+        self.callbacks.on_model_error_callback(callback_context, error)
+        return None
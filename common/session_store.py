@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Configuration for the SQLite database behind ADK's DatabaseSessionService.
+
+`get_fast_api_app` builds the session service from a URL and engine kwargs,
+so tuning happens at two points: `session_db_kwargs` sizes the connection
+pool, and `install_sqlite_pragmas` registers an engine listener that sets
+WAL mode and friends on every new SQLite connection. `compact_session_store`
+deletes expired sessions with their events and reclaims the space.
+"""
+
+import datetime
+import os
+import sqlite3
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# WAL lets readers proceed while a research run is writing events, and
+# synchronous=NORMAL only fsyncs at checkpoints instead of on every commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "10000",
+    "cache_size": "-32000",
+    "temp_store": "MEMORY",
+    "wal_autocheckpoint": "1000",
+}
+SQLITE_POOL_SIZE = 8
+SQLITE_MAX_OVERFLOW = 8
+
+_pragmas_installed = False
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def install_sqlite_pragmas() -> None:
+    """Applies SQLITE_PRAGMAS to every SQLite connection SQLAlchemy opens.
+
+    Must be called before the session service is created, so that the
+    connection used to create the tables is configured as well.
+    """
+    global _pragmas_installed
+    if not _pragmas_installed:
+        event.listen(Engine, "connect", _set_sqlite_pragmas)
+        _pragmas_installed = True
+
+
+def sqlite_path(db_url: str) -> str | None:
+    """Returns the file path of a `sqlite:///` URL, or None for other URLs."""
+    prefix = "sqlite:///"
+    if not db_url.startswith(prefix) or db_url == prefix + ":memory:":
+        return None
+    return db_url[len(prefix) :]
+
+
+def session_db_kwargs(db_url: str) -> dict[str, Any]:
+    """Returns `create_engine` kwargs for the session database.
+
+    For SQLite files the pool keeps connections open between requests and
+    lets them be used from FastAPI's worker threads. Other databases keep
+    SQLAlchemy's defaults, apart from pre-ping.
+    """
+    if sqlite_path(db_url) is None:
+        return {"pool_pre_ping": True}
+    return {
+        "pool_size": SQLITE_POOL_SIZE,
+        "max_overflow": SQLITE_MAX_OVERFLOW,
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+    }
+
+
+def compact_session_store(
+    db_path: str,
+    max_age_days: float,
+    vacuum: bool = True,
+) -> int:
+    """Deletes sessions not updated for `max_age_days`, with their events.
+
+    Args:
+        db_path: Path of the SQLite session database.
+        max_age_days: Sessions whose `update_time` is older are deleted.
+        vacuum: Whether to checkpoint the WAL and VACUUM afterwards to give the
+            freed pages back to the file system.
+
+    Returns:
+        The number of deleted sessions.
+    """
+    if not os.path.exists(db_path):
+        return 0
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        days=max_age_days
+    )
+    # ADK stores naive UTC timestamps as "YYYY-MM-DD HH:MM:SS[.ffffff]".
+    cutoff_text = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        with conn:
+            expired = conn.execute(
+                "SELECT app_name, user_id, id FROM sessions WHERE update_time < ?",
+                (cutoff_text,),
+            ).fetchall()
+            conn.executemany(
+                "DELETE FROM events"
+                " WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                expired,
+            )
+            conn.executemany(
+                "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                expired,
+            )
+        if vacuum and expired:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return len(expired)
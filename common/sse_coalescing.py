@@ -0,0 +1,243 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""ASGI middleware that rate-limits token streaming on ADK's `/run_sse`.
+
+With `streaming: true`, ADK emits one `partial` event per model chunk. This
+middleware merges consecutive partial text events from the same author and
+sends them at most `max_events_per_second` times per second; complete
+(non-partial) events are forwarded immediately, after any pending partial
+text. It can also switch token streaming off server-wide by rewriting the
+request's `streaming` flag.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import Awaitable, Callable, MutableMapping
+from typing import Any
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+DEFAULT_MAX_EVENTS_PER_SECOND = 10.0
+
+
+def token_streaming_enabled() -> bool:
+    """Reads the ENABLE_TOKEN_STREAMING toggle (on by default)."""
+    return os.environ.get("ENABLE_TOKEN_STREAMING", "true").lower() not in (
+        "0",
+        "false",
+        "no",
+    )
+
+
+def _text_only(event: dict[str, Any]) -> bool:
+    parts = (event.get("content") or {}).get("parts") or []
+    return bool(parts) and all(set(part) <= {"text", "thought"} for part in parts)
+
+
+def merge_partial_events(pending: dict[str, Any], event: dict[str, Any]) -> bool:
+    """Appends the text of `event` to `pending` if both are mergeable partials.
+
+    Returns:
+        True if the event was merged, False if it has to be sent on its own.
+    """
+    if not (
+        event.get("partial")
+        and event.get("author") == pending.get("author")
+        and event.get("invocationId") == pending.get("invocationId")
+        and _text_only(pending)
+        and _text_only(event)
+    ):
+        return False
+    parts = pending["content"]["parts"]
+    for part in event["content"]["parts"]:
+        if parts and bool(parts[-1].get("thought")) == bool(part.get("thought")):
+            parts[-1]["text"] += part["text"]
+        else:
+            parts.append(dict(part))
+    return True
+
+
+class _Coalescer:
+    """Wraps the ASGI `send` of one `/run_sse` response."""
+
+    def __init__(self, send: Send, min_interval: float) -> None:
+        self._send = send
+        self._min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._passthrough = False
+        self._buffer = b""
+        self._pending: dict[str, Any] | None = None
+        self._last_emit = 0.0
+        self._timer: asyncio.Task | None = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = dict(message.get("headers") or [])
+            content_type = headers.get(b"content-type", b"")
+            self._passthrough = not content_type.startswith(b"text/event-stream")
+            await self._send(message)
+            return
+        if self._passthrough or message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        self._buffer += message.get("body", b"")
+        *blocks, self._buffer = self._buffer.split(b"\n\n")
+        for block in blocks:
+            await self._on_event_block(block)
+        if not message.get("more_body", False):
+            self._cancel_timer()
+            async with self._lock:
+                await self._flush_pending()
+                tail = self._buffer
+                self._buffer = b""
+                await self._send(
+                    {"type": "http.response.body", "body": tail, "more_body": False}
+                )
+
+    async def _on_event_block(self, block: bytes) -> None:
+        data = b"\n".join(
+            line[5:].lstrip()
+            for line in block.split(b"\n")
+            if line.startswith(b"data:")
+        )
+        try:
+            event = json.loads(data) if data else None
+        except json.JSONDecodeError:
+            event = None
+        async with self._lock:
+            if not isinstance(event, dict) or not event.get("partial"):
+                # Complete events keep their order relative to pending text.
+                self._cancel_timer()
+                await self._flush_pending()
+                await self._write(block + b"\n\n")
+                return
+            if self._pending is None or not merge_partial_events(self._pending, event):
+                await self._flush_pending()
+                self._pending = event
+            wait = self._last_emit + self._min_interval - time.monotonic()
+            if wait <= 0:
+                self._cancel_timer()
+                await self._flush_pending()
+            elif self._timer is None:
+                self._timer = asyncio.create_task(self._flush_later(wait))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with self._lock:
+            self._timer = None
+            await self._flush_pending()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _flush_pending(self) -> None:
+        if self._pending is not None:
+            event, self._pending = self._pending, None
+            data = json.dumps(event, separators=(",", ":"))
+            await self._write(f"data: {data}\n\n".encode())
+
+    async def _write(self, body: bytes) -> None:
+        self._last_emit = time.monotonic()
+        await self._send(
+            {"type": "http.response.body", "body": body, "more_body": True}
+        )
+
+    async def close(self) -> None:
+        self._cancel_timer()
+
+
+def _with_streaming_disabled(scope: Scope, receive: Receive) -> Receive:
+    """Returns a `receive` that delivers the request body with streaming off."""
+    body_sent = False
+
+    async def receive_wrapper() -> Message:
+        nonlocal body_sent
+        if body_sent:
+            return await receive()
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        try:
+            payload = json.loads(body)
+            if isinstance(payload, dict) and payload.get("streaming"):
+                payload["streaming"] = False
+                body = json.dumps(payload).encode()
+        except json.JSONDecodeError:
+            pass
+        body_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope["headers"] = [
+        (name, value)
+        for name, value in scope.get("headers", [])
+        if name.lower() != b"content-length"
+    ]
+    return receive_wrapper
+
+
+class SSECoalescingMiddleware:
+    """Coalesces partial events of `/run_sse` responses.
+
+    Args:
+        app: The ASGI application, e.g. the app from `get_fast_api_app`.
+        max_events_per_second: Upper bound on partial events sent per response.
+        streaming_enabled: If False, `/run_sse` requests are served without
+            token streaming regardless of what the client asked for. Defaults
+            to the ENABLE_TOKEN_STREAMING environment variable.
+        path_suffix: Requests whose path ends with this are handled.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_events_per_second: float = DEFAULT_MAX_EVENTS_PER_SECOND,
+        streaming_enabled: bool | None = None,
+        path_suffix: str = "/run_sse",
+    ) -> None:
+        self.app = app
+        self.min_interval = 1.0 / max_events_per_second
+        self.streaming_enabled = (
+            token_streaming_enabled()
+            if streaming_enabled is None
+            else streaming_enabled
+        )
+        self.path_suffix = path_suffix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].endswith(self.path_suffix):
+            await self.app(scope, receive, send)
+            return
+        if not self.streaming_enabled:
+            receive = _with_streaming_disabled(scope, receive)
+        coalescer = _Coalescer(send, self.min_interval)
+        try:
+            await self.app(scope, receive, coalescer.send)
+        finally:
+            await coalescer.close()
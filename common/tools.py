@@ -12,14 +12,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 import mimetypes
 import os
-from io import BytesIO
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, TextIO
 
 from google.cloud import storage
 from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 
+# Text-to-PDF rendering settings.
+PDF_FONT_NAME = "Helvetica"
+PDF_FONT_SIZE = 12
+PDF_LEADING = 1.2  # Line height as a multiple of the font size.
+PDF_MARGIN = 40
+# PDFs larger than this are spooled to disk instead of being kept in memory.
+PDF_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+# Chunk size for resumable uploads; must be a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
 
 def upload_and_process_document(file_path: str) -> dict:
     """Uploads a local document to GCS to trigger the processing pipeline.
@@ -70,9 +85,78 @@ def upload_and_process_document(file_path: str) -> dict:
         return {"status": "error", "message": str(e)}
 
 
+def _wrap_line(line: str, max_width: float) -> list[str]:
+    """Wraps a line to `max_width` points, breaking long tokens by character.
+
+    `simpleSplit` only breaks at whitespace, so a token wider than the frame
+    (a URL, a base64 blob) would run off the page; such segments are split
+    further at the last character that still fits.
+
+    Args:
+        line (str): The line to wrap, without its line break.
+        max_width (float): The printable width in points.
+
+    Returns:
+        list[str]: The wrapped segments; `[""]` for an empty line.
+    """
+    segments = []
+    for segment in simpleSplit(line, PDF_FONT_NAME, PDF_FONT_SIZE, max_width) or [""]:
+        if stringWidth(segment, PDF_FONT_NAME, PDF_FONT_SIZE) <= max_width:
+            segments.append(segment)
+            continue
+        start, width = 0, 0.0
+        for i, char in enumerate(segment):
+            char_width = stringWidth(char, PDF_FONT_NAME, PDF_FONT_SIZE)
+            if width + char_width > max_width and i > start:
+                segments.append(segment[start:i])
+                start, width = i, 0.0
+            width += char_width
+        segments.append(segment[start:])
+    return segments
+
+
+def _write_text_as_pdf(text_file: TextIO, pdf_file: IO[bytes]) -> None:
+    """Renders a text stream as a paginated PDF into a binary file object.
+
+    Lines are read lazily, long lines are wrapped to the printable width (see
+    `_wrap_line`) and a new page is started whenever the bottom margin is reached.
+
+    Args:
+        text_file (TextIO): The text stream to render.
+        pdf_file (IO[bytes]): The file object the PDF is written to.
+    """
+    page_width, page_height = letter
+    max_width = page_width - 2 * PDF_MARGIN
+    line_height = PDF_FONT_SIZE * PDF_LEADING
+
+    c = canvas.Canvas(pdf_file, pagesize=letter, pageCompression=1)
+    text_object = None
+    y = 0.0
+    for raw_line in text_file:
+        line = raw_line.rstrip("\r\n").expandtabs()
+        for segment in _wrap_line(line, max_width):
+            if text_object is None or y - line_height < PDF_MARGIN:
+                if text_object is not None:
+                    c.drawText(text_object)
+                    c.showPage()
+                y = page_height - PDF_MARGIN
+                text_object = c.beginText(PDF_MARGIN, y)
+                text_object.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                text_object.setLeading(line_height)
+            text_object.textLine(segment)
+            y -= line_height
+    if text_object is not None:
+        c.drawText(text_object)
+    c.save()
+
+
 def convert_and_upload_to_gcs(file_path: str, bucket_name: str) -> dict:
     """Converts a text file to PDF and uploads it to a GCS bucket.
 
+    The PDF is rendered into a spooled temporary file (kept in memory while
+    small, moved to disk once it grows) and uploaded with a chunked resumable
+    upload, so large text exports never have to fit in memory at once.
+
     Args:
         file_path (str): The local path to the text file.
         bucket_name (str): The name of the GCS bucket.
@@ -81,24 +165,18 @@ def convert_and_upload_to_gcs(file_path: str, bucket_name: str) -> dict:
         dict: A dictionary containing the status and the GCS path of the uploaded file.
     """
     try:
-        with open(file_path, "r") as f:
-            file_content = f.read()
-
-        pdf_buffer = BytesIO()
-        c = canvas.Canvas(pdf_buffer, pagesize=letter)
-        text_object = c.beginText(40, 750)
-        text_object.setFont("Helvetica", 12)
-        for line in file_content.splitlines():
-            text_object.textLine(line)
-        c.drawText(text_object)
-        c.save()
-        pdf_buffer.seek(0)
-
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        gcs_pdf_name = file_path.replace(".txt", ".pdf")
-        blob = bucket.blob(gcs_pdf_name)
-        blob.upload_from_file(pdf_buffer, content_type="application/pdf")
+        with (
+            open(file_path, encoding="utf-8", errors="replace") as text_file,
+            tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES) as pdf_file,
+        ):
+            _write_text_as_pdf(text_file, pdf_file)
+            pdf_file.seek(0)
+
+            storage_client = storage.Client()
+            bucket = storage_client.bucket(bucket_name)
+            gcs_pdf_name = file_path.replace(".txt", ".pdf")
+            blob = bucket.blob(gcs_pdf_name, chunk_size=UPLOAD_CHUNK_SIZE)
+            blob.upload_from_file(pdf_file, content_type="application/pdf")
 
         gcs_path = f"gs://{bucket_name}/{gcs_pdf_name}"
         return {"status": "success", "gcs_path": gcs_path}
@@ -106,6 +184,35 @@ def convert_and_upload_to_gcs(file_path: str, bucket_name: str) -> dict:
         return {"status": "error", "message": str(e)}
 
 
+def convert_and_upload_batch_to_gcs(
+    file_paths: list[str], bucket_name: str, max_workers: int | None = None
+) -> list[dict]:
+    """Converts several text files to PDF and uploads them in a process pool.
+
+    Rendering is CPU bound, so each file is converted in its own worker
+    process. Results are returned in the same order as `file_paths`.
+
+    Args:
+        file_paths (list[str]): The local paths to the text files.
+        bucket_name (str): The name of the GCS bucket.
+        max_workers (int | None): Number of worker processes. Defaults to the
+            number of CPUs.
+
+    Returns:
+        list[dict]: One `convert_and_upload_to_gcs` result per input file.
+    """
+    if not file_paths:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                convert_and_upload_to_gcs,
+                file_paths,
+                itertools.repeat(bucket_name),
+            )
+        )
+
+
 def search_source_documents(query: str) -> dict:
     """Searches for information within the private, uploaded documents.
 
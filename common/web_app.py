@@ -0,0 +1,153 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Builds the ADK FastAPI server shared by the repository's entry points.
+
+`create_web_app` serves the agents found in a directory, like `adk web`,
+with the tuned session store and SSE coalescing of streamed tokens. main.py
+uses it for account_discovery_agent/ and app/server.py for the research
+agent in app/, which also serves the Streamlit chat (common/chat_stream.py).
+
+Environment:
+    SESSION_SERVICE_URI: Where sessions are stored (default
+        sqlite:///./sessions.db); redis:// URIs use RedisSessionService.
+    SESSION_RETENTION_DAYS: Compact the SQLite store on start-up, dropping
+        sessions older than this.
+    SESSION_TTL_SECONDS: Expiry of idle Redis sessions.
+    SSE_MAX_EVENTS_PER_SECOND: Rate of coalesced partial events (default 10).
+    ENABLE_TOKEN_STREAMING: Set to false to serve whole-turn events only.
+"""
+
+import os
+from pathlib import Path
+
+from fastapi import FastAPI
+from google.adk.cli import fast_api
+from google.adk.cli.fast_api import get_fast_api_app
+from google.adk.cli.utils.agent_loader import AgentLoader
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, DatabaseSessionService
+
+from common.chat_stream import add_chat_stream_route
+from common.session_store import (
+    compact_session_store,
+    install_sqlite_pragmas,
+    session_db_kwargs,
+    sqlite_path,
+)
+from common.sse_coalescing import SSECoalescingMiddleware
+
+DEFAULT_SESSION_SERVICE_URI = "sqlite:///./sessions.db"
+ALLOW_ORIGINS = ["*"]
+
+
+def session_service_from_uri(session_service_uri: str) -> BaseSessionService:
+    """Returns a Redis or database session service for SESSION_SERVICE_URI."""
+    if session_service_uri.startswith(("redis://", "rediss://")):
+        from common.redis_session_service import (
+            DEFAULT_SESSION_TTL_SECONDS,
+            RedisSessionService,
+        )
+
+        return RedisSessionService.from_url(
+            session_service_uri,
+            session_ttl_seconds=int(
+                os.environ.get("SESSION_TTL_SECONDS", DEFAULT_SESSION_TTL_SECONDS)
+            ),
+        )
+    return DatabaseSessionService(
+        db_url=session_service_uri, **session_db_kwargs(session_service_uri)
+    )
+
+
+def create_web_app(agents_dir: str, chat_app_name: str | None = None) -> FastAPI:
+    """Returns the ADK API server and dev UI for the agents in `agents_dir`.
+
+    Args:
+        agents_dir: Directory of the agents to serve.
+        chat_app_name: Agent that answers the Streamlit chat at
+            `/stream_messages`; None serves no chat.
+    """
+    session_service_uri = os.environ.get(
+        "SESSION_SERVICE_URI", DEFAULT_SESSION_SERVICE_URI
+    )
+    # WAL and tuned pragmas for the SQLite session store; must precede engine
+    # creation.
+    install_sqlite_pragmas()
+    if (db_path := sqlite_path(session_service_uri)) and (
+        retention_days := os.environ.get("SESSION_RETENTION_DAYS")
+    ):
+        compact_session_store(db_path, max_age_days=float(retention_days))
+
+    if session_service_uri.startswith(("redis://", "rediss://")):
+        app = _create_redis_web_app(agents_dir, session_service_uri)
+    else:
+        app = get_fast_api_app(
+            agents_dir=agents_dir,
+            session_service_uri=session_service_uri,
+            session_db_kwargs=session_db_kwargs(session_service_uri),
+            allow_origins=ALLOW_ORIGINS,
+            web=True,
+        )
+
+    if chat_app_name:
+        add_chat_stream_route(
+            app,
+            lambda: Runner(
+                app_name=chat_app_name,
+                agent=AgentLoader(agents_dir).load_agent(chat_app_name),
+                session_service=session_service_from_uri(session_service_uri),
+            ),
+        )
+
+    # Merge token-level partial events on /run_sse to cap events per second.
+    app.add_middleware(
+        SSECoalescingMiddleware,
+        max_events_per_second=float(os.environ.get("SSE_MAX_EVENTS_PER_SECOND", "10")),
+    )
+    return app
+
+
+def _create_redis_web_app(agents_dir: str, session_service_uri: str) -> FastAPI:
+    """Serves sessions from Redis, so no sticky routing is needed.
+
+    get_fast_api_app only builds database services from a URI, so the web
+    server is assembled here with the same in-memory services it would use.
+    """
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.auth.credential_service.in_memory_credential_service import (
+        InMemoryCredentialService,
+    )
+    from google.adk.cli.adk_web_server import AdkWebServer
+    from google.adk.evaluation.local_eval_set_results_manager import (
+        LocalEvalSetResultsManager,
+    )
+    from google.adk.evaluation.local_eval_sets_manager import LocalEvalSetsManager
+    from google.adk.memory import InMemoryMemoryService
+
+    adk_web_server = AdkWebServer(
+        agent_loader=AgentLoader(agents_dir),
+        session_service=session_service_from_uri(session_service_uri),
+        artifact_service=InMemoryArtifactService(),
+        memory_service=InMemoryMemoryService(),
+        credential_service=InMemoryCredentialService(),
+        eval_sets_manager=LocalEvalSetsManager(agents_dir=agents_dir),
+        eval_set_results_manager=LocalEvalSetResultsManager(agents_dir=agents_dir),
+        agents_dir=agents_dir,
+    )
+    return adk_web_server.get_fast_api_app(
+        allow_origins=ALLOW_ORIGINS,
+        # The dev UI bundled with ADK, as served by get_fast_api_app(web=True).
+        web_assets_dir=str(Path(fast_api.__file__).parent / "browser"),
+    )
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-# ruff: noqa: RUF015
 import json
 import os
 import uuid
@@ -27,7 +26,9 @@ from frontend.utils.multimodal_utils import (
 
 EMPTY_CHAT_NAME = "Empty chat"
 NUM_CHAT_IN_RECENT = 3
+NUM_CHAT_PER_PAGE = 20
 DEFAULT_BASE_URL = "http://localhost:8000/"
+PLACEHOLDER_BUCKET_NAME = "gs://your-bucket-name"
 
 DEFAULT_REMOTE_AGENT_ENGINE_ID = "N/A"
 if os.path.exists("deployment_metadata.json"):
@@ -48,6 +49,64 @@ class SideBar:
         """
         self.st = st
 
+    def new_chat(self) -> None:
+        """Start a new, empty chat."""
+        self.st.session_state.run_id = None
+        self.st.session_state["session_id"] = str(uuid.uuid4())
+        self.st.session_state.session_db.get_session(
+            session_id=self.st.session_state["session_id"],
+        )
+        self.st.session_state.user_chats = {
+            self.st.session_state["session_id"]: {
+                "title": EMPTY_CHAT_NAME,
+                "messages": [],
+            }
+        }
+
+    def open_chat(self, chat_id: str, title: str) -> None:
+        """Switch to a stored chat, loading its messages."""
+        self.st.session_state.run_id = None
+        self.st.session_state["session_id"] = chat_id
+        self.st.session_state.session_db.get_session(session_id=chat_id)
+        # Only the open chat is kept in memory; others stay in the index.
+        self.st.session_state.user_chats = {
+            chat_id: {
+                "title": title,
+                "messages": self.st.session_state.session_db.load_messages(chat_id),
+            }
+        }
+
+    def render_chat_list(self) -> None:
+        """Render the recent chats and one page of the older ones.
+
+        Only titles are read from the chat index, one page at a time; a
+        chat's messages are loaded when it is opened.
+        """
+        session_db = self.st.session_state.session_db
+        self.st.subheader("Recent")  # Style the heading
+        for chat_id, chat in session_db.list_conversations(
+            limit=NUM_CHAT_IN_RECENT
+        ).items():
+            if self.st.button(chat["title"], key=chat_id):
+                self.open_chat(chat_id, chat["title"])
+
+        num_other_chats = session_db.count_conversations() - NUM_CHAT_IN_RECENT
+        if num_other_chats <= 0:
+            return
+        num_pages = -(-num_other_chats // NUM_CHAT_PER_PAGE)
+        with self.st.expander(f"Other chats ({num_other_chats})"):
+            page = 1
+            if num_pages > 1:
+                page = self.st.number_input(
+                    "Page", min_value=1, max_value=num_pages, value=1, step=1
+                )
+            for chat_id, chat in session_db.list_conversations(
+                limit=NUM_CHAT_PER_PAGE,
+                offset=NUM_CHAT_IN_RECENT + (page - 1) * NUM_CHAT_PER_PAGE,
+            ).items():
+                if self.st.button(chat["title"], key=chat_id):
+                    self.open_chat(chat_id, chat["title"])
+
     def init_side_bar(self) -> None:
         """Initialize and render the sidebar components."""
         with self.st.sidebar:
@@ -110,69 +169,30 @@ class SideBar:
                         )
                         > 0
                     ):
-                        self.st.session_state.run_id = None
-
-                        self.st.session_state["session_id"] = str(uuid.uuid4())
-                        self.st.session_state.session_db.get_session(
-                            session_id=self.st.session_state["session_id"],
-                        )
-                        self.st.session_state.user_chats[
-                            self.st.session_state["session_id"]
-                        ] = {
-                            "title": EMPTY_CHAT_NAME,
-                            "messages": [],
-                        }
+                        self.new_chat()
 
             with col2:
                 if self.st.button("Delete chat"):
-                    self.st.session_state.run_id = None
                     self.st.session_state.session_db.clear()
-                    self.st.session_state.user_chats.pop(
-                        self.st.session_state["session_id"]
+                    recent = self.st.session_state.session_db.list_conversations(
+                        limit=1
                     )
-                    if len(self.st.session_state.user_chats) > 0:
-                        chat_id = list(self.st.session_state.user_chats.keys())[0]
-                        self.st.session_state["session_id"] = chat_id
-                        self.st.session_state.session_db.get_session(
-                            session_id=self.st.session_state["session_id"],
-                        )
+                    if recent:
+                        chat_id, chat = next(iter(recent.items()))
+                        self.open_chat(chat_id, chat["title"])
                     else:
-                        self.st.session_state["session_id"] = str(uuid.uuid4())
-                        self.st.session_state.user_chats[
-                            self.st.session_state["session_id"]
-                        ] = {
-                            "title": EMPTY_CHAT_NAME,
-                            "messages": [],
-                        }
+                        self.new_chat()
             with col3:
                 if self.st.button("Save chat"):
                     save_chat(self.st)
 
-            self.st.subheader("Recent")  # Style the heading
-
-            all_chats = list(reversed(self.st.session_state.user_chats.items()))
-            for chat_id, chat in all_chats[:NUM_CHAT_IN_RECENT]:
-                if self.st.button(chat["title"], key=chat_id):
-                    self.st.session_state.run_id = None
-                    self.st.session_state["session_id"] = chat_id
-                    self.st.session_state.session_db.get_session(
-                        session_id=self.st.session_state["session_id"],
-                    )
-
-            with self.st.expander("Other chats"):
-                for chat_id, chat in all_chats[NUM_CHAT_IN_RECENT:]:
-                    if self.st.button(chat["title"], key=chat_id):
-                        self.st.session_state.run_id = None
-                        self.st.session_state["session_id"] = chat_id
-                        self.st.session_state.session_db.get_session(
-                            session_id=self.st.session_state["session_id"],
-                        )
+            self.render_chat_list()
 
             self.st.divider()
             self.st.header("Upload files from local")
             bucket_name = self.st.text_input(
                 label="GCS Bucket for upload",
-                value=os.environ.get("BUCKET_NAME", "gs://your-bucket-name"),
+                value=os.environ.get("BUCKET_NAME", PLACEHOLDER_BUCKET_NAME),
             )
             if "checkbox_state" not in self.st.session_state:
                 self.st.session_state.checkbox_state = True
@@ -198,6 +218,10 @@ class SideBar:
                     "xlsx",
                 ],
             )
+            # Large local files are auto-uploaded here, once a bucket is set.
+            self.bucket_name = (
+                bucket_name if bucket_name != PLACEHOLDER_BUCKET_NAME else None
+            )
             if self.uploaded_files and self.st.session_state.checkbox_state:
                 upload_files_to_gcs(self.st, bucket_name, self.uploaded_files)
 
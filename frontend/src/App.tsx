@@ -20,6 +20,7 @@ interface AgentMessage {
 
 interface AgentResponse {
   content: AgentMessage;
+  partial?: boolean;
   usageMetadata: {
     candidatesTokenCount: number;
     promptTokenCount: number;
@@ -30,6 +31,9 @@ interface AgentResponse {
     stateDelta: {
       research_plan?: string;
       final_report_with_citations?: boolean;
+      // Sources are sent as deltas: only those found since the last event.
+      sources_appended?: Record<string, { title: string; url: string }>;
+      source_count?: number;
     };
   };
 }
@@ -52,6 +56,9 @@ export default function App() {
   const [isCheckingBackend, setIsCheckingBackend] = useState(true);
   const currentAgentRef = useRef('');
   const accumulatedTextRef = useRef("");
+  // Token-streamed text of the model call in progress, replaced by the final event.
+  const partialTextRef = useRef("");
+  const reportDraftRef = useRef("");
   const scrollAreaRef = useRef<HTMLDivElement>(null);
 
   const retryWithBackoff = async (
@@ -167,28 +174,30 @@ export default function App() {
       let sourceCount = 0;
       if ((parsed.author === 'section_researcher' || parsed.author === 'enhanced_search_executor')) {
         console.log('[SSE EXTRACT] Relevant agent for source count:', parsed.author); // DEBUG
-        if (parsed.actions?.stateDelta?.url_to_short_id) {
-          console.log('[SSE EXTRACT] url_to_short_id found:', parsed.actions.stateDelta.url_to_short_id); // DEBUG
-          sourceCount = Object.keys(parsed.actions.stateDelta.url_to_short_id).length;
-          console.log('[SSE EXTRACT] Calculated sourceCount:', sourceCount); // DEBUG
+        if (parsed.actions?.stateDelta?.source_count) {
+          sourceCount = parsed.actions.stateDelta.source_count;
+          console.log('[SSE EXTRACT] source_count:', sourceCount); // DEBUG
         } else {
-          console.log('[SSE EXTRACT] url_to_short_id NOT found for agent:', parsed.author); // DEBUG
+          console.log('[SSE EXTRACT] source_count NOT found for agent:', parsed.author); // DEBUG
         }
       }
 
-      // Extract sources if available
-      if (parsed.actions?.stateDelta?.sources) {
-        sources = parsed.actions.stateDelta.sources;
-        console.log('[SSE EXTRACT] Sources found:', sources); // DEBUG
+      // Extract newly found sources, if any
+      const appended = parsed.actions?.stateDelta?.sources_appended;
+      if (appended && Object.keys(appended).length > 0) {
+        sources = appended;
+        console.log('[SSE EXTRACT] New sources found:', sources); // DEBUG
       }
 
 
-      return { textParts, agent, finalReportWithCitations, functionCall, functionResponse, sourceCount, sources };
+      const partial = Boolean(parsed.partial);
+
+      return { textParts, agent, finalReportWithCitations, functionCall, functionResponse, sourceCount, sources, partial };
     } catch (error) {
       // Log the error and a truncated version of the problematic data for easier debugging.
       const truncatedData = data.length > 200 ? data.substring(0, 200) + "..." : data;
       console.error('Error parsing SSE data. Raw data (truncated): "', truncatedData, '". Error details:', error);
-      return { textParts: [], agent: '', finalReportWithCitations: undefined, functionCall: null, functionResponse: null, sourceCount: 0, sources: null };
+      return { textParts: [], agent: '', finalReportWithCitations: undefined, functionCall: null, functionResponse: null, sourceCount: 0, sources: null, partial: false };
     }
   };
 
@@ -220,7 +229,29 @@ export default function App() {
   };
 
   const processSseEventData = (jsonData: string, aiMessageId: string) => {
-    const { textParts, agent, finalReportWithCitations, functionCall, functionResponse, sourceCount, sources } = extractDataFromSSE(jsonData);
+    const { textParts, agent, finalReportWithCitations, functionCall, functionResponse, sourceCount, sources, partial } = extractDataFromSSE(jsonData);
+
+    // Token-streamed chunks: show the planner's reply and a draft of the report as
+    // they are generated. The complete event that follows carries the full text.
+    if (partial) {
+      const text = textParts.join("");
+      if (agent === "interactive_planner_agent") {
+        partialTextRef.current += text;
+        const content = (accumulatedTextRef.current + partialTextRef.current).trim();
+        setMessages(prev => prev.map(msg =>
+          msg.id === aiMessageId ? { ...msg, content, agent } : msg
+        ));
+        setDisplayData(content);
+      } else if (agent === "report_composer_with_citations") {
+        reportDraftRef.current += text;
+        const draftId = aiMessageId + "_draft";
+        const draft = { type: "ai" as const, content: reportDraftRef.current, id: draftId, agent };
+        setMessages(prev => prev.some(msg => msg.id === draftId)
+          ? prev.map(msg => msg.id === draftId ? draft : msg)
+          : [...prev, draft]);
+      }
+      return;
+    }
 
     if (sourceCount > 0) {
       console.log('[SSE HANDLER] Updating websiteCount. Current sourceCount:', sourceCount);
@@ -258,6 +289,7 @@ export default function App() {
           data: { type: 'text', content: textParts.join(" ") }
         }]));
       } else { // interactive_planner_agent text updates the main AI message
+        partialTextRef.current = "";
         for (const text of textParts) {
           accumulatedTextRef.current += text + " ";
           setMessages(prev => prev.map(msg =>
@@ -277,7 +309,8 @@ export default function App() {
 
     if (agent === "report_composer_with_citations" && finalReportWithCitations) {
       const finalReportMessageId = Date.now().toString() + "_final";
-      setMessages(prev => [...prev, { type: "ai", content: finalReportWithCitations as string, id: finalReportMessageId, agent: currentAgentRef.current, finalReportWithCitations: true }]);
+      reportDraftRef.current = "";
+      setMessages(prev => [...prev.filter(msg => msg.id !== aiMessageId + "_draft"), { type: "ai", content: finalReportWithCitations as string, id: finalReportMessageId, agent: currentAgentRef.current, finalReportWithCitations: true }]);
       setDisplayData(finalReportWithCitations as string);
     }
   };
@@ -313,6 +346,8 @@ export default function App() {
       const aiMessageId = Date.now().toString() + "_ai";
       currentAgentRef.current = ''; // Reset current agent
       accumulatedTextRef.current = ''; // Reset accumulated text
+      partialTextRef.current = '';
+      reportDraftRef.current = '';
 
       setMessages(prev => [...prev, {
         type: "ai",
@@ -336,7 +371,9 @@ export default function App() {
               parts: [{ text: query }],
               role: "user"
             },
-            streaming: false
+            // app/server.py coalesces partial events; set VITE_STREAMING=false to
+            // get whole-turn events only.
+            streaming: import.meta.env.VITE_STREAMING !== "false"
           }),
         });
 
@@ -27,7 +27,11 @@ from frontend.side_bar import SideBar
 from frontend.style.app_markdown import MARKDOWN_STR
 from frontend.utils.local_chat_history import LocalChatMessageHistory
 from frontend.utils.message_editing import MessageEditing
-from frontend.utils.multimodal_utils import format_content, get_parts_from_files
+from frontend.utils.multimodal_utils import (
+    format_content,
+    format_message,
+    get_parts_from_files,
+)
 from frontend.utils.stream_handler import Client, StreamHandler, get_chain_response
 
 USER = "my_user"
@@ -59,12 +63,13 @@ def initialize_session_state() -> None:
             session_id=st.session_state["session_id"],
             user_id=st.session_state["user_id"],
         )
-        st.session_state.user_chats = (
-            st.session_state.session_db.get_all_conversations()
-        )
-        st.session_state.user_chats[st.session_state["session_id"]] = {
-            "title": EMPTY_CHAT_NAME,
-            "messages": [],
+        # Only the open chat is held in memory; the sidebar lists the others
+        # from the chat index and loads them on click.
+        st.session_state.user_chats = {
+            st.session_state["session_id"]: {
+                "title": EMPTY_CHAT_NAME,
+                "messages": [],
+            }
         }
 
 
@@ -97,7 +102,7 @@ def display_chat_message(message: dict[str, Any], index: int) -> None:
     """Display a single chat message with edit, refresh, and delete options."""
     chat_message = st.chat_message(message["type"])
     with chat_message:
-        st.markdown(format_content(message["content"]), unsafe_allow_html=True)
+        st.markdown(format_message(message), unsafe_allow_html=True)
         col1, col2, col3 = st.columns([2, 2, 94])
         display_message_buttons(message, index, col1, col2, col3)
 
@@ -166,11 +171,12 @@ def handle_user_input(side_bar: SideBar) -> None:
             upload_gcs_checkbox=st.session_state.checkbox_state,
             uploaded_files=side_bar.uploaded_files,
             gcs_uris=side_bar.gcs_uris,
+            bucket_name=side_bar.bucket_name,
         )
         st.session_state["gcs_uris_to_be_sent"] = ""
         parts.append({"type": "text", "text": prompt})
         st.session_state.user_chats[st.session_state["session_id"]]["messages"].append(
-            HumanMessage(content=parts).model_dump()
+            HumanMessage(content=parts, id=str(uuid.uuid4())).model_dump()
         )
 
         display_user_input(parts)
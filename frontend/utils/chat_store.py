@@ -0,0 +1,190 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""SQLite storage for the playground's chat history.
+
+Titles and update times live in a small `sessions` index table, so listing
+chats never touches message bodies. Each message is its own row in
+`messages`, keyed by (session_id, idx) and tagged with a content hash, so
+saving a chat only writes the messages that were added or changed.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    title TEXT,
+    update_time TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_by_update_time ON sessions (update_time);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (session_id, idx)
+);
+"""
+
+
+def _message_hash(body: str) -> str:
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+class ChatStore:
+    """Stores chat sessions and their messages in a SQLite database.
+
+    A single connection is shared between threads and guarded by a lock; the
+    database runs in WAL mode so readers are never blocked by a writer.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock, self._conn:
+            yield self._conn
+
+    def list_sessions(
+        self, limit: int | None = None, offset: int = 0
+    ) -> list[dict[str, Any]]:
+        """Lists sessions from the index, most recently updated first.
+
+        Args:
+            limit: Maximum number of sessions to return, or None for all.
+            offset: Number of sessions to skip.
+
+        Returns:
+            A list of {"session_id", "title", "update_time", "message_count"}
+            dicts. Message bodies are not loaded.
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT session_id, title, update_time, message_count FROM sessions"
+                " ORDER BY update_time DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [
+            {
+                "session_id": session_id,
+                "title": title,
+                "update_time": update_time,
+                "message_count": message_count,
+            }
+            for session_id, title, update_time, message_count in rows
+        ]
+
+    def count_sessions(self) -> int:
+        """Returns the number of stored sessions."""
+        with self._transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def load_messages(self, session_id: str) -> list[dict[str, Any]]:
+        """Loads the messages of one session, in order."""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT body FROM messages WHERE session_id = ? ORDER BY idx",
+                (session_id,),
+            ).fetchall()
+        return [json.loads(body) for (body,) in rows]
+
+    def save_session(
+        self,
+        session_id: str,
+        title: str | None,
+        update_time: str,
+        messages: list[dict[str, Any]],
+    ) -> int:
+        """Inserts or updates a session, writing only the changed messages.
+
+        Messages are compared by index and content hash with what is already
+        stored: appended or edited messages are written, unchanged ones are
+        skipped and messages past the new end (e.g. after an edit truncated
+        the chat) are deleted.
+
+        Returns:
+            The number of message rows written.
+        """
+        bodies = [json.dumps(message, default=str) for message in messages]
+        hashes = [_message_hash(body) for body in bodies]
+        with self._transaction() as conn:
+            stored = dict(
+                conn.execute(
+                    "SELECT idx, hash FROM messages WHERE session_id = ?",
+                    (session_id,),
+                ).fetchall()
+            )
+            changed = [
+                (session_id, idx, hashes[idx], bodies[idx])
+                for idx in range(len(bodies))
+                if stored.get(idx) != hashes[idx]
+            ]
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, idx, hash, body)"
+                " VALUES (?, ?, ?, ?)",
+                changed,
+            )
+            conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND idx >= ?",
+                (session_id, len(bodies)),
+            )
+            conn.execute(
+                "INSERT INTO sessions (session_id, title, update_time, message_count)"
+                " VALUES (?, ?, ?, ?) ON CONFLICT (session_id) DO UPDATE SET"
+                " title = excluded.title, update_time = excluded.update_time,"
+                " message_count = excluded.message_count",
+                (session_id, title, update_time, len(bodies)),
+            )
+        return len(changed)
+
+    def set_title(self, session_id: str, title: str) -> None:
+        """Updates the title of a session without touching its messages."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE sessions SET title = ? WHERE session_id = ?",
+                (title, session_id),
+            )
+
+    def has_session(self, session_id: str) -> bool:
+        """Returns whether a session is stored."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def delete_session(self, session_id: str) -> None:
+        """Deletes a session and its messages."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        """Closes the underlying connection."""
+        with self._lock:
+            self._conn.close()
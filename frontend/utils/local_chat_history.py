@@ -12,17 +12,75 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
+import logging
 import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
 import yaml
 from langchain_core.chat_history import BaseChatMessageHistory
 
+from frontend.utils.chat_store import ChatStore
 from frontend.utils.title_summary import chain_title
 
+MIGRATED_SUFFIX = ".migrated"
+# The title only needs the opening of a conversation.
+TITLE_CONTEXT_MESSAGES = 4
+TITLE_CONTEXT_CHARS = 500
+HEURISTIC_TITLE_WORDS = 8
+
+_title_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-title")
+_title_cache: dict[str, str] = {}
+
+
+def _message_text(message: dict) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part["text"]
+        for part in content
+        if isinstance(part, dict) and part.get("type") == "text"
+    )
+
+
+def title_context(messages: list[dict]) -> list[dict]:
+    """Returns the first human and AI text messages, truncated, for titling."""
+    context = []
+    for message in messages:
+        if message["type"] not in ("ai", "human"):
+            continue
+        text = _message_text(message).strip()
+        if text:
+            context.append(
+                {"type": message["type"], "content": text[:TITLE_CONTEXT_CHARS]}
+            )
+        if len(context) == TITLE_CONTEXT_MESSAGES:
+            break
+    return context
+
+
+def heuristic_title(messages: list[dict]) -> str:
+    """Builds a title from the first words of the first human message."""
+    for message in messages:
+        if message["type"] == "human":
+            words = re.sub(r"\s+", " ", _message_text(message)).strip().split(" ")
+            if words[0]:
+                title = " ".join(words[:HEURISTIC_TITLE_WORDS])
+                return title + ("…" if len(words) > HEURISTIC_TITLE_WORDS else "")
+    return "New Conversation"
+
 
 class LocalChatMessageHistory(BaseChatMessageHistory):
-    """Manages local storage and retrieval of chat message history."""
+    """Manages local storage and retrieval of chat message history.
+
+    Chats are kept in a per-user SQLite database (see `ChatStore`). YAML files
+    written by earlier versions are imported on first use and renamed with a
+    `.migrated` suffix.
+    """
 
     def __init__(
         self,
@@ -34,60 +92,101 @@ class LocalChatMessageHistory(BaseChatMessageHistory):
         self.session_id = session_id
         self.base_dir = base_dir
         self.user_dir = os.path.join(self.base_dir, self.user_id)
-        self.session_file = os.path.join(self.user_dir, f"{session_id}.yaml")
 
         os.makedirs(self.user_dir, exist_ok=True)
+        self._pending_titles: dict[str, Future] = {}
+        self.store = ChatStore(os.path.join(self.user_dir, "chats.sqlite3"))
+        self._migrate_yaml_sessions()
+
+    def _migrate_yaml_sessions(self) -> None:
+        """Imports the YAML session files written by earlier versions."""
+        for filename in os.listdir(self.user_dir):
+            if not filename.endswith(".yaml"):
+                continue
+            file_path = os.path.join(self.user_dir, filename)
+            with open(file_path, encoding="utf-8") as f:
+                conversation = yaml.safe_load(f)
+            if not isinstance(conversation, list) or len(conversation) > 1:
+                raise ValueError(
+                    f"""Invalid format in {file_path}.
+                YAML file can only contain one conversation with the following
+                structure.
+                  - messages:
+                      - content: [message text]
+                      - type: (human or ai)"""
+                )
+            conversation = conversation[0]
+            session_id = filename[:-5]
+            if not self.store.has_session(session_id):
+                self.store.save_session(
+                    session_id,
+                    conversation.get("title", filename),
+                    conversation.get("update_time", ""),
+                    conversation.get("messages", []),
+                )
+            os.replace(file_path, file_path + MIGRATED_SUFFIX)
 
     def get_session(self, session_id: str) -> None:
-        """Updates the session ID and file path for the current session."""
+        """Updates the session ID for the current session."""
         self.session_id = session_id
-        self.session_file = os.path.join(self.user_dir, f"{session_id}.yaml")
+
+    def list_conversations(
+        self, limit: int | None = None, offset: int = 0
+    ) -> dict[str, dict]:
+        """Lists conversations from the title index, most recent first.
+
+        Only titles and update times are returned; use `load_messages` to
+        fetch the messages of a conversation when it is opened.
+        """
+        return {
+            row["session_id"]: {
+                "title": row["title"] or row["session_id"],
+                "update_time": row["update_time"],
+            }
+            for row in self.store.list_sessions(limit=limit, offset=offset)
+        }
+
+    def count_conversations(self) -> int:
+        """Returns the number of stored conversations."""
+        return self.store.count_sessions()
+
+    def load_messages(self, session_id: str) -> list[dict]:
+        """Loads the messages of a single conversation."""
+        return self.store.load_messages(session_id)
 
     def get_all_conversations(self) -> dict[str, dict]:
-        """Retrieves all conversations for the current user."""
+        """Retrieves all conversations for the current user, oldest first."""
         conversations = {}
-        for filename in os.listdir(self.user_dir):
-            if filename.endswith(".yaml"):
-                file_path = os.path.join(self.user_dir, filename)
-                with open(file_path, encoding="utf-8") as f:
-                    conversation = yaml.safe_load(f)
-                    if not isinstance(conversation, list) or len(conversation) > 1:
-                        raise ValueError(
-                            f"""Invalid format in {file_path}.
-                        YAML file can only contain one conversation with the following
-                        structure.
-                          - messages:
-                              - content: [message text]
-                              - type: (human or ai)"""
-                        )
-                    conversation = conversation[0]
-                    if "title" not in conversation:
-                        conversation["title"] = filename
-                conversations[filename[:-5]] = conversation
-        return dict(
-            sorted(conversations.items(), key=lambda x: x[1].get("update_time", ""))
-        )
+        for session_id, conversation in reversed(self.list_conversations().items()):
+            conversation["messages"] = self.load_messages(session_id)
+            conversations[session_id] = conversation
+        return conversations
 
     def upsert_session(self, session: dict) -> None:
-        """Updates or inserts a session into the local storage."""
+        """Updates or inserts a session into the local storage.
+
+        Only messages that were added or changed since the last save are
+        written.
+        """
+        self.apply_generated_title(self.session_id, session)
         session["update_time"] = datetime.now().isoformat()
-        with open(self.session_file, "w", encoding="utf-8") as f:
-            yaml.dump(
-                [session],
-                f,
-                allow_unicode=True,
-                default_flow_style=False,
-                encoding="utf-8",
-            )
+        self.store.save_session(
+            self.session_id,
+            session.get("title"),
+            session["update_time"],
+            session["messages"],
+        )
 
     def set_title(self, session: dict) -> None:
         """
         Set the title for the given session.
 
-        This method generates a title for the session based on its messages.
-        If the session has messages, it appends a special message to prompt
-        for title creation, generates the title using a title chain, and
-        updates the session with the new title.
+        A heuristic title taken from the first human message is set right
+        away, and an LLM title is generated in the background from a
+        truncated view of the conversation. Once it is ready, the store is
+        updated directly and `apply_generated_title` copies it onto the
+        in-memory session. Titles are cached by conversation content, so the
+        same opening exchange is never summarized twice.
 
         Args:
             session (dict): A dictionary containing session information,
@@ -97,29 +196,52 @@ class LocalChatMessageHistory(BaseChatMessageHistory):
             None
         """
         if session["messages"]:
-            messages = session["messages"] + [
+            session["title"] = heuristic_title(session["messages"])
+            self.upsert_session(session)
+
+            messages = title_context(session["messages"])
+            key = hashlib.sha1(
+                json.dumps(messages, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            if key in _title_cache:
+                session["title"] = _title_cache[key]
+                self.store.set_title(self.session_id, session["title"])
+                return
+            self._pending_titles[self.session_id] = _title_executor.submit(
+                self._generate_title, self.session_id, messages, key
+            )
+
+    def _generate_title(self, session_id: str, messages: list[dict], key: str) -> str:
+        """Runs the title chain and stores the result; runs in a worker."""
+        response = chain_title.invoke(
+            [
+                *messages,
                 {
                     "type": "human",
                     "content": "End of conversation - Create one single title",
-                }
+                },
             ]
-            # Remove the tool calls from conversation
-            messages = [
-                msg
-                for msg in messages
-                if msg["type"] in ("ai", "human") and isinstance(msg["content"], str)
-            ]
-
-            response = chain_title.invoke(messages)
-            title = (
-                response.content.strip()
-                if isinstance(response.content, str)
-                else str(response.content)
-            )
-            session["title"] = title
-            self.upsert_session(session)
+        )
+        title = (
+            response.content.strip()
+            if isinstance(response.content, str)
+            else str(response.content)
+        )
+        _title_cache[key] = title
+        self.store.set_title(session_id, title)
+        return title
+
+    def apply_generated_title(self, session_id: str, session: dict) -> None:
+        """Copies a finished background title onto the in-memory session."""
+        future = self._pending_titles.get(session_id)
+        if future is None or not future.done():
+            return
+        del self._pending_titles[session_id]
+        try:
+            session["title"] = future.result()
+        except Exception as e:
+            logging.warning(f"Title generation failed, keeping heuristic: {e}")
 
     def clear(self) -> None:
-        """Removes the current session file if it exists."""
-        if os.path.exists(self.session_file):
-            os.remove(self.session_file)
+        """Removes the current session from the local storage."""
+        self.store.delete_session(self.session_id)
@@ -16,6 +16,15 @@
 
 from typing import Any
 
+from frontend.utils.stream_handler import SYNCED_MESSAGE_COUNT_KEY
+
+
+def _reset_history_sync(st: Any) -> None:
+    """Force the next request to resend the full, edited history."""
+    st.session_state.user_chats[st.session_state["session_id"]].pop(
+        SYNCED_MESSAGE_COUNT_KEY, None
+    )
+
 
 class MessageEditing:
     """Provides methods for editing, refreshing, and deleting chat messages."""
@@ -24,6 +33,7 @@ class MessageEditing:
     def edit_message(st: Any, button_idx: int, message_type: str) -> None:
         """Edit a message in the chat history."""
         button_id = f"edit_box_{button_idx}"
+        _reset_history_sync(st)
         if message_type == "human":
             messages = st.session_state.user_chats[st.session_state["session_id"]][
                 "messages"
@@ -40,6 +50,7 @@ class MessageEditing:
     @staticmethod
     def refresh_message(st: Any, button_idx: int, content: str) -> None:
         """Refresh a message in the chat history."""
+        _reset_history_sync(st)
         messages = st.session_state.user_chats[st.session_state["session_id"]][
             "messages"
         ]
@@ -51,6 +62,7 @@ class MessageEditing:
     @staticmethod
     def delete_message(st: Any, button_idx: int) -> None:
         """Delete a message from the chat history."""
+        _reset_history_sync(st)
         messages = st.session_state.user_chats[st.session_state["session_id"]][
             "messages"
         ]
@@ -13,6 +13,14 @@
 # limitations under the License.
 
 import base64
+import functools
+import hashlib
+import io
+import json
+import mimetypes
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from urllib.parse import quote
 
@@ -28,6 +36,54 @@ HELP_GCS_CHECKBOX = (
     " forwarding and logging large byte strings within the app."
 )
 
+# Files are streamed to GCS in chunks of this size (a multiple of 256 KiB).
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_WORKERS = 8
+# Local files above these sizes are uploaded to GCS and sent by URI instead
+# of being base64-encoded into the message.
+MAX_INLINE_FILE_BYTES = 2 * 1024 * 1024
+MAX_INLINE_TOTAL_BYTES = 8 * 1024 * 1024
+MIME_TYPE_CACHE_TTL_SECONDS = 600
+
+THUMBNAIL_WIDTH = 100
+RENDER_CACHE_SIZE = 512
+
+# (message id, content hash) -> rendered markdown, least recently used first
+_render_cache: OrderedDict[tuple[str | None, str], str] = OrderedDict()
+# gcs_uri -> (expiry on the monotonic clock, content type)
+_mime_type_cache: dict[str, tuple[float, str | None]] = {}
+
+
+@functools.cache
+def get_storage_client() -> storage.Client:
+    """Returns a Cloud Storage client shared by all uploads and lookups."""
+    return storage.Client()
+
+
+def _file_size(uploaded_file: Any) -> int:
+    size = getattr(uploaded_file, "size", None)
+    return size if size is not None else uploaded_file.getbuffer().nbytes
+
+
+def _thumbnail_url(data_url: str) -> str:
+    """Shrinks a base64 image data URL to a small JPEG thumbnail.
+
+    Chat bubbles only show images at THUMBNAIL_WIDTH pixels, so there is no
+    need to send the full image to the browser on every rerun. Falls back to
+    the original URL if the image cannot be decoded.
+    """
+    try:
+        from PIL import Image
+
+        _, encoded = data_url.split(",", 1)
+        image = Image.open(io.BytesIO(base64.b64decode(encoded)))
+        image.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 4))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=80)
+    except Exception:
+        return data_url
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
 
 def format_content(content: str | list[dict[str, Any]]) -> str:
     """Formats content as a string, handling both text and multimedia inputs."""
@@ -35,51 +91,67 @@ def format_content(content: str | list[dict[str, Any]]) -> str:
         return content
     if len(content) == 1 and content[0]["type"] == "text":
         return content[0]["text"]
-    markdown = """Media:
-"""
+    lines = ["Media:\n"]
     text = ""
     for part in content:
         if part["type"] == "text":
             text = part["text"]
         # Local Images:
         if part["type"] == "image_url":
-            image_url = part["image_url"]["url"]
-            image_markdown = f'<img src="{image_url}" width="100">'
-            markdown = (
-                markdown
-                + f"""
-- {image_markdown}
-"""
-            )
+            image_url = _thumbnail_url(part["image_url"]["url"])
+            lines.append(f'\n- <img src="{image_url}" width="{THUMBNAIL_WIDTH}">\n')
         if part["type"] == "media":
             # Local other media
             if "data" in part:
-                markdown = markdown + f"- Local media: {part['file_name']}\n"
+                lines.append(f"- Local media: {part['file_name']}\n")
             # From GCS:
             if "file_uri" in part:
+                image_url = gs_uri_to_https_url(part["file_uri"])
                 # GCS images
-                if "image" in part["mime_type"]:
-                    image_url = gs_uri_to_https_url(part["file_uri"])
-                    image_markdown = f'<img src="{image_url}" width="100">'
-                    markdown = (
-                        markdown
-                        + f"""
-- {image_markdown}
-"""
+                if "image" in (part["mime_type"] or ""):
+                    lines.append(
+                        f'\n- <img src="{image_url}" width="{THUMBNAIL_WIDTH}">\n'
                     )
                 # GCS other media
                 else:
-                    image_url = gs_uri_to_https_url(part["file_uri"])
-                    markdown = (
-                        markdown + f"- Remote media: "
-                        f"[{part['file_uri']}]({image_url})\n"
-                    )
-    markdown = (
-        markdown
-        + f"""
+                    lines.append(f"- Remote media: [{part['file_uri']}]({image_url})\n")
+    lines.append(f"\n\n{text}")
+    return "".join(lines)
 
-{text}"""
-    )
+
+def _render_key(message: dict[str, Any]) -> tuple[str | None, str]:
+    content = message["content"]
+    if isinstance(content, str):
+        digest_source = content
+    elif message.get("id"):
+        # Messages with an id only ever change through text edits, so skip
+        # hashing the (possibly large) inline media.
+        digest_source = json.dumps(
+            [
+                part.get("text") or part.get("file_uri") or part.get("file_name")
+                for part in content
+            ]
+        )
+    else:
+        digest_source = json.dumps(content, sort_keys=True)
+    return message.get("id"), hashlib.sha1(digest_source.encode("utf-8")).hexdigest()
+
+
+def format_message(message: dict[str, Any]) -> str:
+    """Formats a chat message, reusing the markdown rendered on earlier reruns.
+
+    Results are cached by message id and a hash of the message text, so an
+    edited message is rendered again while unchanged ones are not.
+    """
+    key = _render_key(message)
+    markdown = _render_cache.get(key)
+    if markdown is None:
+        markdown = format_content(message["content"])
+        _render_cache[key] = markdown
+        if len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    else:
+        _render_cache.move_to_end(key)
     return markdown
 
 
@@ -93,28 +165,86 @@ def get_gcs_blob_mime_type(gcs_uri: str) -> str | None:
         str: The MIME type of the blob (e.g., "image/jpeg", "text/plain") if found,
              or None if the blob does not exist or an error occurs.
     """
-    storage_client = storage.Client()
-
+    cached = _mime_type_cache.get(gcs_uri)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
     try:
         bucket_name, object_name = gcs_uri.replace("gs://", "").split("/", 1)
 
-        bucket = storage_client.bucket(bucket_name)
+        bucket = get_storage_client().bucket(bucket_name)
         blob = bucket.blob(object_name)
         blob.reload()
-        return blob.content_type
     except Exception as e:
         print(f"Error retrieving MIME type for {gcs_uri}: {e}")
         return None  # Indicate failure
+    _mime_type_cache[gcs_uri] = (
+        time.monotonic() + MIME_TYPE_CACHE_TTL_SECONDS,
+        blob.content_type,
+    )
+    return blob.content_type
+
+
+def resolve_gcs_mime_types(gcs_uris: list[str]) -> list[str | None]:
+    """Resolves the MIME types of several GCS objects at once.
+
+    Types are inferred from the file extension when possible, which needs no
+    request at all. The remaining URIs are looked up concurrently, with
+    results cached for MIME_TYPE_CACHE_TTL_SECONDS.
+
+    Args:
+        gcs_uris: GCS URIs in the format "gs://bucket-name/object-name".
+
+    Returns:
+        The MIME type of each URI, in order, or None where it is unknown.
+    """
+    mime_types: list[str | None] = [mimetypes.guess_type(uri)[0] for uri in gcs_uris]
+    to_fetch = sorted(
+        {uri for uri, mime in zip(gcs_uris, mime_types, strict=True) if not mime}
+    )
+    if to_fetch:
+        with ThreadPoolExecutor(
+            max_workers=min(UPLOAD_MAX_WORKERS, len(to_fetch))
+        ) as executor:
+            fetched: dict[str, str | None] = dict(
+                zip(
+                    to_fetch,
+                    executor.map(get_gcs_blob_mime_type, to_fetch),
+                    strict=True,
+                )
+            )
+        mime_types = [
+            mime or fetched[uri] for uri, mime in zip(gcs_uris, mime_types, strict=True)
+        ]
+    return mime_types
 
 
 def get_parts_from_files(
-    upload_gcs_checkbox: bool, uploaded_files: list[Any], gcs_uris: str
+    upload_gcs_checkbox: bool,
+    uploaded_files: list[Any],
+    gcs_uris: str,
+    bucket_name: str | None = None,
 ) -> list[dict[str, Any]]:
-    """Processes uploaded files and GCS URIs to create a list of content parts."""
-    parts = []
+    """Processes uploaded files and GCS URIs to create a list of content parts.
+
+    Local files are inlined as base64 only while they stay below
+    MAX_INLINE_FILE_BYTES each and MAX_INLINE_TOTAL_BYTES together. Larger
+    files are uploaded to `bucket_name` concurrently and referenced by URI.
+    """
+    parts: list[dict[str, Any]] = []
     # read from local directly
     if not upload_gcs_checkbox:
-        for uploaded_file in uploaded_files:
+        inline_bytes = 0
+        file_parts: dict[int, dict[str, Any]] = {}
+        to_upload: dict[int, Any] = {}
+        for i, uploaded_file in enumerate(uploaded_files):
+            size = _file_size(uploaded_file)
+            if bucket_name and (
+                size > MAX_INLINE_FILE_BYTES
+                or inline_bytes + size > MAX_INLINE_TOTAL_BYTES
+            ):
+                to_upload[i] = uploaded_file
+                continue
+            inline_bytes += size
             im_bytes = uploaded_file.read()
             if "image" in uploaded_file.type:
                 content = {
@@ -133,13 +263,24 @@ def get_parts_from_files(
                     "mime_type": uploaded_file.type,
                 }
 
-            parts.append(content)
+            file_parts[i] = content
+        # Files are only queued for upload when a bucket is set.
+        if bucket_name and to_upload:
+            uris = upload_files_concurrently(bucket_name, list(to_upload.values()))
+            for (i, uploaded_file), uri in zip(to_upload.items(), uris, strict=True):
+                file_parts[i] = {
+                    "type": "media",
+                    "file_uri": uri,
+                    "mime_type": uploaded_file.type,
+                }
+        parts.extend(file_parts[i] for i in sorted(file_parts))
     if gcs_uris != "":
-        for uri in gcs_uris.split(","):
+        uris = [uri.strip() for uri in gcs_uris.split(",") if uri.strip()]
+        for uri, mime_type in zip(uris, resolve_gcs_mime_types(uris), strict=True):
             content = {
                 "type": "media",
                 "file_uri": uri,
-                "mime_type": get_gcs_blob_mime_type(uri),
+                "mime_type": mime_type,
             }
             parts.append(content)
     return parts
@@ -166,8 +307,7 @@ def upload_bytes_to_gcs(
     Raises:
         GoogleCloudError: If there's an issue with the GCS operation.
     """
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = get_storage_client().bucket(bucket_name)
     blob = bucket.blob(blob_name)
     blob.upload_from_string(data=file_bytes, content_type=content_type)
     # Construct and return the GCS URI
@@ -199,19 +339,57 @@ def gs_uri_to_https_url(gs_uri: str) -> str:
     return https_url
 
 
-def upload_files_to_gcs(st: Any, bucket_name: str, files_to_upload: list[Any]) -> None:
-    """Upload multiple files to Google Cloud Storage and store URIs in session state."""
+def upload_file_to_gcs(
+    bucket_name: str,
+    blob_name: str,
+    file: Any,
+    content_type: str | None = None,
+) -> str:
+    """Streams a file-like object to Google Cloud Storage in chunks.
+
+    Unlike `upload_bytes_to_gcs`, the file is never fully copied into memory:
+    it is sent as a resumable upload in UPLOAD_CHUNK_SIZE pieces.
+
+    Args:
+        bucket_name: The name of the GCS bucket.
+        blob_name: The desired name for the uploaded file in GCS.
+        file: A seekable binary file-like object, e.g. a Streamlit UploadedFile.
+        content_type (optional): The MIME type of the file.
+
+    Returns:
+        str: The GCS URI (gs://bucket_name/blob_name) of the uploaded file.
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    blob = bucket.blob(blob_name, chunk_size=UPLOAD_CHUNK_SIZE)
+    blob.upload_from_file(file, rewind=True, content_type=content_type)
+    return f"gs://{bucket_name}/{blob_name}"
+
+
+def upload_files_concurrently(bucket_name: str, files: list[Any]) -> list[str]:
+    """Uploads files to GCS in parallel, returning their URIs in input order."""
     bucket_name = bucket_name.replace("gs://", "")
-    uploaded_uris = []
-    for file in files_to_upload:
-        if file:
-            file_bytes = file.read()
-            gcs_uri = upload_bytes_to_gcs(
-                bucket_name=bucket_name,
-                blob_name=file.name,
-                file_bytes=file_bytes,
-                content_type=file.type,
+    if not files:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(UPLOAD_MAX_WORKERS, len(files))
+    ) as executor:
+        return list(
+            executor.map(
+                lambda file: upload_file_to_gcs(
+                    bucket_name=bucket_name,
+                    blob_name=file.name,
+                    file=file,
+                    content_type=file.type,
+                ),
+                files,
             )
-            uploaded_uris.append(gcs_uri)
+        )
+
+
+def upload_files_to_gcs(st: Any, bucket_name: str, files_to_upload: list[Any]) -> None:
+    """Upload multiple files to Google Cloud Storage and store URIs in session state."""
+    uploaded_uris = upload_files_concurrently(
+        bucket_name, [file for file in files_to_upload if file]
+    )
     st.session_state.uploader_key += 1
     st.session_state["gcs_uris_to_be_sent"] = ",".join(uploaded_uris)
@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterable, Iterator
+
+
+def iter_sse_events(lines: Iterable[bytes | str]) -> Iterator[str]:
+    """Yields the data payload of each event in a server-sent event stream.
+
+    Follows the SSE framing rules: `data:` lines are accumulated (joined with
+    newlines) until a blank line dispatches the event, comment lines starting
+    with `:` and the `event`, `id` and `retry` fields are ignored. For servers
+    that stream newline-delimited JSON instead, a bare line starting with `{`
+    or `[` outside of an event is yielded as-is.
+
+    Args:
+        lines: The response body split into lines, e.g. `response.iter_lines()`.
+
+    Yields:
+        str: The data of each complete event.
+    """
+    data_lines: list[str] = []
+    for raw_line in lines:
+        line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+        line = line.rstrip("\r")
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(":"):
+            continue
+        if not data_lines and line.lstrip()[:1] in ("{", "["):
+            yield line
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        yield "\n".join(data_lines)
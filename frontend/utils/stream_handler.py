@@ -13,24 +13,46 @@
 # limitations under the License.
 
 # mypy: disable-error-code="unreachable"
+import asyncio
 import importlib
 import json
+import logging
+import threading
+import time
 import uuid
-from collections.abc import Generator
-from typing import Any
+from collections.abc import Callable, Generator, Iterator
+from typing import Any, ClassVar
 from urllib.parse import urljoin
 
 import google.auth
+import google.auth.jwt
 import google.auth.transport.requests
 import google.oauth2.id_token
 import requests
 import streamlit as st
 import vertexai
 from google.auth.exceptions import DefaultCredentialsError
-from langchain_core.messages import AIMessage, ToolMessage
+from requests.adapters import HTTPAdapter
 from vertexai import agent_engines
 
 from frontend.utils.multimodal_utils import format_content
+from frontend.utils.sse import iter_sse_events
+
+# Key on a chat recording how many of its messages the server already holds.
+SYNCED_MESSAGE_COUNT_KEY = "synced_message_count"
+# Control events sent by servers that keep the chat history themselves
+# (common/chat_stream.py).
+HISTORY_SYNCED_EVENT = "history_synced"
+HISTORY_MISMATCH_EVENT = "history_mismatch"
+
+# Events read ahead of the UI; bounds memory if rendering falls behind.
+EVENT_QUEUE_SIZE = 256
+_END_OF_STREAM = object()
+
+# Refresh identity tokens this many seconds before they expire.
+ID_TOKEN_REFRESH_MARGIN_SECONDS = 300
+# Lifetime assumed when a token's expiry cannot be read (Google ID tokens last 1h).
+DEFAULT_ID_TOKEN_LIFETIME_SECONDS = 3600
 
 st.cache_resource.clear()
 
@@ -46,27 +68,72 @@ def get_remote_agent(remote_agent_engine_id: str) -> Any:
     return agent_engines.AgentEngine(remote_agent_engine_id)
 
 
+class IdTokenProvider:
+    """Fetches an identity token for a URL and refreshes it before it expires."""
+
+    def __init__(self, audience: str, creds: Any) -> None:
+        self.audience = audience
+        self.creds = creds
+        self._token: str | None = None
+        self._expiry = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, force_refresh: bool = False) -> str | None:
+        """Returns a valid identity token, fetching a new one if needed."""
+        with self._lock:
+            if (
+                force_refresh
+                or self._token is None
+                or time.time() >= self._expiry - ID_TOKEN_REFRESH_MARGIN_SECONDS
+            ):
+                self._refresh()
+            return self._token
+
+    def _refresh(self) -> None:
+        auth_req = google.auth.transport.requests.Request()
+        try:
+            self._token = google.oauth2.id_token.fetch_id_token(auth_req, self.audience)
+        except DefaultCredentialsError:
+            self.creds.refresh(auth_req)
+            self._token = self.creds.id_token
+        try:
+            claims = google.auth.jwt.decode(self._token, verify=False)
+            self._expiry = float(claims["exp"])
+        except Exception:
+            self._expiry = time.time() + DEFAULT_ID_TOKEN_LIFETIME_SECONDS
+
+
 @st.cache_resource
 def get_remote_url_config(url: str, authenticate_request: bool) -> dict[str, Any]:
     """Get cached remote URL agent configuration."""
     stream_url = urljoin(url, "stream_messages")
     creds, _ = google.auth.default()
-    id_token = None
+    token_provider = None
     if authenticate_request:
-        auth_req = google.auth.transport.requests.Request()
-        try:
-            id_token = google.oauth2.id_token.fetch_id_token(auth_req, stream_url)
-        except DefaultCredentialsError:
-            creds.refresh(auth_req)
-            id_token = creds.id_token
+        token_provider = IdTokenProvider(stream_url, creds)
+        token_provider.get()
     return {
         "url": stream_url,
         "authenticate_request": authenticate_request,
         "creds": creds,
-        "id_token": id_token,
+        "token_provider": token_provider,
     }
 
 
+@st.cache_resource
+def get_http_session(url: str) -> requests.Session:
+    """Get a cached HTTP session with a keep-alive connection pool for a service.
+
+    The session outlives individual `Client` instances, so connections and TLS
+    sessions are reused across turns.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 @st.cache_resource()
 def get_local_agent(agent_callable_path: str) -> Any:
     """Get cached local agent instance."""
@@ -100,7 +167,8 @@ class Client:
             self.url = remote_config["url"]
             self.authenticate_request = remote_config["authenticate_request"]
             self.creds = remote_config["creds"]
-            self.id_token = remote_config["id_token"]
+            self.token_provider = remote_config["token_provider"]
+            self.session = get_http_session(self.url)
             self.agent = None
         elif remote_agent_engine_id:
             self.agent = get_remote_agent(remote_agent_engine_id)
@@ -111,6 +179,31 @@ class Client:
                 raise ValueError("agent_callable_path cannot be None")
             self.agent = get_local_agent(agent_callable_path)
 
+    def _headers(
+        self, force_token_refresh: bool = False, **extra: str
+    ) -> dict[str, str]:
+        """Build request headers, including a fresh identity token if needed."""
+        headers = {"Content-Type": "application/json", **extra}
+        if self.authenticate_request and self.token_provider is not None:
+            token = self.token_provider.get(force_refresh=force_token_refresh)
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def _post(self, url: str, **kwargs: Any) -> requests.Response:
+        """POST through the pooled session, retrying once with a new token on 401."""
+        extra_headers = kwargs.pop("extra_headers", {})
+        response = self.session.post(
+            url, headers=self._headers(**extra_headers), **kwargs
+        )
+        if response.status_code == 401 and self.authenticate_request:
+            response.close()
+            response = self.session.post(
+                url,
+                headers=self._headers(force_token_refresh=True, **extra_headers),
+                **kwargs,
+            )
+        return response
+
     def log_feedback(self, feedback_dict: dict[str, Any], run_id: str) -> None:
         """Log user feedback for a specific run."""
         score = feedback_dict["score"]
@@ -128,20 +221,9 @@ class Client:
         feedback_dict["run_id"] = run_id
         feedback_dict["log_type"] = "feedback"
         feedback_dict.pop("type")
-        url = urljoin(self.url, "feedback")
-        headers = {
-            "Content-Type": "application/json",
-        }
         if self.url:
             url = urljoin(self.url, "feedback")
-            headers = {
-                "Content-Type": "application/json",
-            }
-            if self.authenticate_request:
-                headers["Authorization"] = f"Bearer {self.id_token}"
-            requests.post(
-                url, data=json.dumps(feedback_dict), headers=headers, timeout=10
-            )
+            self._post(url, data=json.dumps(feedback_dict), timeout=10).close()
         elif self.agent is not None:
             self.agent.register_feedback(feedback=feedback_dict)
         else:
@@ -152,40 +234,72 @@ class Client:
     ) -> Generator[dict[str, Any], None, None]:
         """Stream events from the server, yielding parsed event data."""
         if self.url:
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "text/event-stream",
-            }
-            if self.authenticate_request:
-                headers["Authorization"] = f"Bearer {self.id_token}"
-            with requests.post(
-                self.url, json=data, headers=headers, stream=True, timeout=60
+            with self._post(
+                self.url,
+                json=data,
+                stream=True,
+                timeout=60,
+                extra_headers={"Accept": "text/event-stream"},
             ) as response:
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            event = json.loads(line.decode("utf-8"))
-                            yield event
-                        except json.JSONDecodeError:
-                            print(f"Failed to parse event: {line.decode('utf-8')}")
+                response.raise_for_status()
+                # chunk_size=None hands over data as soon as it arrives.
+                for event_data in iter_sse_events(response.iter_lines(chunk_size=None)):
+                    try:
+                        yield json.loads(event_data)
+                    except json.JSONDecodeError:
+                        logging.warning(f"Failed to parse event: {event_data[:200]}")
         elif self.agent is not None:
             yield from self.agent.stream_query(**data)
 
 
 class StreamHandler:
-    """Handles streaming updates to a Streamlit interface."""
+    """Handles streaming updates to a Streamlit interface.
 
-    def __init__(self, st: Any, initial_text: str = "") -> None:
+    Tokens are buffered and the markdown container is repainted at most every
+    `min_render_interval` seconds, or sooner once `max_buffered_chars` new
+    characters are pending. Call `flush` at the end of the stream to render
+    the complete text.
+    """
+
+    def __init__(
+        self,
+        st: Any,
+        initial_text: str = "",
+        min_render_interval: float = 0.1,
+        max_buffered_chars: int = 2000,
+    ) -> None:
         """Initialize the StreamHandler with Streamlit context and initial text."""
         self.st = st
         self.tool_expander = st.expander("Tool Calls:", expanded=False)
         self.container = st.empty()
         self.text = initial_text
         self.tools_logs = initial_text
+        self.min_render_interval = min_render_interval
+        self.max_buffered_chars = max_buffered_chars
+        self._tokens: list[str] = []
+        self._buffered_chars = 0
+        self._last_render = 0.0
 
     def new_token(self, token: str) -> None:
         """Add a new token to the main text display."""
-        self.text += token
+        self._tokens.append(token)
+        self._buffered_chars += len(token)
+        if (
+            self._buffered_chars >= self.max_buffered_chars
+            or time.monotonic() - self._last_render >= self.min_render_interval
+        ):
+            self._render()
+
+    def flush(self) -> None:
+        """Render any buffered tokens."""
+        if self._tokens:
+            self._render()
+
+    def _render(self) -> None:
+        self.text += "".join(self._tokens)
+        self._tokens.clear()
+        self._buffered_chars = 0
+        self._last_render = time.monotonic()
         self.container.markdown(format_content(self.text), unsafe_allow_html=True)
 
     def new_status(self, status_update: str) -> None:
@@ -194,6 +308,42 @@ class StreamHandler:
         self.tool_expander.markdown(status_update)
 
 
+def ai_message_dict(
+    content: str | list[Any],
+    tool_calls: list[dict[str, Any]] | None = None,
+    id: str | None = None,
+    additional_kwargs: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Build an AI message as a plain dict, with the keys of `AIMessage.model_dump()`."""
+    return {
+        "content": content,
+        "additional_kwargs": additional_kwargs or {},
+        "response_metadata": {},
+        "type": "ai",
+        "name": None,
+        "id": id,
+        "example": False,
+        "tool_calls": tool_calls or [],
+        "invalid_tool_calls": [],
+        "usage_metadata": None,
+    }
+
+
+def tool_message_dict(content: Any, tool_call_id: str) -> dict[str, Any]:
+    """Build a tool message as a plain dict, with the keys of `ToolMessage.model_dump()`."""
+    return {
+        "content": content,
+        "additional_kwargs": {},
+        "response_metadata": {},
+        "type": "tool",
+        "name": None,
+        "id": None,
+        "tool_call_id": tool_call_id,
+        "artifact": None,
+        "status": "success",
+    }
+
+
 class EventProcessor:
     """Processes events from the stream and updates the UI accordingly."""
 
@@ -207,78 +357,181 @@ class EventProcessor:
         self.current_run_id: str | None = None
         self.additional_kwargs: dict[str, Any] = {}
 
+    def _history_offset(self, chat: dict[str, Any]) -> int:
+        """Number of leading messages the server already holds for this chat."""
+        offset = chat.get(SYNCED_MESSAGE_COUNT_KEY, 0)
+        return offset if 0 < offset <= len(chat["messages"]) else 0
+
+    def _build_request(
+        self, messages: list[dict[str, Any]], history_offset: int
+    ) -> dict[str, Any]:
+        """Build a request carrying only the messages after `history_offset`."""
+        return {
+            "input": {"messages": messages[history_offset:]},
+            "config": {
+                "run_id": self.current_run_id,
+                "metadata": {
+                    "user_id": self.st.session_state["user_id"],
+                    "session_id": self.st.session_state["session_id"],
+                    "history_offset": history_offset,
+                },
+            },
+        }
+
     def process_events(self) -> None:
-        """Process events from the stream, handling each event type appropriately."""
-        messages = self.st.session_state.user_chats[
-            self.st.session_state["session_id"]
-        ]["messages"]
+        """Process events from the stream, handling each event type appropriately.
+
+        Once the server has acknowledged a chat with a `history_synced` event,
+        later turns only send the messages it has not seen yet, together with
+        their offset. If the server answers with `history_mismatch` (e.g. it
+        lost the session), the full history is sent again. Servers that never
+        acknowledge keep receiving the full history.
+        """
+        chat = self.st.session_state.user_chats[self.st.session_state["session_id"]]
+        messages = chat["messages"]
         self.current_run_id = str(uuid.uuid4())
         # Set run_id in session state at start of processing
         self.st.session_state["run_id"] = self.current_run_id
-        stream = self.client.stream_messages(
-            data={
-                "input": {"messages": messages},
-                "config": {
-                    "run_id": self.current_run_id,
-                    "metadata": {
-                        "user_id": self.st.session_state["user_id"],
-                        "session_id": self.st.session_state["session_id"],
-                    },
-                },
-            }
+        history_offset = self._history_offset(chat)
+        # Restored once the server acknowledges this turn; a failed turn
+        # leaves the next one to resend the full history.
+        chat.pop(SYNCED_MESSAGE_COUNT_KEY, None)
+        control = asyncio.run(
+            self._consume(
+                self.client.stream_messages(
+                    data=self._build_request(messages, history_offset)
+                )
+            )
         )
-        # Each event is a tuple message, metadata. https://langchain-ai.github.io/langgraph/how-tos/streaming/#messages
-        for message, _ in stream:
-            if isinstance(message, dict):
-                if message.get("type") == "constructor":
-                    message = message["kwargs"]
-
-                    # Handle tool calls
-                    if message.get("tool_calls"):
-                        tool_calls = message["tool_calls"]
-                        ai_message = AIMessage(content="", tool_calls=tool_calls)
-                        self.tool_calls.append(ai_message.model_dump())
-                        for tool_call in tool_calls:
-                            msg = f"\n\nCalling tool: `{tool_call['name']}` with args: `{tool_call['args']}`"
-                            self.stream_handler.new_status(msg)
-
-                    # Handle tool responses
-                    elif message.get("tool_call_id"):
-                        content = message["content"]
-                        tool_call_id = message["tool_call_id"]
-                        tool_message = ToolMessage(
-                            content=content, type="tool", tool_call_id=tool_call_id
-                        ).model_dump()
-                        self.tool_calls.append(tool_message)
-                        msg = f"\n\nTool response: `{content}`"
-                        self.stream_handler.new_status(msg)
-
-                    # Handle incremental AI response chunks
-                    # These are partial content pieces that need to be accumulated
-                    elif (
-                        message.get("content")
-                        and message.get("type") == "AIMessageChunk"
-                    ):
-                        self.final_content += message.get("content")
-                        self.stream_handler.new_token(message.get("content"))
+        if control.get("type") == HISTORY_MISMATCH_EVENT and history_offset:
+            control = asyncio.run(
+                self._consume(
+                    self.client.stream_messages(data=self._build_request(messages, 0))
+                )
+            )
+        self._finish(messages)
+        if control.get("type") == HISTORY_SYNCED_EVENT:
+            chat[SYNCED_MESSAGE_COUNT_KEY] = control["message_count"]
 
-                    # Handle complete AI responses
-                    # This is used when receiving a full message rather than chunks
-                    elif message.get("content") and message.get("type") == "ai":
-                        self.final_content = message.get("content")
+    async def _consume(self, stream: Iterator[Any]) -> dict[str, Any]:
+        """Handle the response stream, reading ahead while the UI updates.
+
+        A producer task pulls events from the (blocking) stream in a worker
+        thread into a bounded queue, so the next network read overlaps with
+        rendering the current event.
+
+        Returns:
+            The last history control event, or an empty dict. Reading stops
+            at a `history_mismatch` event.
+        """
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        stopped = False
+        control: dict[str, Any] = {}
+
+        async def produce() -> None:
+            while True:
+                try:
+                    event = await asyncio.to_thread(next, stream, _END_OF_STREAM)
+                except Exception as e:
+                    event = e
+                if stopped:
+                    return
+                await queue.put(event)
+                if event is _END_OF_STREAM or isinstance(event, Exception):
+                    return
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is _END_OF_STREAM:
+                    return control
+                if isinstance(event, Exception):
+                    raise event
+                if isinstance(event, dict):
+                    if event.get("type") in (
+                        HISTORY_SYNCED_EVENT,
+                        HISTORY_MISMATCH_EVENT,
+                    ):
+                        control = event
+                    if event.get("type") == HISTORY_MISMATCH_EVENT:
+                        return control
+                    continue
+                # Each event is a tuple message, metadata. https://langchain-ai.github.io/langgraph/how-tos/streaming/#messages
+                message, _ = event
+                self._handle_message(message)
+        finally:
+            # Let the producer finish its current read before closing the
+            # stream; draining unblocks it if it is waiting on a full queue.
+            stopped = True
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    @staticmethod
+    def _message_kind(message: dict[str, Any]) -> str | None:
+        """Classify a streamed message for the dispatcher table."""
+        if message.get("tool_calls"):
+            return "tool_calls"
+        if message.get("tool_call_id"):
+            return "tool_response"
+        if message.get("content") and message.get("type") in ("AIMessageChunk", "ai"):
+            return message["type"]
+        return None
+
+    def _handle_message(self, message: Any) -> None:
+        """Dispatch a single streamed message to its handler."""
+        if not isinstance(message, dict) or message.get("type") != "constructor":
+            return
+        message = message["kwargs"]
+        handler = self._handlers.get(self._message_kind(message))
+        if handler is not None:
+            handler(self, message)
+
+    def _on_tool_calls(self, message: dict[str, Any]) -> None:
+        tool_calls = message["tool_calls"]
+        self.tool_calls.append(ai_message_dict("", tool_calls=tool_calls))
+        for tool_call in tool_calls:
+            msg = f"\n\nCalling tool: `{tool_call['name']}` with args: `{tool_call['args']}`"
+            self.stream_handler.new_status(msg)
+
+    def _on_tool_response(self, message: dict[str, Any]) -> None:
+        content = message["content"]
+        self.tool_calls.append(tool_message_dict(content, message["tool_call_id"]))
+        msg = f"\n\nTool response: `{content}`"
+        self.stream_handler.new_status(msg)
+
+    def _on_ai_chunk(self, message: dict[str, Any]) -> None:
+        # Partial content pieces that need to be accumulated
+        self.final_content += message["content"]
+        self.stream_handler.new_token(message["content"])
+
+    def _on_ai_message(self, message: dict[str, Any]) -> None:
+        # A full message rather than chunks
+        self.final_content = message["content"]
+
+    _handlers: ClassVar[dict[str | None, Callable[[Any, dict[str, Any]], None]]] = {
+        "tool_calls": _on_tool_calls,
+        "tool_response": _on_tool_response,
+        "AIMessageChunk": _on_ai_chunk,
+        "ai": _on_ai_message,
+    }
 
-        # Handle end of stream
+    def _finish(self, messages: list[dict[str, Any]]) -> None:
+        """Append the tool calls and the final answer to the chat history."""
+        self.stream_handler.flush()
         if self.final_content:
-            final_message = AIMessage(
-                content=self.final_content,
-                id=self.current_run_id,
-                additional_kwargs=self.additional_kwargs,
-            ).model_dump()
-            session = self.st.session_state["session_id"]
-            self.st.session_state.user_chats[session]["messages"] = (
-                self.st.session_state.user_chats[session]["messages"] + self.tool_calls
+            messages.extend(self.tool_calls)
+            messages.append(
+                ai_message_dict(
+                    self.final_content,
+                    id=self.current_run_id,
+                    additional_kwargs=self.additional_kwargs,
+                )
             )
-            self.st.session_state.user_chats[session]["messages"].append(final_message)
             self.st.session_state.run_id = self.current_run_id
 
 
@@ -0,0 +1,271 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Chunked Firestore layout for processed documents.
+
+A processed document is stored as a small header document plus two
+subcollections, so no single Firestore document grows past the 1 MiB limit
+and readers can fetch only the parts they need:
+
+    {collection}/{doc_id}                   header: gcs_path, counts, sizes
+    {collection}/{doc_id}/chunks/{index}    text of one page (or part of one)
+    {collection}/{doc_id}/entities/{index}  a batch of extracted entities
+"""
+
+from collections.abc import Iterator
+from typing import Any
+from urllib.parse import quote
+
+LAYOUT_VERSION = 2
+CHUNKS_SUBCOLLECTION = "chunks"
+ENTITIES_SUBCOLLECTION = "entities"
+# Firestore documents are capped at 1 MiB; leave headroom for field names.
+MAX_CHUNK_BYTES = 512 * 1024
+ENTITY_BATCH_SIZE = 500
+# Attempts per BulkWriter write before save_chunked_document gives up.
+MAX_WRITE_ATTEMPTS = 5
+
+
+class DocumentWriteError(RuntimeError):
+    """Raised when some writes of a chunked document failed."""
+
+
+def firestore_document_id(file_name: str) -> str:
+    """Returns the header document ID for an object name.
+
+    The name is percent-encoded so that slashes and extensions are kept and
+    different files (e.g. `a.pdf` and `a.docx`) never share an ID.
+    """
+    return quote(file_name, safe="")
+
+
+def _chunk_id(index: int) -> str:
+    # Zero-padded so that document IDs sort in chunk order.
+    return f"{index:06d}"
+
+
+def _split_utf8(text: str, max_bytes: int) -> list[str]:
+    """Splits text into pieces whose UTF-8 encoding fits in max_bytes."""
+    data = text.encode("utf-8")
+    if len(data) <= max_bytes:
+        return [text]
+    pieces = []
+    start = 0
+    while start < len(data):
+        end = min(start + max_bytes, len(data))
+        # Never cut inside a multi-byte character.
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        pieces.append(data[start:end].decode("utf-8"))
+        start = end
+    return pieces
+
+
+def page_spans_from_document(document: Any) -> list[tuple[int, int]]:
+    """Returns the (start, end) text offsets of each page of a DocAI document.
+
+    Pages without text get an empty (0, 0) span so page numbers stay aligned.
+    """
+    spans = []
+    for page in document.pages:
+        segments = page.layout.text_anchor.text_segments
+        if not segments:
+            spans.append((0, 0))
+            continue
+        spans.append(
+            (
+                min(int(segment.start_index) for segment in segments),
+                max(int(segment.end_index) for segment in segments),
+            )
+        )
+    return spans
+
+
+def split_text_into_chunks(
+    text: str,
+    page_spans: list[tuple[int, int]] | None = None,
+    max_chunk_bytes: int = MAX_CHUNK_BYTES,
+) -> list[dict[str, Any]]:
+    """Splits document text into page-aligned chunks.
+
+    Each page becomes one chunk; pages larger than `max_chunk_bytes` are split
+    further. Without page information the text is split purely by size.
+
+    Args:
+        text: The full document text.
+        page_spans: (start, end) offsets of each page in `text`.
+        max_chunk_bytes: Maximum UTF-8 size of a single chunk.
+
+    Returns:
+        A list of {"index", "page", "text"} dicts in document order. `page` is
+        the zero-based page number, or None when pages are unknown.
+    """
+    if not page_spans:
+        page_spans = [(0, len(text))]
+        pages: list[int | None] = [None]
+    else:
+        pages = list(range(len(page_spans)))
+
+    chunks = []
+    for page, (start, end) in zip(pages, page_spans, strict=True):
+        for piece in _split_utf8(text[start:end], max_chunk_bytes):
+            if piece:
+                chunks.append({"index": len(chunks), "page": page, "text": piece})
+    return chunks
+
+
+def save_chunked_document(
+    client: Any,
+    collection: str,
+    doc_id: str,
+    text: str,
+    entities: list[dict[str, Any]],
+    metadata: dict[str, Any],
+    page_spans: list[tuple[int, int]] | None = None,
+) -> dict[str, Any]:
+    """Writes a processed document using the chunked layout.
+
+    Chunks and entity batches are written with a BulkWriter first, and the
+    header only once they all succeeded, so a new header never points at chunks
+    that were not written. Chunks are overwritten in place, so while a document
+    is being rewritten readers holding the old header may see a mix of old and
+    new chunks. Chunks left over from a previous, longer version are deleted
+    after the header.
+
+    Args:
+        client: A `firestore.Client`.
+        collection: The Firestore collection holding processed documents.
+        doc_id: The header document ID.
+        text: The full document text.
+        entities: Extracted entities as plain dicts.
+        metadata: Extra fields stored on the header (e.g. gcs_path).
+        page_spans: (start, end) offsets of each page in `text`.
+
+    Returns:
+        The header document data that was written.
+
+    Raises:
+        DocumentWriteError: A write still failed after MAX_WRITE_ATTEMPTS
+            attempts. If it was a chunk or entity write, the header was not
+            written.
+    """
+    header_ref = client.collection(collection).document(doc_id)
+    previous = header_ref.get()
+    previous_data = previous.to_dict() if previous.exists else {}
+
+    chunks = split_text_into_chunks(text, page_spans)
+    entity_batches = [
+        entities[i : i + ENTITY_BATCH_SIZE]
+        for i in range(0, len(entities), ENTITY_BATCH_SIZE)
+    ]
+
+    writer = client.bulk_writer()
+    failures = []
+
+    def on_write_error(failure: Any, _: Any) -> bool:
+        if failure.attempts < MAX_WRITE_ATTEMPTS:
+            return True
+        failures.append(failure)
+        return False
+
+    def flush(step: str) -> None:
+        writer.flush()
+        if failures:
+            writer.close()
+            raise DocumentWriteError(
+                f"{len(failures)} {step} writes of {doc_id} failed: "
+                f"{failures[0].message}"
+            )
+
+    writer.on_write_error(on_write_error)
+    chunks_ref = header_ref.collection(CHUNKS_SUBCOLLECTION)
+    for chunk in chunks:
+        writer.set(chunks_ref.document(_chunk_id(chunk["index"])), chunk)
+    entities_ref = header_ref.collection(ENTITIES_SUBCOLLECTION)
+    for index, batch in enumerate(entity_batches):
+        writer.set(
+            entities_ref.document(_chunk_id(index)),
+            {"index": index, "entities": batch},
+        )
+    flush("chunk")
+
+    header = {
+        **metadata,
+        "layout_version": LAYOUT_VERSION,
+        "text_length": len(text),
+        "page_count": len(page_spans or []),
+        "chunk_count": len(chunks),
+        "entity_count": len(entities),
+        "entity_batch_count": len(entity_batches),
+    }
+    writer.set(header_ref, header)
+    flush("header")
+
+    for index in range(len(chunks), previous_data.get("chunk_count", 0)):
+        writer.delete(chunks_ref.document(_chunk_id(index)))
+    for index in range(len(entity_batches), previous_data.get("entity_batch_count", 0)):
+        writer.delete(entities_ref.document(_chunk_id(index)))
+    flush("cleanup")
+    writer.close()
+    return header
+
+
+def get_document_header(
+    client: Any, collection: str, doc_id: str
+) -> dict[str, Any] | None:
+    """Returns the header of a processed document, or None if it is missing."""
+    snapshot = client.collection(collection).document(doc_id).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+def get_document_chunk(
+    client: Any, collection: str, doc_id: str, index: int
+) -> dict[str, Any] | None:
+    """Fetches a single text chunk without reading the rest of the document."""
+    snapshot = (
+        client.collection(collection)
+        .document(doc_id)
+        .collection(CHUNKS_SUBCOLLECTION)
+        .document(_chunk_id(index))
+        .get()
+    )
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+def iter_document_chunks(
+    client: Any, collection: str, doc_id: str
+) -> Iterator[dict[str, Any]]:
+    """Streams the text chunks of a processed document in order."""
+    query = (
+        client.collection(collection)
+        .document(doc_id)
+        .collection(CHUNKS_SUBCOLLECTION)
+        .order_by("index")
+    )
+    for snapshot in query.stream():
+        yield snapshot.to_dict()
+
+
+def iter_document_entities(
+    client: Any, collection: str, doc_id: str
+) -> Iterator[dict[str, Any]]:
+    """Streams the extracted entities of a processed document."""
+    query = (
+        client.collection(collection)
+        .document(doc_id)
+        .collection(ENTITIES_SUBCOLLECTION)
+        .order_by("index")
+    )
+    for snapshot in query.stream():
+        yield from snapshot.to_dict()["entities"]
@@ -12,9 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import json
+import mimetypes
 import os
+import time
+
+from document_store import (
+    firestore_document_id,
+    page_spans_from_document,
+    save_chunked_document,
+)
 from google.cloud import documentai_v1 as documentai
-from google.cloud import firestore
+from google.cloud import firestore, storage
 
 # --- Environment Variables ---
 # These will be set in the Cloud Function's configuration
@@ -22,56 +32,529 @@ GCP_PROJECT_ID = os.environ.get("GCP_PROJECT_ID")
 GCP_LOCATION = os.environ.get("GCP_LOCATION")
 DOCAI_PROCESSOR_ID = os.environ.get("DOCAI_PROCESSOR_ID")
 FIRESTORE_COLLECTION = os.environ.get("FIRESTORE_COLLECTION")
+# "online" processes each upload as it arrives; "batch" leaves uploads to be
+# picked up by `batch_process_documents_from_gcs`.
+DOCAI_PROCESSING_MODE = os.environ.get("DOCAI_PROCESSING_MODE", "online")
+# Default input prefix and output location for batch jobs, e.g.
+# gs://my-bucket/incoming/ and gs://my-bucket/docai-output/. The output location
+# must not be under the input prefix.
+DOCAI_BATCH_INPUT_PREFIX = os.environ.get("DOCAI_BATCH_INPUT_PREFIX")
+DOCAI_BATCH_OUTPUT_URI = os.environ.get("DOCAI_BATCH_OUTPUT_URI")
+# Maximum number of documents submitted in one batch request.
+DOCAI_BATCH_MAX_DOCUMENTS = int(os.environ.get("DOCAI_BATCH_MAX_DOCUMENTS", "1000"))
+# Firestore collection tracking submitted batch jobs until their results are saved.
+DOCAI_BATCH_JOBS_COLLECTION = os.environ.get(
+    "DOCAI_BATCH_JOBS_COLLECTION", "docai_batch_jobs"
+)
+# Optional JSON object mapping MIME types to processor IDs, e.g.
+# {"application/vnd.openxmlformats-officedocument.wordprocessingml.document": "<layout-parser-id>"}
+DOCAI_PROCESSOR_ROUTES = json.loads(os.environ.get("DOCAI_PROCESSOR_ROUTES", "{}"))
+# Bucket that failed or unsupported uploads are copied to, if set.
+DEAD_LETTER_BUCKET = os.environ.get("DEAD_LETTER_BUCKET")
+# A "processing" claim older than this is considered abandoned and can be retaken.
+PROCESSING_LEASE_SECONDS = int(os.environ.get("PROCESSING_LEASE_SECONDS", "900"))
+
+# MIME types handled by the default processor (DOCAI_PROCESSOR_ID).
+DEFAULT_PROCESSOR_MIME_TYPES = (
+    "application/pdf",
+    "image/bmp",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/tiff",
+    "image/webp",
+)
+
+# Processing status recorded on the Firestore header document.
+STATUS_PROCESSING = "processing"
+STATUS_PROCESSED = "processed"
+STATUS_FAILED = "failed"
+
+# --- Clients ---
+# Created on first use and reused across warm invocations of the same instance.
+_docai_client = None
+_firestore_client = None
+_storage_client = None
+
+
+def _get_docai_client() -> documentai.DocumentProcessorServiceClient:
+    global _docai_client
+    if _docai_client is None:
+        _docai_client = documentai.DocumentProcessorServiceClient(
+            client_options={"api_endpoint": f"{GCP_LOCATION}-documentai.googleapis.com"}
+        )
+    return _docai_client
+
+
+def _get_firestore_client() -> firestore.Client:
+    global _firestore_client
+    if _firestore_client is None:
+        _firestore_client = firestore.Client()
+    return _firestore_client
+
+
+def _get_storage_client() -> storage.Client:
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client()
+    return _storage_client
+
+
+def _split_gcs_uri(gcs_uri: str) -> tuple[str, str]:
+    """Splits gs://bucket/path into (bucket, path)."""
+    bucket_name, _, path = gcs_uri.removeprefix("gs://").partition("/")
+    return bucket_name, path
+
+
+def _processor_for(mime_type: str | None) -> str | None:
+    """Returns the Document AI processor ID configured for a MIME type."""
+    if mime_type in DOCAI_PROCESSOR_ROUTES:
+        return DOCAI_PROCESSOR_ROUTES[mime_type]
+    if mime_type in DEFAULT_PROCESSOR_MIME_TYPES:
+        return DOCAI_PROCESSOR_ID
+    return None
+
+
+def _save_document(file_name: str, gcs_uri: str, shards, metadata=None) -> None:
+    """Saves the text and entities of a processed document to Firestore.
+
+    `shards` is the list of Document AI documents making up the file (a single
+    document for online processing, one per shard for batch output).
+    """
+    # Prepare data for Firestore
+    text_parts = []
+    page_spans = []
+    entities = []
+    offset = 0
+    for shard in shards:
+        text_parts.append(shard.text)
+        page_spans.extend(
+            (start + offset, end + offset)
+            for start, end in page_spans_from_document(shard)
+        )
+        entities.extend(
+            {"type": entity.type_, "text": entity.mention_text}
+            for entity in shard.entities
+        )
+        offset += len(shard.text)
+
+    # Save to Firestore
+    save_chunked_document(
+        _get_firestore_client(),
+        FIRESTORE_COLLECTION,
+        firestore_document_id(file_name),
+        text="".join(text_parts),
+        entities=entities,
+        metadata={
+            **(metadata or {}),
+            "gcs_path": gcs_uri,
+            "file_name": file_name,
+            "status": STATUS_PROCESSED,
+            "status_updated_at": time.time(),
+        },
+        page_spans=page_spans,
+    )
+
+
+@firestore.transactional
+def _claim_in_transaction(
+    transaction, doc_ref, gcs_uri: str, generation: str, retry_failed: bool
+) -> bool:
+    snapshot = doc_ref.get(transaction=transaction)
+    current = snapshot.to_dict() if snapshot.exists else {}
+    if current.get("gcs_generation") == generation:
+        if current.get("status") == STATUS_PROCESSED:
+            return False
+        if current.get("status") == STATUS_FAILED and not retry_failed:
+            return False
+        lease_age = time.time() - current.get("status_updated_at", 0)
+        if (
+            current.get("status") == STATUS_PROCESSING
+            and lease_age < PROCESSING_LEASE_SECONDS
+        ):
+            return False
+    transaction.set(
+        doc_ref,
+        {
+            "gcs_path": gcs_uri,
+            "gcs_generation": generation,
+            "status": STATUS_PROCESSING,
+            "status_updated_at": time.time(),
+        },
+        merge=True,
+    )
+    return True
+
+
+def _claim(
+    file_name: str, gcs_uri: str, generation: str, retry_failed: bool = True
+) -> bool:
+    """Marks an object generation as being processed.
+
+    Returns False if this generation was already processed, or is currently
+    being processed by another invocation (duplicate event delivery). With
+    `retry_failed=False`, generations that failed are not claimed again either.
+    """
+    firestore_client = _get_firestore_client()
+    doc_ref = firestore_client.collection(FIRESTORE_COLLECTION).document(
+        firestore_document_id(file_name)
+    )
+    return _claim_in_transaction(
+        firestore_client.transaction(), doc_ref, gcs_uri, generation, retry_failed
+    )
+
+
+def _dead_letter(
+    bucket_name: str, file_name: str, generation: str, reason: str
+) -> None:
+    """Records a failed upload in Firestore and copies it to the dead-letter bucket."""
+    gcs_uri = f"gs://{bucket_name}/{file_name}"
+    try:
+        _get_firestore_client().collection(FIRESTORE_COLLECTION).document(
+            firestore_document_id(file_name)
+        ).set(
+            {
+                "gcs_path": gcs_uri,
+                "gcs_generation": generation,
+                "status": STATUS_FAILED,
+                "status_updated_at": time.time(),
+                "error": reason,
+            },
+            merge=True,
+        )
+        if DEAD_LETTER_BUCKET:
+            storage_client = _get_storage_client()
+            source_bucket = storage_client.bucket(bucket_name)
+            source_bucket.copy_blob(
+                source_bucket.blob(file_name),
+                storage_client.bucket(DEAD_LETTER_BUCKET),
+                file_name,
+                source_generation=int(generation) if generation else None,
+            )
+            print(
+                f"--- Copied {gcs_uri} to dead-letter bucket '{DEAD_LETTER_BUCKET}' ---"
+            )
+    except Exception as e:
+        print(f"--- Failed to dead-letter {gcs_uri}: {type(e).__name__}: {e} ---")
+
 
 def process_document_from_gcs(event, context):
     """
     Cloud Function triggered by a GCS event to process a document with Document AI
     and save the result to Firestore.
+
+    The processor is chosen from the object's content type, and each object
+    generation is processed at most once even if the event is delivered again.
     """
     bucket_name = event["bucket"]
     file_name = event["name"]
+    generation = str(event.get("generation", ""))
     gcs_uri = f"gs://{bucket_name}/{file_name}"
-    
-    print(f"--- Processing file: {gcs_uri} ---")
 
-    try:
-        # Initialize clients
-        docai_client = documentai.DocumentProcessorServiceClient(
-            client_options={"api_endpoint": f"{GCP_LOCATION}-documentai.googleapis.com"}
+    if DOCAI_PROCESSING_MODE == "batch":
+        print(f"--- Batch mode enabled, deferring {gcs_uri} to the next batch job ---")
+        return
+
+    print(f"--- Processing file: {gcs_uri} (generation {generation}) ---")
+
+    mime_type = event.get("contentType") or mimetypes.guess_type(file_name)[0]
+    processor_id = _processor_for(mime_type)
+    if processor_id is None:
+        print(f"--- No processor configured for MIME type '{mime_type}' ---")
+        _dead_letter(
+            bucket_name, file_name, generation, f"Unsupported MIME type: {mime_type}"
         )
-        firestore_client = firestore.Client()
+        return
+
+    try:
+        if not _claim(file_name, gcs_uri, generation):
+            print(
+                f"--- Generation {generation} of {gcs_uri} already processed or in progress, skipping ---"
+            )
+            return
+
+        docai_client = _get_docai_client()
 
         # Configure and send the DocAI request
-        processor_name = docai_client.processor_path(GCP_PROJECT_ID, GCP_LOCATION, DOCAI_PROCESSOR_ID)
-        gcs_document = documentai.GcsDocument(gcs_uri=gcs_uri, mime_type="application/pdf")
-        
+        processor_name = docai_client.processor_path(
+            GCP_PROJECT_ID, GCP_LOCATION, processor_id
+        )
+        gcs_document = documentai.GcsDocument(gcs_uri=gcs_uri, mime_type=mime_type)
+
         request = documentai.ProcessRequest(
             name=processor_name,
             gcs_document=gcs_document,
             skip_human_review=True,
         )
-        
+
         result = docai_client.process_document(request=request)
         document = result.document
 
         print("--- Document AI Processing Successful ---")
-        
-        # Prepare data for Firestore
-        doc_data = {
-            "text": document.text,
-            "entities": [{"type": entity.type_, "text": entity.mention_text} for entity in document.entities],
-            "gcs_path": gcs_uri,
+
+        _save_document(
+            file_name,
+            gcs_uri,
+            [document],
+            metadata={"gcs_generation": generation, "mime_type": mime_type},
+        )
+
+        print(
+            f"--- Successfully saved processed data to Firestore collection '{FIRESTORE_COLLECTION}' ---"
+        )
+
+    except Exception as e:
+        print("\n--- An Error Occurred ---")
+        print(f"Error Type: {type(e).__name__}")
+        print(f"Error Message: {e}")
+        _dead_letter(bucket_name, file_name, generation, f"{type(e).__name__}: {e}")
+
+
+def _iter_batch_output_documents(output_gcs_destination: str):
+    """Yields the document shards written by a batch job for one input file."""
+    bucket_name, prefix = _split_gcs_uri(output_gcs_destination)
+    # Outputs live under `<operation>/<input index>/`; without the trailing
+    # slash, index 1 would also match the shards of inputs 10, 11, ...
+    blobs = _get_storage_client().list_blobs(
+        bucket_name, prefix=prefix.rstrip("/") + "/"
+    )
+    for blob in sorted(blobs, key=lambda b: b.name):
+        if not blob.name.endswith(".json"):
+            continue
+        yield documentai.Document.from_json(
+            blob.download_as_bytes(), ignore_unknown_fields=True
+        )
+
+
+def _batch_job_ref(operation_name: str):
+    operation_id = operation_name.rsplit("/", 1)[-1]
+    return (
+        _get_firestore_client()
+        .collection(DOCAI_BATCH_JOBS_COLLECTION)
+        .document(operation_id)
+    )
+
+
+def _submit_batch_job(
+    processor_id: str, documents: list[dict], gcs_output_uri: str
+) -> str:
+    """Starts a batch job for claimed documents and records it in Firestore.
+
+    Returns:
+        The name of the batch job's long-running operation.
+    """
+    docai_client = _get_docai_client()
+    request = documentai.BatchProcessRequest(
+        name=docai_client.processor_path(GCP_PROJECT_ID, GCP_LOCATION, processor_id),
+        input_documents=documentai.BatchDocumentsInputConfig(
+            gcs_documents=documentai.GcsDocuments(
+                documents=[
+                    documentai.GcsDocument(
+                        gcs_uri=document["gcs_uri"], mime_type=document["mime_type"]
+                    )
+                    for document in documents
+                ]
+            )
+        ),
+        document_output_config=documentai.DocumentOutputConfig(
+            gcs_output_config=documentai.DocumentOutputConfig.GcsOutputConfig(
+                gcs_uri=gcs_output_uri
+            )
+        ),
+        skip_human_review=True,
+    )
+    operation_name = docai_client.batch_process_documents(
+        request=request
+    ).operation.name
+    _batch_job_ref(operation_name).set(
+        {
+            "operation_name": operation_name,
+            "processor_id": processor_id,
+            "documents": documents,
+            "submitted_at": time.time(),
         }
+    )
+    return operation_name
+
 
-        # Save to Firestore
-        firestore_doc_name = file_name.replace(".pdf", "")
-        firestore_ref = firestore_client.collection(FIRESTORE_COLLECTION).document(firestore_doc_name)
-        firestore_ref.set(doc_data)
-        
-        print(f"--- Successfully saved processed data to Firestore collection '{FIRESTORE_COLLECTION}' ---")
+def _save_batch_results(job: dict, operation) -> int:
+    """Saves the output of a finished batch job; failed documents are dead-lettered.
 
+    Returns:
+        The number of documents saved.
+    """
+    pending = {document["gcs_uri"]: document for document in job["documents"]}
+    saved = 0
+    if operation.HasField("error"):
+        print(f"--- Batch job {operation.name} failed: {operation.error.message} ---")
+        statuses = []
+    else:
+        statuses = documentai.BatchProcessMetadata.deserialize(
+            operation.metadata.value
+        ).individual_process_statuses
+    for status in statuses:
+        document = pending.pop(status.input_gcs_source, None)
+        if document is None:
+            continue
+        gcs_uri = document["gcs_uri"]
+        bucket_name, file_name = _split_gcs_uri(gcs_uri)
+        if status.status.code or not status.output_gcs_destination:
+            print(f"--- No output for {gcs_uri}: {status.status.message} ---")
+            _dead_letter(
+                bucket_name,
+                file_name,
+                document["generation"],
+                status.status.message or "No batch output",
+            )
+            continue
+        try:
+            shards = sorted(
+                _iter_batch_output_documents(status.output_gcs_destination),
+                key=lambda shard: shard.shard_info.shard_index,
+            )
+            _save_document(
+                file_name,
+                gcs_uri,
+                shards,
+                metadata={
+                    "gcs_generation": document["generation"],
+                    "mime_type": document["mime_type"],
+                },
+            )
+            saved += 1
+        except Exception as e:
+            print(f"--- Failed to save batch output for {gcs_uri} ---")
+            print(f"Error Type: {type(e).__name__}")
+            print(f"Error Message: {e}")
+            _dead_letter(
+                bucket_name,
+                file_name,
+                document["generation"],
+                f"{type(e).__name__}: {e}",
+            )
+    reason = (
+        f"Batch job failed: {operation.error.message}"
+        if operation.HasField("error")
+        else "No batch output"
+    )
+    for document in pending.values():
+        bucket_name, file_name = _split_gcs_uri(document["gcs_uri"])
+        _dead_letter(bucket_name, file_name, document["generation"], reason)
+    return saved
+
+
+def _collect_batch_jobs() -> tuple[int, set[str]]:
+    """Saves the results of batch jobs that finished since the last run.
+
+    Returns:
+        The number of documents saved, and the GCS URIs of documents whose
+        batch jobs are still running.
+    """
+    docai_client = _get_docai_client()
+    saved = 0
+    running = set()
+    for snapshot in (
+        _get_firestore_client().collection(DOCAI_BATCH_JOBS_COLLECTION).stream()
+    ):
+        job = snapshot.to_dict()
+        operation = docai_client.get_operation(request={"name": job["operation_name"]})
+        if not operation.done:
+            running.update(document["gcs_uri"] for document in job["documents"])
+            continue
+        print(f"--- Batch job {job['operation_name']} finished ---")
+        saved += _save_batch_results(job, operation)
+        _batch_job_ref(job["operation_name"]).delete()
+    return saved, running
+
+
+def run_batch_job(gcs_input_prefix: str, gcs_output_uri: str) -> int:
+    """Processes new documents under a GCS prefix with Document AI batch jobs.
+
+    Each run first saves the output of batch jobs started by earlier runs that
+    have finished, then claims the object generations under the prefix that
+    were not processed yet and starts one batch job per processor for them,
+    without waiting for the jobs to finish. Uploads are routed by MIME type and
+    dead-lettered like in `process_document_from_gcs`.
+
+    Returns:
+        The number of documents saved.
+    """
+    saved, running = _collect_batch_jobs()
+    print(
+        f"--- Saved {saved} documents to Firestore collection '{FIRESTORE_COLLECTION}' ---"
+    )
+
+    bucket_name, prefix = _split_gcs_uri(gcs_input_prefix)
+    claimed: dict[str, list[dict]] = {}
+    for blob in _get_storage_client().list_blobs(bucket_name, prefix=prefix):
+        gcs_uri = f"gs://{bucket_name}/{blob.name}"
+        if blob.name.endswith("/") or gcs_uri in running:
+            continue
+        generation = str(blob.generation or "")
+        if not _claim(blob.name, gcs_uri, generation, retry_failed=False):
+            continue
+        mime_type = blob.content_type or mimetypes.guess_type(blob.name)[0]
+        processor_id = _processor_for(mime_type)
+        if processor_id is None:
+            print(f"--- No processor configured for MIME type '{mime_type}' ---")
+            _dead_letter(
+                bucket_name,
+                blob.name,
+                generation,
+                f"Unsupported MIME type: {mime_type}",
+            )
+            continue
+        claimed.setdefault(processor_id, []).append(
+            {"gcs_uri": gcs_uri, "generation": generation, "mime_type": mime_type}
+        )
+
+    for processor_id, documents in claimed.items():
+        for i in range(0, len(documents), DOCAI_BATCH_MAX_DOCUMENTS):
+            batch = documents[i : i + DOCAI_BATCH_MAX_DOCUMENTS]
+            try:
+                operation_name = _submit_batch_job(processor_id, batch, gcs_output_uri)
+            except Exception as e:
+                print(f"--- Failed to start batch job for processor {processor_id} ---")
+                print(f"Error Type: {type(e).__name__}")
+                print(f"Error Message: {e}")
+                for document in batch:
+                    _, file_name = _split_gcs_uri(document["gcs_uri"])
+                    _dead_letter(
+                        bucket_name,
+                        file_name,
+                        document["generation"],
+                        f"{type(e).__name__}: {e}",
+                    )
+                continue
+            print(
+                f"--- Started batch job {operation_name} for {len(batch)} documents ---"
+            )
+    return saved
+
+
+def batch_process_documents_from_gcs(event, context):
+    """
+    Cloud Function triggered by a Pub/Sub message (e.g. from Cloud Scheduler) to
+    process new uploads under a prefix with Document AI batch jobs.
+
+    Batch jobs started by one run are saved by the first run after they finish.
+
+    The message data may be a JSON object with `gcs_input_prefix` and
+    `gcs_output_uri`; missing values fall back to the environment.
+    """
+    payload = {}
+    if event.get("data"):
+        payload = json.loads(base64.b64decode(event["data"]).decode("utf-8"))
+
+    gcs_input_prefix = payload.get("gcs_input_prefix", DOCAI_BATCH_INPUT_PREFIX)
+    gcs_output_uri = payload.get("gcs_output_uri", DOCAI_BATCH_OUTPUT_URI)
+    if not gcs_input_prefix or not gcs_output_uri:
+        print("--- Missing batch input prefix or output URI, nothing to do ---")
+        return
+
+    try:
+        run_batch_job(gcs_input_prefix, gcs_output_uri)
     except Exception as e:
-        print(f"\n--- An Error Occurred ---")
+        print("\n--- An Error Occurred ---")
         print(f"Error Type: {type(e).__name__}")
         print(f"Error Message: {e}")
-        # Depending on the error, you might want to add retry logic or move the file to an error bucket.
@@ -1,13 +1,13 @@
-from fastapi import FastAPI
-from google.adk.cli.fast_api import get_fast_api_app
 import os
 
-app: FastAPI = get_fast_api_app(
-    # Scan account_discovery_agent/ folder for agents to serve.
-    agents_dir=os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "account_discovery_agent"
-    ),
-    session_service_uri="sqlite:///./sessions.db",
-    allow_origins=["*"],
-    web=True,
+from common.web_app import create_web_app
+
+# Scan account_discovery_agent/ folder for agents to serve.
+AGENTS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "account_discovery_agent"
 )
+
+# Sessions are stored per SESSION_SERVICE_URI (SQLite by default, or Redis to
+# share them between instances); token streaming on /run_sse is coalesced.
+# See common/web_app.py for the environment variables.
+app = create_web_app(AGENTS_DIR)
@@ -0,0 +1,355 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs account discovery for many companies concurrently.
+
+Reads accounts from a CSV or JSONL file (one row per company, with a `url`
+column and optional `id`, `selected_prompts`, `custom_instructions` and
+`query`), runs them through the account discovery agent, which researches
+the company at `url` with Google Search, with at most `--concurrency`
+sessions at a time, and writes each report to
+`<output-dir>/reports/` as soon as it is done. One runner, session service
+and model response cache are shared by all accounts.
+
+Progress is appended to `<output-dir>/checkpoint.jsonl`; re-running the same
+command skips accounts that already succeeded, so an interrupted nightly run
+resumes where it stopped.
+
+Example:
+    uv run python run_batch.py accounts.csv --output-dir batch_out \
+        --concurrency 16 --cache-path batch_out/responses.db
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Any
+
+from google.adk.runners import Runner
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    InMemorySessionService,
+)
+from google.genai import types as genai_types
+
+from account_discovery_agent.agent import create_discovery_agent
+from common.response_cache import (
+    MemoryResponseCache,
+    ResponseCache,
+    ResponseCachePlugin,
+    SqliteResponseCache,
+    TieredResponseCache,
+)
+from common.session_store import install_sqlite_pragmas, session_db_kwargs
+
+APP_NAME = "account_discovery_agent"
+USER_ID = "batch"
+CHECKPOINT_FILE = "checkpoint.jsonl"
+REPORTS_DIR = "reports"
+DEFAULT_QUERY = "Generate the report."
+DEFAULT_SELECTED_PROMPTS = "- Company Overview\n- Products and Services"
+# Session state the discovery instruction is rendered from; also part of the
+# response cache key so that accounts never share a cached report.
+ACCOUNT_STATE_KEYS = ("url", "selected_prompts", "custom_instructions")
+
+
+def read_accounts(path: str) -> list[dict[str, str]]:
+    """Reads accounts from a CSV file or, for `.jsonl` files, JSON lines.
+
+    Rows without a `url` are skipped; rows without an `id` use the URL.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    accounts = []
+    for row in rows:
+        url = (row.get("url") or "").strip()
+        if not url:
+            logging.warning(f"Skipping account without url: {row}")
+            continue
+        accounts.append({**row, "url": url, "id": (row.get("id") or url).strip()})
+    return accounts
+
+
+def read_checkpoint(path: str) -> dict[str, dict[str, Any]]:
+    """Returns the last checkpoint record of every account, by account ID."""
+    records: dict[str, dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run.
+                continue
+            records[record["id"]] = record
+    return records
+
+
+def report_filename(account_id: str) -> str:
+    """Returns a file system safe name for an account's report."""
+    slug = re.sub(r"^https?://", "", account_id)
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", slug).strip("_")
+    return f"{slug[:150] or 'account'}.md"
+
+
+class BatchRunner:
+    """Runs accounts through one shared Runner and records their results.
+
+    Args:
+        runner: The runner, shared by all sessions.
+        session_service: The runner's session service.
+        output_dir: Where reports and the checkpoint file are written.
+        concurrency: Maximum number of accounts processed at the same time.
+        retries: Attempts per account after the first failure.
+        timeout: Seconds an attempt may take, or None for no limit.
+        keep_sessions: Keep finished sessions instead of deleting them.
+        defaults: Default values for account fields missing in the input.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        session_service: BaseSessionService,
+        output_dir: str,
+        concurrency: int = 8,
+        retries: int = 2,
+        timeout: float | None = None,
+        keep_sessions: bool = False,
+        defaults: dict[str, str] | None = None,
+    ) -> None:
+        self.runner = runner
+        self.session_service = session_service
+        self.output_dir = output_dir
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.timeout = timeout
+        self.keep_sessions = keep_sessions
+        self.defaults = defaults or {}
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self._checkpoint_lock = asyncio.Lock()
+        self._counts = {"ok": 0, "error": 0}
+        self._total = 0
+        os.makedirs(os.path.join(output_dir, REPORTS_DIR), exist_ok=True)
+
+    async def _run_once(self, account: dict[str, str], session_id: str) -> str:
+        state = {
+            "url": account["url"],
+            "selected_prompts": account.get("selected_prompts")
+            or self.defaults.get("selected_prompts", DEFAULT_SELECTED_PROMPTS),
+            "custom_instructions": account.get("custom_instructions")
+            or self.defaults.get("custom_instructions", ""),
+        }
+        await self.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state=state
+        )
+        query = account.get("query") or self.defaults.get("query", DEFAULT_QUERY)
+        report = ""
+        try:
+            async for event in self.runner.run_async(
+                user_id=USER_ID,
+                session_id=session_id,
+                new_message=genai_types.Content(
+                    role="user", parts=[genai_types.Part.from_text(text=query)]
+                ),
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    report = "".join(part.text or "" for part in event.content.parts)
+        finally:
+            if not self.keep_sessions:
+                await self.session_service.delete_session(
+                    app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+                )
+        if not report:
+            raise RuntimeError("The agent returned no final response.")
+        return report
+
+    async def _write_report(self, account_id: str, report: str) -> str:
+        path = os.path.join(self.output_dir, REPORTS_DIR, report_filename(account_id))
+        await asyncio.to_thread(_write_text, path, report)
+        return path
+
+    async def _checkpoint(self, record: dict[str, Any]) -> None:
+        async with self._checkpoint_lock:
+            self._counts[record["status"]] += 1
+            await asyncio.to_thread(
+                _append_line, self.checkpoint_path, json.dumps(record)
+            )
+        done = sum(self._counts.values())
+        logging.info(
+            f"[{done}/{self._total}] {record['id']}: {record['status']}"
+            f" ({self._counts['ok']} ok, {self._counts['error']} failed)"
+        )
+
+    async def run_account(self, account: dict[str, str]) -> None:
+        """Runs one account, retrying failures, and checkpoints the outcome."""
+        async with self.semaphore:
+            start = time.perf_counter()
+            error = ""
+            for attempt in range(self.retries + 1):
+                session_id = f"batch-{uuid.uuid4().hex}"
+                try:
+                    report = await asyncio.wait_for(
+                        self._run_once(account, session_id), self.timeout
+                    )
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    logging.warning(
+                        f"{account['id']}: attempt {attempt + 1} failed: {error}"
+                    )
+                    if attempt < self.retries:
+                        await asyncio.sleep(2**attempt)
+                    continue
+                path = await self._write_report(account["id"], report)
+                await self._checkpoint(
+                    {
+                        "id": account["id"],
+                        "url": account["url"],
+                        "status": "ok",
+                        "report_path": path,
+                        "attempts": attempt + 1,
+                        "elapsed_seconds": round(time.perf_counter() - start, 2),
+                    }
+                )
+                return
+            await self._checkpoint(
+                {
+                    "id": account["id"],
+                    "url": account["url"],
+                    "status": "error",
+                    "error": error,
+                    "attempts": self.retries + 1,
+                    "elapsed_seconds": round(time.perf_counter() - start, 2),
+                }
+            )
+
+    async def run(self, accounts: list[dict[str, str]]) -> dict[str, int]:
+        """Runs all accounts that have not succeeded in an earlier run.
+
+        Returns:
+            Counts of "ok", "error" and "skipped" accounts.
+        """
+        done = {
+            account_id
+            for account_id, record in read_checkpoint(self.checkpoint_path).items()
+            if record["status"] == "ok"
+        }
+        pending = [account for account in accounts if account["id"] not in done]
+        # Duplicate rows would race on the same report file; run each ID once.
+        pending = list({account["id"]: account for account in pending}.values())
+        self._total = len(pending)
+        logging.info(
+            f"{len(pending)} accounts to run, {len(accounts) - len(pending)} skipped."
+        )
+        await asyncio.gather(*(self.run_account(account) for account in pending))
+        return {**self._counts, "skipped": len(accounts) - len(pending)}
+
+
+def _write_text(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _append_line(path: str, line: str) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _session_service(db_url: str | None) -> BaseSessionService:
+    if not db_url:
+        return InMemorySessionService()
+    install_sqlite_pragmas()
+    return DatabaseSessionService(db_url=db_url, **session_db_kwargs(db_url))
+
+
+def _response_cache(cache_path: str | None) -> ResponseCache:
+    memory = MemoryResponseCache(max_entries=4096, ttl_seconds=24 * 3600)
+    if not cache_path:
+        return memory
+    return TieredResponseCache(
+        memory, SqliteResponseCache(cache_path, ttl_seconds=24 * 3600)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("accounts", help="CSV or JSONL file of accounts.")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument(
+        "--timeout", type=float, default=None, help="Seconds per attempt."
+    )
+    parser.add_argument(
+        "--session-db-url",
+        default=None,
+        help="Database URL for sessions, e.g. sqlite:///batch.db (default: memory).",
+    )
+    parser.add_argument("--keep-sessions", action="store_true")
+    parser.add_argument(
+        "--cache-path",
+        default=None,
+        help="SQLite file that keeps model responses between runs.",
+    )
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--selected-prompts", default=DEFAULT_SELECTED_PROMPTS)
+    parser.add_argument("--custom-instructions", default="")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    session_service = _session_service(args.session_db_url)
+    runner = Runner(
+        agent=create_discovery_agent(),
+        app_name=APP_NAME,
+        session_service=session_service,
+        plugins=[
+            ResponseCachePlugin(
+                _response_cache(args.cache_path), state_keys=ACCOUNT_STATE_KEYS
+            )
+        ],
+    )
+    batch = BatchRunner(
+        runner,
+        session_service,
+        args.output_dir,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        timeout=args.timeout,
+        keep_sessions=args.keep_sessions,
+        defaults={
+            "query": args.query,
+            "selected_prompts": args.selected_prompts,
+            "custom_instructions": args.custom_instructions,
+        },
+    )
+    counts = asyncio.run(batch.run(read_accounts(args.accounts)))
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Throughput benchmark for the document pipeline, run entirely in-process.
+
+Replays N uploads through `upload_and_process_document` and
+`process_document_from_gcs` against the fakes in `document_pipeline_fakes`
+and reports documents/second, latency percentiles and peak memory.
+
+Example:
+    uv run python tests/load_test/document_pipeline_benchmark.py \
+        --uploads 500 --concurrency 16 --docai-latency 0.3 --failure-rate 0.01
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from tests.load_test.document_pipeline_fakes import (
+    DocumentPipelineHarness,
+    FaultInjector,
+)
+
+
+def _percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def _summarize(name: str, latencies: list[float], elapsed: float) -> dict[str, Any]:
+    return {
+        "stage": name,
+        "count": len(latencies),
+        "docs_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def _write_sample_files(directory: str, count: int, pages: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    words = "account revenue contract renewal pipeline forecast region partner".split()
+    paths = []
+    for i in range(count):
+        page_texts = [
+            "\n".join(" ".join(rng.choices(words, k=12)) for _ in range(40))
+            for _ in range(pages)
+        ]
+        path = os.path.join(directory, f"document-{i:05d}.pdf")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\f".join(page_texts))
+        paths.append(path)
+    return paths
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    def faults(latency: float) -> FaultInjector:
+        return FaultInjector(
+            latency=latency,
+            jitter=latency * args.jitter,
+            failure_rate=args.failure_rate,
+            seed=args.seed,
+        )
+
+    harness = DocumentPipelineHarness(
+        storage_faults=faults(args.storage_latency),
+        docai_faults=faults(args.docai_latency),
+        firestore_faults=faults(args.firestore_latency),
+    )
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = _write_sample_files(tmp_dir, args.uploads, args.pages, args.seed)
+        tracemalloc.start()
+
+        # Stage 1: the upload tool.
+        upload_latencies: list[float] = []
+        upload_errors = 0
+
+        with harness.patched_upload_tool() as upload:
+
+            def timed_upload(path: str) -> tuple[float, dict]:
+                start = time.perf_counter()
+                result = upload(path)
+                return time.perf_counter() - start, result
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                for latency, result in executor.map(timed_upload, paths):
+                    upload_latencies.append(latency)
+                    upload_errors += result["status"] != "success"
+            upload_elapsed = time.perf_counter() - start
+
+        # Stage 2: the GCS-triggered function, with optional duplicate delivery.
+        events = harness.pop_events()
+        events += [e for e in events if rng.random() < args.duplicate_rate]
+        rng.shuffle(events)
+        process_latencies: list[float] = []
+
+        def timed_process(event: dict[str, Any]) -> float:
+            start = time.perf_counter()
+            harness.process(event)
+            return time.perf_counter() - start
+
+        # The function logs with print(); keep it out of the report unless asked.
+        log_sink = sys.stderr if args.verbose else io.StringIO()
+        start = time.perf_counter()
+        with (
+            contextlib.redirect_stdout(log_sink),
+            ThreadPoolExecutor(max_workers=args.concurrency) as executor,
+        ):
+            process_latencies.extend(executor.map(timed_process, events))
+        process_elapsed = time.perf_counter() - start
+
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    statuses: dict[str, int] = {}
+    for path in paths:
+        header = harness.header(os.path.basename(path)) or {}
+        status = header.get("status", "missing")
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return {
+        "config": vars(args),
+        "upload": {
+            **_summarize("upload", upload_latencies, upload_elapsed),
+            "errors": upload_errors,
+        },
+        "function": {
+            **_summarize("function", process_latencies, process_elapsed),
+            "events_delivered": len(events),
+            "docai_calls": harness.docai.calls,
+            "final_status": statuses,
+        },
+        "peak_memory_mb": round(peak_memory / 1024 / 1024, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=5, help="Pages per document.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--storage-latency", type=float, default=0.02)
+    parser.add_argument("--docai-latency", type=float, default=0.2)
+    parser.add_argument("--firestore-latency", type=float, default=0.01)
+    parser.add_argument(
+        "--jitter", type=float, default=0.5, help="Jitter as a fraction of latency."
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--duplicate-rate",
+        type=float,
+        default=0.1,
+        help="Fraction of events delivered twice.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the function's logs on stderr."
+    )
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,604 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process stand-ins for GCS, Document AI and Firestore.
+
+`DocumentPipelineHarness` wires the fakes into `functions/main.py` and
+`common.tools.upload_and_process_document` so the document pipeline can be
+exercised end to end without any Google Cloud services. Every fake call goes
+through a `FaultInjector`, which adds configurable latency and random failures.
+"""
+
+import copy
+import importlib.util
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import ModuleType, SimpleNamespace
+from typing import Any
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FUNCTIONS_DIR = os.path.join(REPO_ROOT, "functions")
+
+
+class FakeServiceError(Exception):
+    """Raised by a fake service when a failure is injected."""
+
+
+@dataclass
+class FaultInjector:
+    """Adds latency and random failures to fake service calls.
+
+    Attributes:
+        latency (float): Base latency of every call, in seconds.
+        jitter (float): Extra uniformly distributed latency, in seconds.
+        failure_rate (float): Probability that a call raises FakeServiceError.
+        seed (int | None): Seed for reproducible runs.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def call(self, operation: str) -> None:
+        """Simulates one remote call."""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise FakeServiceError(f"Injected failure in {operation}")
+
+
+# --- Cloud Storage ---
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str, **_: Any) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.content_type: str | None = None
+        self.generation: int | None = None
+
+    def _store(self, data: bytes, content_type: str | None) -> None:
+        self.bucket.client.put(self.bucket.name, self.name, data, content_type)
+
+    def upload_from_filename(
+        self, filename: str, content_type: str | None = None
+    ) -> None:
+        with open(filename, "rb") as f:
+            self.upload_from_file(f, content_type=content_type)
+
+    def upload_from_file(
+        self, file_obj: Any, content_type: str | None = None, **_: Any
+    ) -> None:
+        self._store(file_obj.read(), content_type)
+
+    def upload_from_string(
+        self, data: bytes | str, content_type: str | None = None
+    ) -> None:
+        self._store(
+            data.encode("utf-8") if isinstance(data, str) else data, content_type
+        )
+
+    def download_as_bytes(self) -> bytes:
+        return self.bucket.client.get(self.bucket.name, self.name)[0]
+
+    def reload(self) -> None:
+        _, self.content_type, self.generation = self.bucket.client.get(
+            self.bucket.name, self.name
+        )
+
+
+class FakeBucket:
+    def __init__(self, client: "FakeStorageClient", name: str) -> None:
+        self.client = client
+        self.name = name
+
+    def blob(self, name: str, **kwargs: Any) -> FakeBlob:
+        return FakeBlob(self, name, **kwargs)
+
+    def get_blob(self, name: str) -> FakeBlob | None:
+        blob = FakeBlob(self, name)
+        try:
+            blob.reload()
+        except KeyError:
+            return None
+        return blob
+
+    def copy_blob(
+        self, blob: FakeBlob, destination_bucket: "FakeBucket", new_name: str, **_: Any
+    ) -> FakeBlob:
+        data, content_type, _ = self.client.get(self.name, blob.name)
+        self.client.put(
+            destination_bucket.name, new_name, data, content_type, notify=False
+        )
+        return destination_bucket.blob(new_name)
+
+
+class FakeStorageClient:
+    """A thread-safe in-memory object store.
+
+    `on_finalize` is called with a GCS-style event for every finalized upload,
+    mirroring the trigger of `process_document_from_gcs`.
+    """
+
+    def __init__(
+        self,
+        faults: FaultInjector | None = None,
+        on_finalize: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        self.faults = faults or FaultInjector()
+        self.on_finalize = on_finalize
+        self._objects: dict[tuple[str, str], tuple[bytes, str | None, int]] = {}
+        self._generations = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket(self, name)
+
+    def put(
+        self,
+        bucket: str,
+        name: str,
+        data: bytes,
+        content_type: str | None,
+        notify: bool = True,
+    ) -> None:
+        self.faults.call("storage.upload")
+        with self._lock:
+            generation = next(self._generations)
+            self._objects[(bucket, name)] = (data, content_type, generation)
+        if notify and self.on_finalize:
+            self.on_finalize(
+                {
+                    "bucket": bucket,
+                    "name": name,
+                    "generation": str(generation),
+                    "contentType": content_type,
+                    "size": str(len(data)),
+                }
+            )
+
+    def get(self, bucket: str, name: str) -> tuple[bytes, str | None, int]:
+        self.faults.call("storage.download")
+        with self._lock:
+            return self._objects[(bucket, name)]
+
+    def list_blobs(self, bucket: str, prefix: str = "") -> list[FakeBlob]:
+        with self._lock:
+            objects = {
+                n: meta
+                for (b, n), meta in self._objects.items()
+                if b == bucket and n.startswith(prefix)
+            }
+        blobs = []
+        for name in sorted(objects):
+            blob = self.bucket(bucket).blob(name)
+            _, blob.content_type, blob.generation = objects[name]
+            blobs.append(blob)
+        return blobs
+
+
+# --- Document AI ---
+class FakeDocumentProcessorServiceClient:
+    """Turns stored bytes into a Document AI-shaped document.
+
+    The payload is decoded as UTF-8 text; form feeds (or every
+    `lines_per_page` lines) delimit pages. Batch jobs write their output when
+    they are started, and their operations report done on the first poll.
+    """
+
+    def __init__(
+        self,
+        storage_client: FakeStorageClient,
+        faults: FaultInjector | None = None,
+        lines_per_page: int = 50,
+    ) -> None:
+        self.storage_client = storage_client
+        self.faults = faults or FaultInjector()
+        self.lines_per_page = lines_per_page
+        self.calls = 0
+        self.batch_calls = 0
+        self._operations: dict[str, Any] = {}
+        self._operation_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def processor_path(self, project: str, location: str, processor: str) -> str:
+        return f"projects/{project}/locations/{location}/processors/{processor}"
+
+    def _pages(self, text: str) -> list[tuple[int, int]]:
+        spans = []
+        start = 0
+        for page_text in text.split("\f"):
+            lines = page_text.splitlines(keepends=True)
+            for i in range(0, max(len(lines), 1), self.lines_per_page):
+                length = sum(len(line) for line in lines[i : i + self.lines_per_page])
+                spans.append((start, start + length))
+                start += length
+            start += 1  # the form feed
+        return spans
+
+    def _read_text(self, gcs_uri: str) -> str:
+        bucket, _, name = gcs_uri.removeprefix("gs://").partition("/")
+        data, _, _ = self.storage_client.get(bucket, name)
+        return data.decode("utf-8", errors="replace")
+
+    def process_document(self, request: Any) -> SimpleNamespace:
+        with self._lock:
+            self.calls += 1
+        self.faults.call("documentai.process_document")
+        text = self._read_text(request.gcs_document.gcs_uri)
+        pages = [
+            SimpleNamespace(
+                layout=SimpleNamespace(
+                    text_anchor=SimpleNamespace(
+                        text_segments=[SimpleNamespace(start_index=s, end_index=e)]
+                    )
+                )
+            )
+            for s, e in self._pages(text)
+        ]
+        entities = [
+            SimpleNamespace(type_="word_count", mention_text=str(len(text.split())))
+        ]
+        return SimpleNamespace(
+            document=SimpleNamespace(text=text, pages=pages, entities=entities)
+        )
+
+    def batch_process_documents(self, request: Any) -> SimpleNamespace:
+        from google.cloud import documentai_v1 as documentai
+        from google.longrunning import operations_pb2
+        from google.protobuf import any_pb2
+
+        with self._lock:
+            self.batch_calls += 1
+            operation_id = next(self._operation_ids)
+        self.faults.call("documentai.batch_process_documents")
+        output_uri = request.document_output_config.gcs_output_config.gcs_uri
+        bucket, _, prefix = output_uri.removeprefix("gs://").partition("/")
+        statuses = []
+        for i, gcs_document in enumerate(
+            request.input_documents.gcs_documents.documents
+        ):
+            text = self._read_text(gcs_document.gcs_uri)
+            document = documentai.Document(
+                text=text,
+                pages=[
+                    documentai.Document.Page(
+                        layout=documentai.Document.Page.Layout(
+                            text_anchor=documentai.Document.TextAnchor(
+                                text_segments=[
+                                    documentai.Document.TextAnchor.TextSegment(
+                                        start_index=s, end_index=e
+                                    )
+                                ]
+                            )
+                        )
+                    )
+                    for s, e in self._pages(text)
+                ],
+            )
+            destination = f"{prefix.rstrip('/')}/{operation_id}/{i}"
+            self.storage_client.put(
+                bucket,
+                f"{destination}/document-0.json",
+                documentai.Document.to_json(document).encode("utf-8"),
+                "application/json",
+                notify=False,
+            )
+            statuses.append(
+                documentai.BatchProcessMetadata.IndividualProcessStatus(
+                    input_gcs_source=gcs_document.gcs_uri,
+                    output_gcs_destination=f"gs://{bucket}/{destination}",
+                )
+            )
+        metadata = documentai.BatchProcessMetadata(
+            state=documentai.BatchProcessMetadata.State.SUCCEEDED,
+            individual_process_statuses=statuses,
+        )
+        name = f"{request.name.split('/processors/')[0]}/operations/{operation_id}"
+        self._operations[name] = operations_pb2.Operation(
+            name=name,
+            done=True,
+            metadata=any_pb2.Any(
+                type_url="type.googleapis.com/google.cloud.documentai.v1.BatchProcessMetadata",
+                value=documentai.BatchProcessMetadata.serialize(metadata),
+            ),
+        )
+        return SimpleNamespace(operation=SimpleNamespace(name=name))
+
+    def get_operation(self, request: dict[str, str]) -> Any:
+        self.faults.call("documentai.get_operation")
+        return self._operations[request["name"]]
+
+
+# --- Firestore ---
+class FakeSnapshot:
+    def __init__(self, data: dict[str, Any] | None) -> None:
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> dict[str, Any] | None:
+        return copy.deepcopy(self._data)
+
+
+class FakeDocumentReference:
+    def __init__(self, client: "FakeFirestoreClient", path: tuple[str, ...]) -> None:
+        self.client = client
+        self.path = path
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self.client, (*self.path, name))
+
+    def get(self, transaction: Any = None) -> FakeSnapshot:
+        self.client.faults.call("firestore.get")
+        return FakeSnapshot(self.client.read(self.path))
+
+    def set(self, data: dict[str, Any], merge: bool = False) -> None:
+        self.client.faults.call("firestore.set")
+        self.client.write(self.path, data, merge)
+
+    def delete(self) -> None:
+        self.client.faults.call("firestore.delete")
+        self.client.remove(self.path)
+
+
+class FakeCollectionReference:
+    def __init__(self, client: "FakeFirestoreClient", path: tuple[str, ...]) -> None:
+        self.client = client
+        self.path = path
+        self._order_by: str | None = None
+
+    def document(self, doc_id: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self.client, (*self.path, doc_id))
+
+    def order_by(self, field: str) -> "FakeCollectionReference":
+        query = FakeCollectionReference(self.client, self.path)
+        query._order_by = field
+        return query
+
+    def stream(self) -> Iterator[FakeSnapshot]:
+        self.client.faults.call("firestore.query")
+        docs = self.client.children(self.path)
+        if self._order_by:
+            docs.sort(key=lambda d: d[self._order_by])
+        for data in docs:
+            yield FakeSnapshot(data)
+
+
+class FakeBulkWriter:
+    """Writes immediately; failed writes go through the `on_write_error` callback."""
+
+    def __init__(self, client: "FakeFirestoreClient") -> None:
+        self.client = client
+        self._on_write_error: Callable[[Any, Any], bool] = lambda failure, _: (
+            failure.attempts < 15
+        )
+
+    def on_write_error(self, callback: Callable[[Any, Any], bool]) -> None:
+        self._on_write_error = callback
+
+    def _write(self, operation: Callable[[], None]) -> None:
+        for attempts in itertools.count(1):
+            try:
+                operation()
+                return
+            except Exception as e:
+                failure = SimpleNamespace(attempts=attempts, code=14, message=str(e))
+                if not self._on_write_error(failure, self):
+                    return
+
+    def set(
+        self, ref: FakeDocumentReference, data: dict[str, Any], merge: bool = False
+    ) -> None:
+        self._write(lambda: ref.set(data, merge=merge))
+
+    def delete(self, ref: FakeDocumentReference) -> None:
+        self._write(ref.delete)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FakeTransaction:
+    """Serializes transactions on a client-wide lock; writes apply on commit.
+
+    Implements the private hooks used by `firestore.transactional`.
+    """
+
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self, client: "FakeFirestoreClient") -> None:
+        self.client = client
+        self._id: bytes | None = None
+        self._writes: list[tuple[FakeDocumentReference, dict[str, Any], bool]] = []
+
+    def _clean_up(self) -> None:
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id: bytes | None = None) -> None:
+        self.client.transaction_lock.acquire()
+        self._id = os.urandom(8)
+
+    def _commit(self) -> None:
+        try:
+            self.client.faults.call("firestore.commit")
+            for ref, data, merge in self._writes:
+                self.client.write(ref.path, data, merge)
+        finally:
+            self._release()
+
+    def _rollback(self) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        if self._id is not None:
+            self._id = None
+            self.client.transaction_lock.release()
+
+    def set(
+        self, ref: FakeDocumentReference, data: dict[str, Any], merge: bool = False
+    ) -> None:
+        self._writes.append((ref, copy.deepcopy(data), merge))
+
+
+class FakeFirestoreClient:
+    """A thread-safe in-memory document tree."""
+
+    def __init__(self, faults: FaultInjector | None = None) -> None:
+        self.faults = faults or FaultInjector()
+        self.transaction_lock = threading.Lock()
+        self._docs: dict[tuple[str, ...], dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, (name,))
+
+    def bulk_writer(self) -> FakeBulkWriter:
+        return FakeBulkWriter(self)
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction(self)
+
+    def read(self, path: tuple[str, ...]) -> dict[str, Any] | None:
+        with self._lock:
+            return copy.deepcopy(self._docs.get(path))
+
+    def write(self, path: tuple[str, ...], data: dict[str, Any], merge: bool) -> None:
+        with self._lock:
+            if merge and path in self._docs:
+                self._docs[path].update(copy.deepcopy(data))
+            else:
+                self._docs[path] = copy.deepcopy(data)
+
+    def remove(self, path: tuple[str, ...]) -> None:
+        with self._lock:
+            self._docs.pop(path, None)
+
+    def children(self, path: tuple[str, ...]) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                copy.deepcopy(data)
+                for doc_path, data in self._docs.items()
+                if len(doc_path) == len(path) + 1 and doc_path[:-1] == path
+            ]
+
+
+# --- Harness ---
+def load_function_module() -> ModuleType:
+    """Imports functions/main.py under a private name.
+
+    The module is loaded by path because the repository root also has a
+    `main.py`, and Cloud Functions imports `document_store` as a top-level
+    module.
+    """
+    os.environ.setdefault("GCP_PROJECT_ID", "local-project")
+    os.environ.setdefault("GCP_LOCATION", "us")
+    os.environ.setdefault("DOCAI_PROCESSOR_ID", "local-processor")
+    os.environ.setdefault("FIRESTORE_COLLECTION", "processed_documents")
+    if FUNCTIONS_DIR not in sys.path:
+        sys.path.insert(0, FUNCTIONS_DIR)
+    spec = importlib.util.spec_from_file_location(
+        "document_function_main", os.path.join(FUNCTIONS_DIR, "main.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class DocumentPipelineHarness:
+    """Runs the upload tool and the GCS-triggered function against fakes.
+
+    Finalized uploads are queued as events; call `deliver_pending` (or drain
+    `events` yourself) to run `process_document_from_gcs` on them.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str = "local-bucket",
+        storage_faults: FaultInjector | None = None,
+        docai_faults: FaultInjector | None = None,
+        firestore_faults: FaultInjector | None = None,
+    ) -> None:
+        self.bucket_name = bucket_name
+        self.events: list[dict[str, Any]] = []
+        self._events_lock = threading.Lock()
+        self.storage = FakeStorageClient(storage_faults, on_finalize=self._enqueue)
+        self.docai = FakeDocumentProcessorServiceClient(self.storage, docai_faults)
+        self.firestore = FakeFirestoreClient(firestore_faults)
+        self.function = load_function_module()
+        self.function._storage_client = self.storage
+        self.function._docai_client = self.docai
+        self.function._firestore_client = self.firestore
+
+    def _enqueue(self, event: dict[str, Any]) -> None:
+        with self._events_lock:
+            self.events.append(event)
+
+    def pop_events(self) -> list[dict[str, Any]]:
+        with self._events_lock:
+            events, self.events = self.events, []
+        return events
+
+    @contextmanager
+    def patched_upload_tool(self) -> Iterator[Callable[[str], dict]]:
+        """Yields `upload_and_process_document` bound to the fake bucket."""
+        from common import tools
+
+        with (
+            mock.patch.object(tools.storage, "Client", return_value=self.storage),
+            mock.patch.dict(os.environ, {"STORAGE_BUCKET_NAME": self.bucket_name}),
+        ):
+            yield tools.upload_and_process_document
+
+    def process(self, event: dict[str, Any]) -> None:
+        self.function.process_document_from_gcs(event, None)
+
+    def deliver_pending(self) -> int:
+        events = self.pop_events()
+        for event in events:
+            self.process(event)
+        return len(events)
+
+    def header(self, file_name: str) -> dict[str, Any] | None:
+        doc_id = self.function.firestore_document_id(file_name)
+        return self.firestore.read((self.function.FIRESTORE_COLLECTION, doc_id))
+
+    def text(self, file_name: str) -> str:
+        """Returns the stored text of a document, joined from its chunks."""
+        from document_store import iter_document_chunks
+
+        chunks = iter_document_chunks(
+            self.firestore,
+            self.function.FIRESTORE_COLLECTION,
+            self.function.firestore_document_id(file_name),
+        )
+        return "".join(chunk["text"] for chunk in chunks)
@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Events/second benchmark for the SQLite session store.
+
+Runs concurrent simulated research sessions against ADK's
+DatabaseSessionService, once with SQLite defaults and once with the tuned
+configuration from `common.session_store`, and reports append throughput.
+
+Example:
+    uv run python tests/load_test/session_store_benchmark.py \
+        --sessions 16 --events 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import DatabaseSessionService
+from google.genai import types as genai_types
+
+from common import session_store
+
+APP_NAME = "benchmark"
+
+
+async def _run_session(
+    service: DatabaseSessionService, index: int, events: int, payload: str
+) -> list[float]:
+    session = await service.create_session(app_name=APP_NAME, user_id=f"user-{index}")
+    latencies = []
+    for i in range(events):
+        event = Event(
+            author="section_researcher",
+            invocation_id=f"inv-{index}",
+            content=genai_types.Content(parts=[genai_types.Part(text=payload)]),
+            actions=EventActions(state_delta={"step": i}),
+        )
+        start = time.perf_counter()
+        # DatabaseSessionService is synchronous; run appends in threads the way
+        # concurrent requests would hit it.
+        await asyncio.to_thread(asyncio.run, service.append_event(session, event))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _benchmark(
+    db_url: str, engine_kwargs: dict[str, Any], args: argparse.Namespace
+) -> dict[str, Any]:
+    service = DatabaseSessionService(db_url=db_url, **engine_kwargs)
+    payload = "x" * args.payload_bytes
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(_run_session(service, i, args.events, payload) for i in range(args.sessions))
+    )
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for result in results for latency in result)
+    return {
+        "events": len(latencies),
+        "events_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions.")
+    parser.add_argument("--events", type=int, default=100, help="Events per session.")
+    parser.add_argument("--payload-bytes", type=int, default=2000)
+    args = parser.parse_args()
+
+    report: dict[str, Any] = {"config": vars(args)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        default_url = f"sqlite:///{os.path.join(tmp_dir, 'default.db')}"
+        report["default"] = asyncio.run(_benchmark(default_url, {}, args))
+
+        session_store.install_sqlite_pragmas()
+        tuned_url = f"sqlite:///{os.path.join(tmp_dir, 'tuned.db')}"
+        report["tuned"] = asyncio.run(
+            _benchmark(tuned_url, session_store.session_db_kwargs(tuned_url), args)
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
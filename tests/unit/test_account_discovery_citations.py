@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+# common.config only falls back to google.auth when no project is set.
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+from google.adk.events import Event
+from google.adk.models import LlmResponse
+from google.genai import types as genai_types
+
+from account_discovery_agent.agent import (
+    FINAL_RESPONSE_STATE_KEY,
+    citation_replacement_callback,
+    record_final_response_callback,
+)
+
+
+def _grounding(*uris: str) -> genai_types.GroundingMetadata:
+    return genai_types.GroundingMetadata(
+        grounding_chunks=[
+            genai_types.GroundingChunk(
+                web=genai_types.GroundingChunkWeb(uri=uri, title=f"Title {uri[-1]}")
+            )
+            for uri in uris
+        ]
+    )
+
+
+def _context(events: list[Event]) -> SimpleNamespace:
+    return SimpleNamespace(
+        invocation_id="inv-1",
+        agent_name="account_discovery_agent",
+        state={},
+        _invocation_context=SimpleNamespace(session=SimpleNamespace(events=events)),
+    )
+
+
+def test_recorded_response_is_used_and_sources_are_deduplicated() -> None:
+    """The recorded response is reported without scanning the session.
+
+    It is kept in the invocation's temp: state and cleared once reported.
+    """
+    context = _context(events=[])
+    record_final_response_callback(
+        context,
+        LlmResponse(
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text="Acme sells anvils.")]
+            ),
+            grounding_metadata=_grounding(
+                "https://a.example/1", "https://b.example/2", "https://a.example/1"
+            ),
+        ),
+    )
+
+    assert context.state[FINAL_RESPONSE_STATE_KEY]["text"] == "Acme sells anvils."
+    report = citation_replacement_callback(context).parts[0].text
+    assert report == (
+        "# Discovery Report\n\nAcme sells anvils.\n\n---\n\n## Sources\n"
+        "1. [Title 1](https://a.example/1)\n"
+        "2. [Title 2](https://b.example/2)\n"
+    )
+    assert context.state[FINAL_RESPONSE_STATE_KEY] is None
+
+
+def test_falls_back_to_the_last_final_response_event() -> None:
+    """Without a recorded response, the session's events are scanned."""
+    events = [
+        Event(
+            author="account_discovery_agent",
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text="Old report.")]
+            ),
+        ),
+        Event(
+            author="account_discovery_agent",
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text="New report.")]
+            ),
+        ),
+    ]
+
+    report = citation_replacement_callback(_context(events)).parts[0].text
+    assert report.startswith("# Discovery Report\n\nNew report.")
+    assert report.endswith("No web sources were cited for this report.\n")
@@ -0,0 +1,48 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+from frontend.utils.chat_store import ChatStore
+
+
+def _messages(*texts: str) -> list[dict]:
+    return [{"type": "human", "content": text} for text in texts]
+
+
+def test_only_changed_messages_are_written(tmp_path: Path) -> None:
+    """Appending to a chat writes the new messages only."""
+    store = ChatStore(str(tmp_path / "chats.sqlite3"))
+    assert store.save_session("s1", "Title", "t1", _messages("a", "b")) == 2
+    assert store.save_session("s1", "Title", "t2", _messages("a", "b", "c")) == 1
+    assert store.save_session("s1", "Title", "t3", _messages("a", "x")) == 1
+    assert store.load_messages("s1") == _messages("a", "x")
+
+
+def test_index_lists_sessions_without_messages(tmp_path: Path) -> None:
+    """Sessions are listed most recent first and can be paginated."""
+    store = ChatStore(str(tmp_path / "chats.sqlite3"))
+    for i in range(5):
+        store.save_session(f"s{i}", f"Chat {i}", f"2025-01-0{i + 1}", _messages("a"))
+    store.set_title("s4", "Renamed")
+
+    page = store.list_sessions(limit=2, offset=1)
+    assert [row["session_id"] for row in page] == ["s3", "s2"]
+    assert "messages" not in page[0]
+    assert store.list_sessions(limit=1)[0]["title"] == "Renamed"
+    assert store.count_sessions() == 5
+
+    store.delete_session("s4")
+    assert not store.has_session("s4")
+    assert store.load_messages("s4") == []
@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+from pydantic import Field
+
+from common.chat_stream import ChatStream, add_chat_stream_route
+
+
+class FakeLlm(BaseLlm):
+    """Records the contents it is sent and echoes the last user text."""
+
+    contents: list[list[str]] = Field(default_factory=list)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        texts = [
+            f"{content.role}:{(content.parts or [])[0].text}"
+            for content in llm_request.contents
+        ]
+        self.contents.append(texts)
+        yield LlmResponse(
+            content=genai_types.Content(
+                role="model",
+                parts=[genai_types.Part(text=f"re {texts[-1].split(':', 1)[1]}")],
+            )
+        )
+
+
+def _runner(llm: FakeLlm) -> Runner:
+    return Runner(
+        app_name="app",
+        agent=LlmAgent(name="chat", model=llm, instruction="Answer."),
+        session_service=InMemorySessionService(),
+    )
+
+
+def _request(messages: list[dict[str, Any]], history_offset: int) -> dict[str, Any]:
+    return {
+        "input": {"messages": messages},
+        "config": {
+            "run_id": "run",
+            "metadata": {
+                "user_id": "user",
+                "session_id": "chat",
+                "history_offset": history_offset,
+            },
+        },
+    }
+
+
+def _turn(chat: ChatStream, request: dict[str, Any]) -> list[Any]:
+    async def collect() -> list[Any]:
+        return [item async for item in chat.stream(request)]
+
+    return asyncio.run(collect())
+
+
+def _human(text: str) -> dict[str, Any]:
+    return {"type": "human", "content": [{"type": "text", "text": text}]}
+
+
+def test_history_is_kept_by_the_server_between_turns() -> None:
+    """Later turns only carry new messages; the model still sees them all."""
+    llm = FakeLlm(model="fake")
+    chat = ChatStream(_runner(llm))
+
+    first = _turn(chat, _request([_human("hi")], 0))
+    assert first == [
+        [{"type": "constructor", "kwargs": {"type": "ai", "content": "re hi"}}, {}],
+        {"type": "history_synced", "message_count": 1},
+    ]
+
+    reply = {"type": "ai", "content": "re hi"}
+    second = _turn(chat, _request([reply, _human("and you?")], 1))
+    assert second[-1] == {"type": "history_synced", "message_count": 3}
+    assert llm.contents[-1] == ["user:hi", "model:re hi", "user:and you?"]
+
+    assert _turn(chat, _request([_human("again")], 2)) == [{"type": "history_mismatch"}]
+
+
+def test_full_sync_rebuilds_a_lost_session() -> None:
+    """A full history rebuilds the session on a server that lost it."""
+    llm = FakeLlm(model="fake")
+    chat = ChatStream(_runner(llm))
+    history = [
+        _human("hi"),
+        {"type": "ai", "content": "", "tool_calls": [{"name": "t", "args": {}}]},
+        {"type": "tool", "content": "{}", "tool_call_id": "1"},
+        {"type": "ai", "content": "re hi"},
+        _human("more"),
+    ]
+
+    assert _turn(chat, _request(history, 4)) == [{"type": "history_mismatch"}]
+    synced = _turn(chat, _request(history, 0))
+
+    assert synced[-1] == {"type": "history_synced", "message_count": 5}
+    assert llm.contents == [["user:hi", "model:re hi", "user:more"]]
+
+
+def test_route_streams_sse() -> None:
+    """`/stream_messages` sends each item as an SSE data line."""
+    app = FastAPI()
+    add_chat_stream_route(app, lambda: _runner(FakeLlm(model="fake")))
+
+    response = TestClient(app).post(
+        "/stream_messages", json=_request([_human("hi")], 0)
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    items = [
+        json.loads(line.removeprefix("data: "))
+        for line in response.text.splitlines()
+        if line
+    ]
+    assert items[-1] == {"type": "history_synced", "message_count": 1}
@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.cloud.documentai_v1")
+pytest.importorskip("google.cloud.firestore")
+pytest.importorskip("reportlab")
+
+from tests.load_test.document_pipeline_fakes import (
+    DocumentPipelineHarness,
+    FaultInjector,
+)
+
+
+def _upload(harness: DocumentPipelineHarness, path: Path) -> list[dict]:
+    with harness.patched_upload_tool() as upload:
+        assert upload(str(path))["status"] == "success"
+    return harness.pop_events()
+
+
+def test_duplicate_events_are_processed_once(tmp_path: Path) -> None:
+    """A re-delivered GCS event does not call Document AI again."""
+    harness = DocumentPipelineHarness()
+    path = tmp_path / "contract.pdf"
+    path.write_text("first page\fsecond page")
+    [event] = _upload(harness, path)
+
+    harness.process(event)
+    harness.process(event)
+
+    header = harness.header("contract.pdf")
+    assert harness.docai.calls == 1
+    assert header["status"] == "processed"
+    assert header["chunk_count"] == 2
+
+
+def test_failures_are_dead_lettered(tmp_path: Path) -> None:
+    """Document AI failures mark the document as failed."""
+    harness = DocumentPipelineHarness(docai_faults=FaultInjector(failure_rate=1.0))
+    path = tmp_path / "contract.pdf"
+    path.write_text("text")
+    [event] = _upload(harness, path)
+
+    harness.process(event)
+
+    assert harness.header("contract.pdf")["status"] == "failed"
+
+
+def test_batch_jobs_process_each_generation_once() -> None:
+    """Batch runs submit only new generations and save finished jobs later."""
+    harness = DocumentPipelineHarness()
+    bucket = harness.storage.bucket(harness.bucket_name)
+    bucket.blob("in/a.pdf").upload_from_string("page a", "application/pdf")
+    bucket.blob("in/b.pdf").upload_from_string("page b\fpage 2", "application/pdf")
+    bucket.blob("in/notes.zip").upload_from_string("zip", "application/zip")
+    run = harness.function.run_batch_job
+
+    assert run(f"gs://{harness.bucket_name}/in/", "gs://output/docai/") == 0
+    assert harness.docai.batch_calls == 1
+    assert harness.header("in/a.pdf")["status"] == "processing"
+    assert harness.header("in/notes.zip")["status"] == "failed"
+
+    assert run(f"gs://{harness.bucket_name}/in/", "gs://output/docai/") == 2
+    assert harness.docai.batch_calls == 1
+    assert harness.header("in/b.pdf")["status"] == "processed"
+    assert harness.header("in/b.pdf")["chunk_count"] == 2
+
+    bucket.blob("in/a.pdf").upload_from_string("new page a", "application/pdf")
+    run(f"gs://{harness.bucket_name}/in/", "gs://output/docai/")
+    assert run(f"gs://{harness.bucket_name}/in/", "gs://output/docai/") == 1
+    assert harness.docai.batch_calls == 2
+    assert harness.header("in/notes.zip")["status"] == "failed"
+
+
+def test_batch_outputs_are_matched_to_their_own_input() -> None:
+    """With more than 10 inputs, input 1 does not pick up outputs 10 and 11."""
+    harness = DocumentPipelineHarness()
+    bucket = harness.storage.bucket(harness.bucket_name)
+    names = [f"in/doc{i:02d}.pdf" for i in range(12)]
+    for i, name in enumerate(names):
+        bucket.blob(name).upload_from_string(f"TEXT{i:02d}", "application/pdf")
+    run = harness.function.run_batch_job
+
+    run(f"gs://{harness.bucket_name}/in/", "gs://output/docai/")
+    assert run(f"gs://{harness.bucket_name}/in/", "gs://output/docai/") == 12
+
+    for i, name in enumerate(names):
+        assert harness.text(name) == f"TEXT{i:02d}"
+        assert harness.header(name)["text_length"] == 6
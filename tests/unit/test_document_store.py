@@ -0,0 +1,109 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+import pytest
+
+from functions.document_store import (
+    MAX_WRITE_ATTEMPTS,
+    DocumentWriteError,
+    firestore_document_id,
+    page_spans_from_document,
+    save_chunked_document,
+    split_text_into_chunks,
+)
+from tests.load_test.document_pipeline_fakes import FakeFirestoreClient
+
+
+def test_chunks_follow_pages() -> None:
+    """Each page becomes its own chunk, in order."""
+    text = "page one" + "page two"
+    chunks = split_text_into_chunks(text, [(0, 8), (8, 16)])
+    assert [c["text"] for c in chunks] == ["page one", "page two"]
+    assert [c["page"] for c in chunks] == [0, 1]
+    assert [c["index"] for c in chunks] == [0, 1]
+
+
+def test_large_pages_are_split_on_character_boundaries() -> None:
+    """Oversized pages are split without breaking multi-byte characters."""
+    text = "é" * 10  # two bytes per character
+    chunks = split_text_into_chunks(text, max_chunk_bytes=5)
+    assert "".join(c["text"] for c in chunks) == text
+    assert all(len(c["text"].encode("utf-8")) <= 5 for c in chunks)
+    assert all(c["page"] is None for c in chunks)
+
+
+def test_page_spans_from_document() -> None:
+    """Page spans cover all text segments of each page, blank pages included."""
+
+    def page(*segments: tuple[int, int]) -> SimpleNamespace:
+        text_segments = [
+            SimpleNamespace(start_index=start, end_index=end) for start, end in segments
+        ]
+        return SimpleNamespace(
+            layout=SimpleNamespace(
+                text_anchor=SimpleNamespace(text_segments=text_segments)
+            )
+        )
+
+    document = SimpleNamespace(pages=[page((0, 4), (4, 10)), page(), page((10, 12))])
+    assert page_spans_from_document(document) == [(0, 10), (0, 0), (10, 12)]
+
+
+def test_firestore_document_id_is_unique_per_object() -> None:
+    """Object names map to distinct IDs that never contain a slash."""
+    assert firestore_document_id("a.pdf") != firestore_document_id("a.docx")
+    assert "/" not in firestore_document_id("contracts/2025/a.pdf")
+
+
+class FlakyChunkFirestoreClient(FakeFirestoreClient):
+    """Fails every write to a chunk document."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.chunk_write_attempts = 0
+
+    def write(self, path: tuple[str, ...], data: dict, merge: bool) -> None:
+        if "chunks" in path:
+            self.chunk_write_attempts += 1
+            raise OSError("unavailable")
+        super().write(path, data, merge)
+
+
+def test_header_is_not_written_when_chunk_writes_fail() -> None:
+    """Failed chunk writes are retried, then raise before the header is written."""
+    client = FlakyChunkFirestoreClient()
+
+    with pytest.raises(DocumentWriteError, match="unavailable"):
+        save_chunked_document(
+            client, "docs", "a.pdf", text="text", entities=[], metadata={}
+        )
+
+    assert client.chunk_write_attempts == MAX_WRITE_ATTEMPTS
+    assert client.read(("docs", "a.pdf")) is None
+
+
+def test_rewrite_deletes_stale_chunks_after_the_header() -> None:
+    """A shorter rewrite updates the header and removes leftover chunks."""
+    client = FakeFirestoreClient()
+    save_chunked_document(
+        client, "docs", "a.pdf", "one" + "two", [], {}, page_spans=[(0, 3), (3, 6)]
+    )
+
+    header = save_chunked_document(client, "docs", "a.pdf", "new", [], {})
+
+    assert header["chunk_count"] == 1
+    assert client.read(("docs", "a.pdf"))["chunk_count"] == 1
+    assert [c["text"] for c in client.children(("docs", "a.pdf", "chunks"))] == ["new"]
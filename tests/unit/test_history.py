@@ -0,0 +1,82 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from google.genai import types as genai_types
+
+from common.history import SUMMARY_HEADER, HistoryPolicy, apply_history_policy
+
+
+def _text(role: str, *texts: str, thought: bool = False) -> genai_types.Content:
+    return genai_types.Content(
+        role=role, parts=[genai_types.Part(text=t, thought=thought) for t in texts]
+    )
+
+
+def _call(name: str) -> genai_types.Content:
+    return genai_types.Content(
+        role="model",
+        parts=[genai_types.Part.from_function_call(name=name, args={"q": "x"})],
+    )
+
+
+def _response(name: str, payload: str) -> genai_types.Content:
+    return genai_types.Content(
+        role="user",
+        parts=[
+            genai_types.Part.from_function_response(
+                name=name, response={"result": payload}
+            )
+        ],
+    )
+
+
+def test_old_turns_are_summarized_and_trimmed() -> None:
+    """Turns beyond max_turns become a summary; thoughts and payloads shrink."""
+    contents = [
+        _text("user", "first question"),
+        _text("model", "first answer"),
+        _text("user", "second question"),
+        _text("model", "pondering", thought=True),
+        _call("search"),
+        _response("search", "y" * 500),
+        _text("model", "second answer"),
+        _text("user", "third question"),
+        _text("user", "For context:", "[researcher] `search` tool returned: ok"),
+    ]
+    policy = HistoryPolicy(max_turns=2, max_tool_payload_chars=100)
+    windowed = apply_history_policy(contents, policy)
+
+    summary = windowed[0].parts[0].text
+    assert summary.startswith(SUMMARY_HEADER)
+    assert "- user: first question" in summary
+    assert "- model: first answer" in summary
+    # Second turn: thought dropped, tool payload truncated.
+    assert [c.parts[0].text for c in windowed[1:2]] == ["second question"]
+    assert windowed[2].parts[0].function_call.name == "search"
+    response = windowed[3].parts[0].function_response.response["result"]
+    assert len(response) < 200 and "characters omitted" in response
+    # The current turn, including the foreign-agent context message, is kept.
+    assert windowed[-2:] == contents[-2:]
+
+
+def test_pending_tool_calls_are_left_untouched() -> None:
+    """The agent's own in-flight calls keep thoughts and full payloads."""
+    contents = [
+        _text("user", "question"),
+        _text("model", "pondering", thought=True),
+        _call("search"),
+        _response("search", "y" * 500),
+    ]
+    policy = HistoryPolicy(max_turns=1, max_tool_payload_chars=100)
+    assert apply_history_policy(contents, policy) == contents
@@ -0,0 +1,123 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.events import Event
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types as genai_types
+
+from common import model_routing
+from common.model_routing import ModelRoute, ModelRouter
+
+ROUTE = ModelRoute(
+    fast_model="gemini-2.5-flash", fast_iterations=1, fast_max_findings_chars=100
+)
+
+
+def _context(previous_evaluations: int, findings: str) -> SimpleNamespace:
+    events = [
+        Event(author="research_evaluator", invocation_id="inv-1")
+        for _ in range(previous_evaluations)
+    ]
+    return SimpleNamespace(
+        agent_name="research_evaluator",
+        invocation_id="inv-1",
+        state={"section_research_findings": findings},
+        _invocation_context=SimpleNamespace(
+            invocation_id="inv-1", session=SimpleNamespace(events=events)
+        ),
+    )
+
+
+def test_evaluator_downgrades_early_or_on_short_findings() -> None:
+    """The fast model is used on the first call or for short findings only."""
+    router = ModelRouter({"research_evaluator": ROUTE})
+    long_findings = "x" * 500
+
+    assert router.choose_model(_context(0, long_findings), "gemini-2.5-pro") == (
+        "gemini-2.5-flash"
+    )
+    assert router.choose_model(_context(1, "short"), "gemini-2.5-pro") == (
+        "gemini-2.5-flash"
+    )
+    assert router.choose_model(_context(2, long_findings), "gemini-2.5-pro") == (
+        "gemini-2.5-pro"
+    )
+
+
+def test_calls_are_accounted_per_route() -> None:
+    """Tokens, cost and latency are recorded under the model actually used."""
+    router = ModelRouter({"research_evaluator": ROUTE})
+    context = _context(0, "short")
+    request = LlmRequest(model="gemini-2.5-pro")
+
+    router.before_model_callback(context, request)
+    assert request.model == "gemini-2.5-flash"
+    router.after_model_callback(
+        context,
+        LlmResponse(
+            usage_metadata=genai_types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=1_000_000, candidates_token_count=0
+            )
+        ),
+    )
+
+    stats = router.stats()["research_evaluator/gemini-2.5-flash"]
+    assert stats["calls"] == 1
+    assert stats["cost_usd"] == pytest.approx(0.30)
+    assert stats["p95_seconds"] is not None
+
+
+def test_stats_are_logged_at_the_end_of_an_invocation(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """log_stats_callback logs every route's summary as JSON."""
+    router = ModelRouter({"research_evaluator": ROUTE})
+    context = _context(0, "short")
+    router.before_model_callback(context, LlmRequest(model="gemini-2.5-pro"))
+    router.after_model_callback(context, LlmResponse())
+
+    with caplog.at_level(logging.INFO):
+        assert router.log_stats_callback(context) is None
+
+    logged = caplog.records[-1].getMessage().split("Model routing stats: ", 1)[1]
+    assert json.loads(logged) == router.stats()
+    assert json.loads(logged)["research_evaluator/gemini-2.5-flash"]["calls"] == 1
+
+
+def test_failed_and_stale_calls_are_not_kept_pending(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Calls that raise are forgotten on error or once they are stale."""
+    router = ModelRouter({"research_evaluator": ROUTE})
+    context = _context(0, "short")
+
+    router.before_model_callback(context, LlmRequest(model="gemini-2.5-pro"))
+    router.on_model_error_callback(context, RuntimeError("quota exceeded"))
+    assert not router._pending
+    assert router.stats() == {}
+
+    router.before_model_callback(context, LlmRequest(model="gemini-2.5-pro"))
+    other = _context(0, "short")
+    other.invocation_id = "inv-2"
+    monkeypatch.setattr(model_routing, "PENDING_TTL_SECONDS", 0.0)
+    router.before_model_callback(other, LlmRequest(model="gemini-2.5-pro"))
+    assert list(router._pending) == [("inv-2", "research_evaluator")]
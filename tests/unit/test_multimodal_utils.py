@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import io
+from typing import Any
+
+import pytest
+
+from frontend.utils import multimodal_utils
+
+
+def test_mime_types_resolved_from_extension_before_lookup(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Only URIs without a known extension are looked up, once each."""
+    looked_up = []
+
+    def fake_lookup(uri: str) -> str:
+        looked_up.append(uri)
+        return "application/octet-stream"
+
+    monkeypatch.setattr(multimodal_utils, "get_gcs_blob_mime_type", fake_lookup)
+    uris = ["gs://b/report.pdf", "gs://b/blob", "gs://b/photo.png", "gs://b/blob"]
+    assert multimodal_utils.resolve_gcs_mime_types(uris) == [
+        "application/pdf",
+        "application/octet-stream",
+        "image/png",
+        "application/octet-stream",
+    ]
+    assert looked_up == ["gs://b/blob"]
+
+
+class FakeUpload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+
+    def __init__(self, name: str, type: str, data: bytes) -> None:
+        super().__init__(data)
+        self.name, self.type, self.size = name, type, len(data)
+
+
+def test_large_files_are_uploaded_in_place(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Uploaded files keep their position among the inlined ones."""
+    monkeypatch.setattr(multimodal_utils, "MAX_INLINE_FILE_BYTES", 4)
+    uploads: list[tuple[str, list[Any]]] = []
+
+    def fake_upload(bucket_name: str, files: list[Any]) -> list[str]:
+        uploads.append((bucket_name, files))
+        return [f"gs://{bucket_name}/{file.name}" for file in files]
+
+    monkeypatch.setattr(multimodal_utils, "upload_files_concurrently", fake_upload)
+    files = [
+        FakeUpload("big.pdf", "application/pdf", b"12345"),
+        FakeUpload("small.txt", "text/plain", b"hi"),
+        FakeUpload("big.mp3", "audio/mpeg", b"123456"),
+    ]
+
+    parts = multimodal_utils.get_parts_from_files(False, files, "", "bucket")
+
+    assert uploads == [("bucket", [files[0], files[2]])]
+    assert [part.get("file_uri") for part in parts] == [
+        "gs://bucket/big.pdf",
+        None,
+        "gs://bucket/big.mp3",
+    ]
+    assert parts[1]["data"] == base64.b64encode(b"hi").decode()
+
+
+def test_format_message_renders_thumbnails_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Inline images are shrunk and rendered markdown is reused until edited."""
+    image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image.new("RGB", (1000, 1000), "white").save(buffer, format="PNG")
+    data_url = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+    message = {
+        "id": "m1",
+        "type": "human",
+        "content": [
+            {"type": "image_url", "image_url": {"url": data_url}},
+            {"type": "text", "text": "what is this?"},
+        ],
+    }
+
+    markdown = multimodal_utils.format_message(message)
+    assert data_url not in markdown
+    assert markdown.endswith("what is this?")
+
+    calls = []
+    monkeypatch.setattr(
+        multimodal_utils, "format_content", lambda content: calls.append(content)
+    )
+    assert multimodal_utils.format_message(message) == markdown
+    message["content"][-1]["text"] = "edited"
+    multimodal_utils.format_message(message)
+    assert len(calls) == 1
@@ -0,0 +1,176 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("google.adk")
+
+from google.adk.events import Event, EventActions  # noqa: E402
+from google.adk.sessions.base_session_service import GetSessionConfig  # noqa: E402
+
+from common.redis_session_service import RedisSessionService  # noqa: E402
+
+
+def _event(state_delta: dict) -> Event:
+    return Event(
+        author="user",
+        invocation_id="inv-1",
+        actions=EventActions(state_delta=state_delta),
+    )
+
+
+def test_sessions_round_trip_between_instances() -> None:
+    """Two services on the same store see each other's events and state."""
+
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        first = RedisSessionService(fakeredis.aioredis.FakeRedis(server=server))
+        second = RedisSessionService(fakeredis.aioredis.FakeRedis(server=server))
+
+        session = await first.create_session(
+            app_name="app", user_id="u1", state={"topic": "x", "app:tier": "pro"}
+        )
+        await first.append_event(session, _event({"step": 1, "temp:scratch": 1}))
+        await first.append_event(session, _event({"step": 2, "user:lang": "en"}))
+
+        loaded = await second.get_session(
+            app_name="app", user_id="u1", session_id=session.id
+        )
+        assert loaded is not None
+        assert len(loaded.events) == 2
+        assert loaded.state == {
+            "topic": "x",
+            "step": 2,
+            "app:tier": "pro",
+            "user:lang": "en",
+        }
+
+        recent = await second.get_session(
+            app_name="app",
+            user_id="u1",
+            session_id=session.id,
+            config=GetSessionConfig(num_recent_events=1),
+        )
+        assert [e.actions.state_delta["step"] for e in recent.events] == [2]
+
+        listed = await second.list_sessions(app_name="app", user_id="u1")
+        assert [s.id for s in listed.sessions] == [session.id]
+
+        await second.delete_session(app_name="app", user_id="u1", session_id=session.id)
+        assert (
+            await first.get_session(app_name="app", user_id="u1", session_id=session.id)
+            is None
+        )
+
+    asyncio.run(scenario())
+
+
+def test_temp_state_is_not_stored_with_events() -> None:
+    """`temp:` keys are trimmed from the stored event's state delta."""
+
+    async def scenario() -> None:
+        service = RedisSessionService(fakeredis.aioredis.FakeRedis())
+        session = await service.create_session(app_name="app", user_id="u1")
+        await service.append_event(
+            session, _event({"step": 1, "temp:report": "a long report"})
+        )
+
+        loaded = await service.get_session(
+            app_name="app", user_id="u1", session_id=session.id
+        )
+        assert [e.actions.state_delta for e in loaded.events] == [{"step": 1}]
+        assert loaded.state == {"step": 1}
+
+    asyncio.run(scenario())
+
+
+def test_stale_session_append_is_rejected() -> None:
+    """An append from a session object that missed another write fails."""
+
+    async def scenario() -> None:
+        service = RedisSessionService(fakeredis.aioredis.FakeRedis())
+        session = await service.create_session(app_name="app", user_id="u1")
+        stale = await service.get_session(
+            app_name="app", user_id="u1", session_id=session.id
+        )
+        await service.append_event(session, _event({"step": 1}))
+
+        with pytest.raises(ValueError, match="stale"):
+            await service.append_event(stale, _event({"step": 2}))
+
+    asyncio.run(scenario())
+
+
+def test_stale_append_is_rejected_despite_clock_skew() -> None:
+    """Staleness is decided by version, not by the writers' clocks."""
+
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        first = RedisSessionService(fakeredis.aioredis.FakeRedis(server=server))
+        second = RedisSessionService(fakeredis.aioredis.FakeRedis(server=server))
+        session = await first.create_session(app_name="app", user_id="u1")
+        other = await second.get_session(
+            app_name="app", user_id="u1", session_id=session.id
+        )
+        # The second instance's clock is an hour behind.
+        behind = _event({"step": 1})
+        behind.timestamp = session.last_update_time - 3600
+        await second.append_event(other, behind)
+
+        with pytest.raises(ValueError, match="stale"):
+            await first.append_event(session, _event({"step": 2}))
+        await second.append_event(other, _event({"step": 3}))
+
+    asyncio.run(scenario())
+
+
+def test_create_session_rejects_an_existing_id() -> None:
+    """Creating a session with a taken ID fails instead of overwriting it."""
+
+    async def scenario() -> None:
+        service = RedisSessionService(fakeredis.aioredis.FakeRedis())
+        session = await service.create_session(
+            app_name="app", user_id="u1", session_id="s1", state={"topic": "x"}
+        )
+        await service.append_event(session, _event({"step": 1}))
+
+        with pytest.raises(ValueError, match="already exists"):
+            await service.create_session(app_name="app", user_id="u1", session_id="s1")
+        loaded = await service.get_session(
+            app_name="app", user_id="u1", session_id="s1"
+        )
+        assert loaded.state == {"topic": "x", "step": 1}
+        assert len(loaded.events) == 1
+
+    asyncio.run(scenario())
+
+
+def test_sessions_expire_and_leave_the_index() -> None:
+    """Expired sessions disappear from get_session and list_sessions."""
+
+    async def scenario() -> None:
+        client = fakeredis.aioredis.FakeRedis()
+        service = RedisSessionService(client, session_ttl_seconds=60)
+        session = await service.create_session(app_name="app", user_id="u1")
+        assert 0 < await client.ttl(f"adk:meta:app:u1:{session.id}") <= 60
+
+        await client.delete(f"adk:meta:app:u1:{session.id}")
+        listed = await service.list_sessions(app_name="app", user_id="u1")
+        assert listed.sessions == []
+        assert await client.zcard("adk:sessions:app:u1") == 0
+
+    asyncio.run(scenario())
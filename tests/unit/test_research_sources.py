@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+pytest.importorskip("google.adk")
+# common.config only falls back to google.auth when no project is set.
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.genai import types as genai_types
+
+from app.agent import SOURCES_EVENT_CURSOR_KEY, collect_research_sources_callback
+
+
+def _grounded_event(*uris: str) -> Event:
+    return Event(
+        author="section_researcher",
+        grounding_metadata=genai_types.GroundingMetadata(
+            grounding_chunks=[
+                genai_types.GroundingChunk(
+                    web=genai_types.GroundingChunkWeb(
+                        uri=uri, title=uri, domain="example.com"
+                    )
+                )
+                for uri in uris
+            ]
+        ),
+    )
+
+
+def _collect(session: Session) -> dict[str, Any]:
+    """Runs the callback and returns the state delta it wrote."""
+    delta: dict[str, Any] = {}
+
+    class State(dict):
+        def __setitem__(self, key: str, value: Any) -> None:
+            delta[key] = value
+            session.state[key] = value
+
+    context = SimpleNamespace(
+        _invocation_context=SimpleNamespace(session=session), state=State()
+    )
+    collect_research_sources_callback(context)  # type: ignore[arg-type]
+    return delta
+
+
+def test_reloaded_session_only_reports_new_sources() -> None:
+    """Sources reported before a reload are not appended to the delta again."""
+    events = [_grounded_event("https://a.example", "https://b.example")]
+    session = Session(id="s", app_name="app", user_id="u", events=events)
+    first = _collect(session)
+    assert list(first["sources_appended"]) == ["src-1", "src-2"]
+
+    # A reloaded session only keeps the state that went through the delta.
+    events.append(_grounded_event("https://b.example", "https://c.example"))
+    reloaded = Session(
+        id="s",
+        app_name="app",
+        user_id="u",
+        events=events,
+        state={k: v for k, v in first.items() if k != "sources_appended"},
+    )
+    second = _collect(reloaded)
+
+    assert list(second["sources_appended"]) == ["src-3"]
+    assert second["sources_appended"]["src-3"]["url"] == "https://c.example"
+    assert second["source_count"] == 3
+    assert second[SOURCES_EVENT_CURSOR_KEY] == 2
+    assert _collect(reloaded) == {}
@@ -0,0 +1,157 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types as genai_types
+
+from common import response_cache
+from common.response_cache import (
+    BYPASS_STATE_KEY,
+    MemoryResponseCache,
+    ResponseCacheCallbacks,
+    ResponseCachePlugin,
+    SqliteResponseCache,
+    TieredResponseCache,
+)
+
+
+def _request(text: str) -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[
+            genai_types.Content(role="user", parts=[genai_types.Part(text=text)])
+        ],
+        config=genai_types.GenerateContentConfig(system_instruction="Plan it."),
+    )
+
+
+def _context(invocation_id: str, state: dict) -> SimpleNamespace:
+    return SimpleNamespace(
+        invocation_id=invocation_id, agent_name="plan_generator", state=state
+    )
+
+
+def test_memory_cache_evicts_least_recently_used_and_expired() -> None:
+    """Entries beyond max_entries or older than the TTL are gone."""
+    cache = MemoryResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    expired = MemoryResponseCache(ttl_seconds=-1)
+    expired.set("a", "1")
+    assert expired.get("a") is None
+
+
+def test_sqlite_tier_survives_restarts_and_promotes_hits(tmp_path: Path) -> None:
+    """A new memory tier is refilled from the SQLite tier on first read."""
+    path = str(tmp_path / "responses.db")
+    SqliteResponseCache(path).set("key", "value")
+
+    memory = MemoryResponseCache()
+    cache = TieredResponseCache(memory, SqliteResponseCache(path))
+    assert cache.get("key") == "value"
+    assert memory.get("key") == "value"
+
+
+def test_callbacks_serve_repeated_requests_from_the_cache() -> None:
+    """The second identical request is answered without calling the model."""
+    callbacks = ResponseCacheCallbacks(MemoryResponseCache())
+    response = LlmResponse(
+        content=genai_types.Content(
+            role="model", parts=[genai_types.Part(text="* [RESEARCH] Analyze X")]
+        )
+    )
+
+    first = _context("inv-1", {})
+    assert callbacks.before_model_callback(first, _request("topic X")) is None
+    callbacks.after_model_callback(first, response)
+
+    cached = callbacks.before_model_callback(_context("inv-2", {}), _request("topic X"))
+    assert cached.content.parts[0].text == "* [RESEARCH] Analyze X"
+    assert (
+        callbacks.before_model_callback(_context("inv-3", {}), _request("topic Y"))
+        is None
+    )
+    bypassed = _context("inv-4", {BYPASS_STATE_KEY: True})
+    assert callbacks.before_model_callback(bypassed, _request("topic X")) is None
+
+
+def test_requests_missing_their_state_keys_are_not_cached() -> None:
+    """Keyed state stands in for the contents, so it has to be set."""
+    callbacks = ResponseCacheCallbacks(
+        MemoryResponseCache(), state_keys=("research_plan",), include_contents=False
+    )
+    response = LlmResponse(
+        content=genai_types.Content(
+            role="model", parts=[genai_types.Part(text="# Section")]
+        )
+    )
+
+    unplanned = _context("inv-1", {})
+    assert callbacks.before_model_callback(unplanned, _request("topic X")) is None
+    assert not callbacks._pending
+    callbacks.after_model_callback(unplanned, response)
+    assert (
+        callbacks.before_model_callback(_context("inv-2", {}), _request("topic Y"))
+        is None
+    )
+
+    planned = _context("inv-3", {"research_plan": "* [RESEARCH] Analyze X"})
+    callbacks.before_model_callback(planned, _request("topic X"))
+    callbacks.after_model_callback(planned, response)
+    replanned = _context("inv-4", {"research_plan": "* [RESEARCH] Analyze X"})
+    cached = callbacks.before_model_callback(replanned, _request("go ahead"))
+    assert cached.content.parts[0].text == "# Section"
+
+
+def test_failed_and_stale_model_calls_are_not_kept_pending(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Calls that raise are forgotten on error or once they are stale."""
+    plugin = ResponseCachePlugin(MemoryResponseCache())
+    pending = plugin.callbacks._pending
+
+    failed = _context("inv-1", {})
+    asyncio.run(
+        plugin.before_model_callback(
+            callback_context=failed, llm_request=_request("topic X")
+        )
+    )
+    assert len(pending) == 1
+    asyncio.run(
+        plugin.on_model_error_callback(
+            callback_context=failed,
+            llm_request=_request("topic X"),
+            error=RuntimeError("quota exceeded"),
+        )
+    )
+    assert not pending
+
+    callbacks = ResponseCacheCallbacks(MemoryResponseCache())
+    callbacks.before_model_callback(_context("inv-2", {}), _request("topic X"))
+    monkeypatch.setattr(response_cache, "PENDING_TTL_SECONDS", 0.0)
+    callbacks.before_model_callback(_context("inv-3", {}), _request("topic Y"))
+    assert list(callbacks._pending) == [("inv-3", "plan_generator")]
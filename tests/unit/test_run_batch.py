@@ -0,0 +1,151 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+from collections.abc import AsyncGenerator, AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pytest.importorskip("google.adk")
+# common.config only falls back to google.auth when no project is set.
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+from google.adk.events import Event
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+from pydantic import Field
+
+from account_discovery_agent.agent import create_discovery_agent
+from common.response_cache import MemoryResponseCache, ResponseCachePlugin
+from run_batch import (
+    ACCOUNT_STATE_KEYS,
+    APP_NAME,
+    BatchRunner,
+    read_accounts,
+    read_checkpoint,
+)
+
+
+class FakeRunner:
+    """Answers with the session's URL; fails for URLs in `failing`."""
+
+    def __init__(
+        self, session_service: InMemorySessionService, failing: set[str]
+    ) -> None:
+        self.session_service = session_service
+        self.failing = failing
+        self.calls: list[str] = []
+
+    async def run_async(self, **kwargs: Any) -> AsyncIterator[Event]:
+        session = await self.session_service.get_session(
+            app_name="account_discovery_agent",
+            user_id=kwargs["user_id"],
+            session_id=kwargs["session_id"],
+        )
+        url = session.state["url"]
+        self.calls.append(url)
+        if url in self.failing:
+            raise RuntimeError("quota exceeded")
+        yield Event(
+            author="strategic_advisor",
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text=f"Report for {url}")]
+            ),
+        )
+
+
+class FakeLlm(BaseLlm):
+    """Records requests and answers with the instruction's first line."""
+
+    requests: list[LlmRequest] = Field(default_factory=list)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.requests.append(llm_request)
+        instruction = str(llm_request.config.system_instruction)
+        yield LlmResponse(
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text=instruction.splitlines()[0])]
+            )
+        )
+
+
+def test_batch_writes_reports_and_resumes_from_checkpoint(tmp_path: Path) -> None:
+    """Succeeded accounts are skipped on re-run; failed ones are retried."""
+    accounts_file = tmp_path / "accounts.csv"
+    accounts_file.write_text(
+        "id,url\nacme,https://acme.example\n,https://globex.example\n,\n"
+    )
+    accounts = read_accounts(str(accounts_file))
+    assert [a["id"] for a in accounts] == ["acme", "https://globex.example"]
+
+    output_dir = str(tmp_path / "out")
+    service = InMemorySessionService()
+    runner = FakeRunner(service, failing={"https://globex.example"})
+    batch = BatchRunner(runner, service, output_dir, concurrency=2, retries=1)
+    counts = asyncio.run(batch.run(accounts))
+
+    assert counts == {"ok": 1, "error": 1, "skipped": 0}
+    checkpoint = read_checkpoint(os.path.join(output_dir, "checkpoint.jsonl"))
+    assert checkpoint["acme"]["status"] == "ok"
+    assert Path(checkpoint["acme"]["report_path"]).read_text() == (
+        "Report for https://acme.example"
+    )
+    assert checkpoint["https://globex.example"]["attempts"] == 2
+
+    runner = FakeRunner(service, failing=set())
+    batch = BatchRunner(runner, service, output_dir, retries=0)
+    counts = asyncio.run(batch.run(accounts))
+
+    assert counts == {"ok": 1, "error": 0, "skipped": 1}
+    assert runner.calls == ["https://globex.example"]
+
+
+def test_each_account_gets_its_own_model_request(tmp_path: Path) -> None:
+    """Accounts render distinct instructions and never share cached reports."""
+    llm = FakeLlm(model="gemini-2.5-flash")
+    agent = create_discovery_agent()
+    agent.model = llm
+    service = InMemorySessionService()
+    runner = Runner(
+        agent=agent,
+        app_name=APP_NAME,
+        session_service=service,
+        plugins=[
+            ResponseCachePlugin(MemoryResponseCache(), state_keys=ACCOUNT_STATE_KEYS)
+        ],
+    )
+    accounts = [
+        {"id": "acme", "url": "https://acme.example"},
+        {"id": "globex", "url": "https://globex.example"},
+    ]
+    output_dir = tmp_path / "out"
+
+    counts = asyncio.run(BatchRunner(runner, service, str(output_dir)).run(accounts))
+
+    assert counts == {"ok": 2, "error": 0, "skipped": 0}
+    instructions = sorted(str(r.config.system_instruction) for r in llm.requests)
+    assert len(instructions) == 2
+    assert "https://acme.example" in instructions[0]
+    assert "https://globex.example" in instructions[1]
+    for account in ("acme", "globex"):
+        report = (output_dir / "reports" / f"{account}.md").read_text()
+        assert report.startswith("# Discovery Report")
+        assert f"https://{account}.example" in report
@@ -0,0 +1,53 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from common.session_store import compact_session_store, session_db_kwargs
+
+
+def test_compaction_deletes_expired_sessions_and_their_events(tmp_path: Path) -> None:
+    """Only sessions past the retention window are removed, events included."""
+    db_path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE sessions (app_name, user_id, id, update_time);
+        CREATE TABLE events (id, app_name, user_id, session_id);
+        INSERT INTO sessions VALUES ('app', 'u', 'old', '2000-01-01 00:00:00');
+        INSERT INTO sessions VALUES ('app', 'u', 'new', '2999-01-01 00:00:00');
+        INSERT INTO events VALUES ('e1', 'app', 'u', 'old');
+        INSERT INTO events VALUES ('e2', 'app', 'u', 'new');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    assert compact_session_store(db_path, max_age_days=30) == 1
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id FROM sessions").fetchall() == [("new",)]
+    assert conn.execute("SELECT id FROM events").fetchall() == [("e2",)]
+    conn.close()
+
+
+def test_pool_settings_only_apply_to_sqlite_files() -> None:
+    """SQLite files get a thread-safe pool; other URLs keep the defaults."""
+    assert "pool_size" in session_db_kwargs("sqlite:///./sessions.db")
+    assert "pool_size" not in session_db_kwargs("postgresql://db/sessions")
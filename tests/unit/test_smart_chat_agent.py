@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+pytest.importorskip("google.adk")
+# common.config only falls back to google.auth when no project is set.
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+from google.adk.agents import LlmAgent, ParallelAgent, SequentialAgent
+
+from account_discovery_agent.smart_chat_agent import (
+    EXTERNAL_NEWS_KEY,
+    INTERNAL_DATA_KEY,
+    create_smart_chat_agent,
+)
+
+
+def test_default_mode_transfers_to_retrievers() -> None:
+    """The advisor coordinates both retrievers as transfer targets."""
+    agent = create_smart_chat_agent()
+    assert isinstance(agent, LlmAgent)
+    assert [a.name for a in agent.sub_agents] == [
+        "internal_data_retriever",
+        "external_news_agent",
+    ]
+
+
+def test_parallel_mode_runs_retrievers_before_the_advisor() -> None:
+    """Retrievers run in a parallel stage and the advisor reads their keys."""
+    agent = create_smart_chat_agent(role="AI Platform Specialist", parallel=True)
+    assert isinstance(agent, SequentialAgent)
+    retrieval, advisor = agent.sub_agents
+    assert isinstance(retrieval, ParallelAgent)
+    assert [a.output_key for a in retrieval.sub_agents] == [
+        INTERNAL_DATA_KEY,
+        EXTERNAL_NEWS_KEY,
+    ]
+    assert not advisor.sub_agents
+    assert f"{{{INTERNAL_DATA_KEY}?}}" in advisor.instruction
+    assert f"{{{EXTERNAL_NEWS_KEY}?}}" in advisor.instruction
+    assert "AI Platform Specialist" in advisor.instruction
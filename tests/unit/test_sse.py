@@ -0,0 +1,35 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from frontend.utils.sse import iter_sse_events
+
+
+def test_multi_line_events_and_comments() -> None:
+    """Data lines are joined until a blank line; comments are skipped."""
+    lines = [
+        b": keep-alive",
+        b"event: message",
+        b'data: {"a":',
+        b"data: 1}",
+        b"",
+        b"data:second",
+        b"",
+    ]
+    assert list(iter_sse_events(lines)) == ['{"a":\n1}', "second"]
+
+
+def test_newline_delimited_json_and_unterminated_event() -> None:
+    """Bare JSON lines pass through and a trailing event is not lost."""
+    lines = ['{"type": "ai"}', "", "data: last\r"]
+    assert list(iter_sse_events(lines)) == ['{"type": "ai"}', "last"]
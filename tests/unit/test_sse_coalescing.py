@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from typing import Any
+
+from common.sse_coalescing import SSECoalescingMiddleware
+
+
+def _event(text: str, partial: bool = True) -> bytes:
+    event = {
+        "author": "interactive_planner_agent",
+        "invocationId": "inv-1",
+        "partial": partial,
+        "content": {"parts": [{"text": text}]},
+    }
+    return f"data: {json.dumps(event)}\n\n".encode()
+
+
+def _run(
+    middleware_kwargs: dict[str, Any], chunks: list[bytes], request: dict[str, Any]
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    received_request: dict[str, Any] = {}
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        received_request.update(json.loads((await receive())["body"]))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream; charset=utf-8")],
+            }
+        )
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": json.dumps(request).encode()}
+
+    sent: list[bytes] = []
+
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.body":
+            sent.append(message["body"])
+
+    middleware = SSECoalescingMiddleware(app, **middleware_kwargs)
+    scope = {"type": "http", "path": "/run_sse", "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    events = [
+        json.loads(block[len("data: ") :])
+        for block in b"".join(sent).decode().split("\n\n")
+        if block
+    ]
+    return events, received_request
+
+
+def test_partial_events_are_merged_until_the_final_event() -> None:
+    """Bursts of partial text are merged; complete events pass through in order."""
+    chunks = [_event("Hel"), _event("lo "), _event("wor"), _event("ld")]
+    chunks.append(_event("Hello world", partial=False))
+    events, _ = _run({"max_events_per_second": 1}, chunks, {"streaming": True})
+
+    texts = [e["content"]["parts"][0]["text"] for e in events]
+    assert texts == ["Hel", "lo world", "Hello world"]
+    assert [e["partial"] for e in events] == [True, True, False]
+
+
+def test_streaming_can_be_disabled_server_side() -> None:
+    """With the toggle off, the request's streaming flag is forced to False."""
+    _, request = _run({"streaming_enabled": False}, [], {"streaming": True})
+    assert request["streaming"] is False
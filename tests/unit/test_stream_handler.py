@@ -0,0 +1,196 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("vertexai")
+
+from frontend.utils.stream_handler import SYNCED_MESSAGE_COUNT_KEY, EventProcessor
+
+
+class SessionState(dict):
+    """Dict with attribute access, like `st.session_state`."""
+
+    def __getattr__(self, name: str) -> Any:
+        return self[name]
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self[name] = value
+
+
+class FakeClient:
+    """Answers the n-th request with the n-th list of events."""
+
+    def __init__(self, *responses: list[Any]) -> None:
+        self.responses = list(responses)
+        self.requests: list[dict[str, Any]] = []
+
+    def stream_messages(self, data: dict[str, Any]) -> Iterator[Any]:
+        self.requests.append(data)
+        return iter(self.responses.pop(0))
+
+
+class FailingClient(FakeClient):
+    def stream_messages(self, data: dict[str, Any]) -> Iterator[Any]:
+        raise ConnectionError("connection reset")
+
+
+class FakeStreamHandler:
+    def __init__(self) -> None:
+        self.tokens: list[str] = []
+        self.statuses: list[str] = []
+
+    def new_token(self, token: str) -> None:
+        self.tokens.append(token)
+
+    def new_status(self, status: str) -> None:
+        self.statuses.append(status)
+
+    def flush(self) -> None:
+        pass
+
+
+def _event(**kwargs: Any) -> tuple[dict[str, Any], dict[str, Any]]:
+    return {"type": "constructor", "kwargs": kwargs}, {}
+
+
+def _st(messages: list[dict[str, Any]], **chat: Any) -> SimpleNamespace:
+    return SimpleNamespace(
+        session_state=SessionState(
+            user_id="user",
+            session_id="chat",
+            user_chats={"chat": {"messages": messages, **chat}},
+        )
+    )
+
+
+def test_full_history_is_sent_and_answer_appended() -> None:
+    """Each turn sends every message; streamed chunks become one answer."""
+    history = [
+        {"type": "human", "content": "hi"},
+        {"type": "ai", "content": "hello"},
+        {"type": "human", "content": "weather?"},
+    ]
+    st = _st(list(history))
+    client = FakeClient(
+        [
+            _event(type="AIMessageChunk", content="Sun"),
+            _event(type="AIMessageChunk", content="ny"),
+        ]
+    )
+    handler = FakeStreamHandler()
+
+    EventProcessor(st, client, handler).process_events()
+
+    [request] = client.requests
+    assert request["input"]["messages"][:3] == history
+    assert request["config"]["metadata"] == {
+        "user_id": "user",
+        "session_id": "chat",
+        "history_offset": 0,
+    }
+    assert handler.tokens == ["Sun", "ny"]
+    messages = st.session_state.user_chats["chat"]["messages"]
+    assert messages[-1]["content"] == "Sunny"
+    assert messages[-1]["id"] == request["config"]["run_id"]
+    assert st.session_state.run_id == request["config"]["run_id"]
+
+
+def test_tool_calls_are_recorded_before_the_answer() -> None:
+    """Tool calls and responses are added to the history with the answer."""
+    st = _st([{"type": "human", "content": "search"}])
+    tool_call = {"name": "search", "args": {"q": "x"}, "id": "call-1"}
+    client = FakeClient(
+        [
+            _event(type="ai", content="", tool_calls=[tool_call]),
+            _event(type="tool", content="result", tool_call_id="call-1"),
+            _event(type="ai", content="Found it."),
+        ]
+    )
+    handler = FakeStreamHandler()
+
+    EventProcessor(st, client, handler).process_events()
+
+    messages = st.session_state.user_chats["chat"]["messages"]
+    assert [m["type"] for m in messages] == ["human", "ai", "tool", "ai"]
+    assert messages[1]["tool_calls"] == [tool_call]
+    assert messages[2]["tool_call_id"] == "call-1"
+    assert messages[3]["content"] == "Found it."
+    assert len(handler.statuses) == 2
+
+
+def test_only_new_messages_are_sent_once_the_server_holds_the_history() -> None:
+    """After `history_synced`, a turn sends the messages after the offset."""
+    history = [
+        {"type": "human", "content": "hi"},
+        {"type": "ai", "content": "hello"},
+        {"type": "human", "content": "weather?"},
+    ]
+    st = _st(list(history), **{SYNCED_MESSAGE_COUNT_KEY: 1})
+    client = FakeClient(
+        [
+            _event(type="ai", content="Sunny."),
+            {"type": "history_synced", "message_count": 3},
+        ]
+    )
+
+    EventProcessor(st, client, FakeStreamHandler()).process_events()
+
+    [request] = client.requests
+    assert request["input"]["messages"] == history[1:]
+    assert request["config"]["metadata"]["history_offset"] == 1
+    chat = st.session_state.user_chats["chat"]
+    assert chat[SYNCED_MESSAGE_COUNT_KEY] == 3
+    assert chat["messages"][-1]["content"] == "Sunny."
+
+
+def test_history_mismatch_resends_the_full_history() -> None:
+    """A server that lost the history gets all messages again."""
+    history = [
+        {"type": "human", "content": "hi"},
+        {"type": "ai", "content": "hello"},
+        {"type": "human", "content": "weather?"},
+    ]
+    st = _st(list(history), **{SYNCED_MESSAGE_COUNT_KEY: 1})
+    client = FakeClient(
+        [{"type": "history_mismatch"}, _event(type="ai", content="ignored")],
+        [
+            _event(type="ai", content="Sunny."),
+            {"type": "history_synced", "message_count": 3},
+        ],
+    )
+
+    EventProcessor(st, client, FakeStreamHandler()).process_events()
+
+    first, second = client.requests
+    assert first["config"]["metadata"]["history_offset"] == 1
+    assert second["input"]["messages"] == history
+    assert second["config"]["metadata"]["history_offset"] == 0
+    chat = st.session_state.user_chats["chat"]
+    assert chat["messages"][-1]["content"] == "Sunny."
+    assert chat[SYNCED_MESSAGE_COUNT_KEY] == 3
+
+
+def test_failed_turn_drops_the_sync_marker() -> None:
+    """Without an acknowledgement the next turn sends the full history."""
+    st = _st([{"type": "human", "content": "hi"}], **{SYNCED_MESSAGE_COUNT_KEY: 1})
+
+    with pytest.raises(ConnectionError):
+        EventProcessor(st, FailingClient(), FakeStreamHandler()).process_events()
+    assert SYNCED_MESSAGE_COUNT_KEY not in st.session_state.user_chats["chat"]
@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import re
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import pytest
+
+pytest.importorskip("reportlab")
+pytest.importorskip("google.cloud.storage")
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from common import tools
+
+MAX_WIDTH = letter[0] - 2 * tools.PDF_MARGIN
+
+
+class FakeBlob:
+    """Writes uploads to `<FAKE_GCS_DIR>/<bucket>/<name>`."""
+
+    def __init__(self, bucket: str, name: str) -> None:
+        self.path = Path(os.environ["FAKE_GCS_DIR"], bucket, name.lstrip("/"))
+
+    def upload_from_file(self, file_obj: BinaryIO, content_type: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(file_obj.read())
+
+
+class FakeBucket:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def blob(self, name: str, **kwargs: Any) -> FakeBlob:
+        return FakeBlob(self.name, name)
+
+
+class FakeStorageClient:
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket(name)
+
+
+def _page_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+
+def test_tokens_wider_than_the_frame_are_split_by_character() -> None:
+    """A long token without spaces is broken into lines that fit the page."""
+    token = "x" * 300
+    segments = tools._wrap_line(f"see {token} end", MAX_WIDTH)
+
+    assert "".join(segments).replace(" ", "") == f"see{token}end"
+    assert len(segments) > 2
+    for segment in segments:
+        width = stringWidth(segment, tools.PDF_FONT_NAME, tools.PDF_FONT_SIZE)
+        assert width <= MAX_WIDTH
+    assert tools._wrap_line("", MAX_WIDTH) == [""]
+
+
+def test_write_text_as_pdf_paginates() -> None:
+    """Text longer than a page starts new pages."""
+    lines_per_page = int(
+        (letter[1] - 2 * tools.PDF_MARGIN) // (tools.PDF_FONT_SIZE * tools.PDF_LEADING)
+    )
+    short = io.BytesIO()
+    tools._write_text_as_pdf(io.StringIO("hello\n"), short)
+    long = io.BytesIO()
+    text = "".join(f"line {i}\n" for i in range(lines_per_page * 2 + 1))
+    tools._write_text_as_pdf(io.StringIO(text), long)
+
+    assert short.getvalue().startswith(b"%PDF")
+    assert _page_count(short.getvalue()) == 1
+    assert _page_count(long.getvalue()) == 3
+
+
+def test_convert_and_upload_batch_to_gcs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Every file is converted and uploaded; results keep the input order."""
+    monkeypatch.setattr(tools.storage, "Client", FakeStorageClient)
+    monkeypatch.setenv("FAKE_GCS_DIR", str(tmp_path / "gcs"))
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"report {name}\n")
+        paths.append(str(path))
+    missing = str(tmp_path / "missing.txt")
+
+    results = tools.convert_and_upload_batch_to_gcs(
+        [*paths, missing], "bucket", max_workers=2
+    )
+
+    assert [r["status"] for r in results] == ["success"] * 3 + ["error"]
+    for path, result in zip(paths, results[:3], strict=True):
+        pdf_name = path.replace(".txt", ".pdf")
+        assert result["gcs_path"] == f"gs://bucket/{pdf_name}"
+        uploaded = tmp_path / "gcs" / "bucket" / pdf_name.lstrip("/")
+        assert uploaded.read_bytes().startswith(b"%PDF")
+    assert tools.convert_and_upload_batch_to_gcs([], "bucket") == []
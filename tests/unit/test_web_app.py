@@ -0,0 +1,42 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.adk")
+# common.config only falls back to google.auth when no project is set.
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+from fastapi.testclient import TestClient
+
+from common.sse_coalescing import SSECoalescingMiddleware
+
+
+def test_research_agent_server_coalesces_and_serves_app(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """app/server.py serves appName `app` behind the SSE coalescer."""
+    monkeypatch.setenv("SESSION_SERVICE_URI", f"sqlite:///{tmp_path}/sessions.db")
+    server = importlib.import_module("app.server")
+
+    assert SSECoalescingMiddleware in [m.cls for m in server.app.user_middleware]
+    assert "/stream_messages" in [route.path for route in server.app.routes]
+    client = TestClient(server.app)
+    response = client.post("/apps/app/users/u_999/sessions/s1")
+    assert response.status_code == 200
+    assert response.json()["appName"] == "app"